@@ -0,0 +1,270 @@
+"""
+aggregations.py
+
+Shared columnar aggregation for the dashboard, budget planner and reports.
+
+Transactions and budgets are loaded once into typed DataFrames; every
+figure (category actuals, income/expense/net, budget variance) is then a
+single vectorized group-by over one or many months. The dashboard and
+planner summaries skip the transactions altogether: the per-month
+category and income/expense totals come pre-aggregated from db.py
+(Postgres functions, or the same rules in-process).
+
+Conventions (same as the pages always used):
+- amounts are stored positive; `type` says whether money came in
+- expenses are every type other than "income"
+- split parents are skipped; their children carry the categories
+"""
+
+import datetime
+from typing import Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+from config import INCOME_CATEGORIES
+from db import (
+    fetch_all,
+    get_budgets_for_range,
+    get_monthly_category_totals,
+    get_monthly_income_expense,
+)
+from utils.dates import add_months
+
+Month = Tuple[int, int]
+
+TRANSACTION_COLUMNS = [
+    "id", "date", "month", "amount", "category", "type",
+    "account_id", "is_split_parent", "parent_id",
+]
+BUDGET_COLUMNS = ["id", "month", "category", "amount", "type"]
+ACTUAL_COLUMNS = ["month", "category", "actual"]
+TOTAL_COLUMNS = ["month", "income", "expenses", "net"]
+
+
+# -----------------------------
+# Frames
+# -----------------------------
+def _month_start(values: pd.Series) -> pd.Series:
+    return pd.to_datetime(values).dt.to_period("M").dt.to_timestamp()
+
+
+def _categories(values: pd.Series) -> pd.Series:
+    return values.astype("string").fillna("").str.strip().str.lower()
+
+
+def transactions_frame(rows: List[Dict]) -> pd.DataFrame:
+    """
+    Transaction rows → typed frame with a `month` (first-of-month) column.
+    """
+    if not rows:
+        return pd.DataFrame({c: pd.Series(dtype="object") for c in TRANSACTION_COLUMNS}).astype(
+            {"amount": "float64", "is_split_parent": "bool"}
+        )
+
+    df = pd.DataFrame.from_records(rows)
+    for col in TRANSACTION_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    df["date"] = pd.to_datetime(df["date"])
+    df["month"] = _month_start(df["date"])
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).astype("float64")
+    df["category"] = _categories(df["category"])
+    df["type"] = df["type"].fillna("expense").astype("category")
+    df["is_split_parent"] = df["is_split_parent"].fillna(False).astype("bool")
+    return df[TRANSACTION_COLUMNS]
+
+
+def budgets_frame(rows: List[Dict]) -> pd.DataFrame:
+    """
+    Budget rows → typed frame; `month` is the first-of-month timestamp.
+    """
+    if not rows:
+        return pd.DataFrame({c: pd.Series(dtype="object") for c in BUDGET_COLUMNS}).astype(
+            {"amount": "float64"}
+        )
+
+    df = pd.DataFrame.from_records(rows)
+    for col in BUDGET_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+
+    df["month"] = _month_start(df["month"])
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).astype("float64")
+    df["category"] = _categories(df["category"])
+    df["type"] = df["type"].astype("category")
+    return df[BUDGET_COLUMNS]
+
+
+def actuals_frame(rows: List[Dict]) -> pd.DataFrame:
+    """
+    db.get_monthly_category_totals() rows → frame shaped like category_actuals().
+    """
+    if not rows:
+        return pd.DataFrame({c: pd.Series(dtype="object") for c in ACTUAL_COLUMNS}).astype(
+            {"actual": "float64"}
+        )
+
+    df = pd.DataFrame.from_records(rows, columns=ACTUAL_COLUMNS)
+    df["month"] = _month_start(df["month"])
+    df["category"] = _categories(df["category"])
+    df["actual"] = pd.to_numeric(df["actual"], errors="coerce").fillna(0.0).astype("float64")
+    return df.sort_values(["month", "category"], ignore_index=True)
+
+
+def totals_frame(rows: List[Dict]) -> pd.DataFrame:
+    """
+    db.get_monthly_income_expense() rows → one row per month with income,
+    expenses (abs of the spending total) and net.
+    """
+    if not rows:
+        return pd.DataFrame({c: pd.Series(dtype="float64") for c in TOTAL_COLUMNS}).astype(
+            {"month": "datetime64[ns]"}
+        )
+
+    df = pd.DataFrame.from_records(rows, columns=TOTAL_COLUMNS)
+    df["month"] = _month_start(df["month"])
+    for col in TOTAL_COLUMNS[1:]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype("float64")
+    return df.sort_values("month", ignore_index=True)
+
+
+def _month_bounds(months: List[Month]) -> Tuple[datetime.date, datetime.date]:
+    # [first month, month after the last) covering every month asked for
+    return datetime.date(*months[0], 1), add_months(datetime.date(*months[-1], 1), 1)
+
+
+def _only_months(df: pd.DataFrame, months: List[Month]) -> pd.DataFrame:
+    # One range read covers gaps between the months; trim back to them
+    wanted = pd.to_datetime([datetime.date(y, m, 1) for y, m in months])
+    return df[df["month"].isin(wanted)].reset_index(drop=True)
+
+
+def load_aggregates(months: Iterable[Month]) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    (actuals, totals, budgets) frames for the given (year, month) pairs,
+    from three concurrent reads of a few rows per month each.
+    """
+    months = sorted(set(months))
+    if not months:
+        return actuals_frame([]), totals_frame([]), budgets_frame([])
+
+    start, end = _month_bounds(months)
+    results = fetch_all(
+        {
+            "actuals": (get_monthly_category_totals, start, end),
+            "totals": (get_monthly_income_expense, start, end),
+            "budgets": (get_budgets_for_range, start, end),
+        }
+    )
+    return (
+        _only_months(actuals_frame(results["actuals"]), months),
+        _only_months(totals_frame(results["totals"]), months),
+        _only_months(budgets_frame(results["budgets"]), months),
+    )
+
+
+# -----------------------------
+# Aggregations
+# -----------------------------
+def _leaf_transactions(tx: pd.DataFrame) -> pd.DataFrame:
+    # Split parents are containers; counting them too would double count
+    return tx[~tx["is_split_parent"]]
+
+
+def category_actuals(tx: pd.DataFrame) -> pd.DataFrame:
+    """
+    Split-aware actuals: one row per (month, category) with `actual`.
+    """
+    leaves = _leaf_transactions(tx)
+    return (
+        leaves.groupby(["month", "category"], observed=True, sort=True)["amount"]
+        .sum()
+        .rename("actual")
+        .reset_index()
+    )
+
+
+def budget_totals(budgets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Planned income, expenses and net per month.
+    """
+    is_income = budgets["type"].astype("string") == "income"
+    totals = (
+        budgets.assign(
+            income=budgets["amount"].where(is_income, 0.0),
+            expenses=budgets["amount"].where(~is_income, 0.0),
+        )
+        .groupby("month", sort=True)[["income", "expenses"]]
+        .sum()
+    )
+    totals["net"] = totals["income"] - totals["expenses"]
+    return totals.reset_index()
+
+
+def budget_variance(actuals: pd.DataFrame, budgets: pd.DataFrame) -> pd.DataFrame:
+    """
+    Budget vs actual per (month, category), from category_actuals() /
+    actuals_frame() output:
+    columns month, category, budgeted, actual, difference (actual - budgeted).
+    """
+    planned = (
+        budgets.groupby(["month", "category"], sort=False)["amount"]
+        .sum()
+        .rename("budgeted")
+    )
+    actual = actuals.groupby(["month", "category"], sort=False)["actual"].sum()
+
+    table = pd.concat([planned, actual], axis=1).fillna(0.0).reset_index()
+    table = table[table["category"] != ""]
+    table["difference"] = table["actual"] - table["budgeted"]
+    return table.sort_values(["month", "category"], ignore_index=True)
+
+
+def spending_by_category(actuals: pd.DataFrame) -> pd.Series:
+    """
+    Positive actuals for non-income categories, indexed by category.
+    """
+    actuals = actuals.groupby("category")["actual"].sum()
+    mask = (actuals.index != "") & (actuals > 0) & ~actuals.index.isin(INCOME_CATEGORIES)
+    return actuals[mask]
+
+
+def budget_grid(budgets: pd.DataFrame, months: List[datetime.date]) -> pd.DataFrame:
+    """
+    Month × category pivot for the multi-month planner.
+    Index is (type, category); one column per month ("YYYY-MM"),
+    NaN where a category has no budget that month.
+    """
+    labels = [m.strftime("%Y-%m") for m in months]
+    if budgets.empty:
+        return pd.DataFrame(
+            columns=labels,
+            index=pd.MultiIndex.from_tuples([], names=["type", "category"]),
+            dtype="float64",
+        )
+
+    grid = budgets.assign(
+        type=budgets["type"].astype("string"),
+        label=budgets["month"].dt.strftime("%Y-%m"),
+    ).pivot_table(
+        index=["type", "category"],
+        columns="label",
+        values="amount",
+        aggfunc="sum",
+    )
+    return grid.reindex(columns=labels).rename_axis(columns=None).sort_index()
+
+
+def summarize_months(months: Iterable[Month]) -> Dict[str, pd.DataFrame]:
+    """
+    Everything the dashboard and planner show, for one or many months.
+    """
+    actuals, totals, budgets = load_aggregates(months)
+    return {
+        "actuals": actuals,
+        "budgets": budgets,
+        "totals": totals,
+        "planned": budget_totals(budgets),
+        "variance": budget_variance(actuals, budgets),
+    }
@@ -5,19 +5,35 @@ Single entry point for the Streamlit app.
 Handles:
 - Page routing via session_state.page
 - Top navigation bar
+
+Page modules (and the pandas/plotly they pull in) are imported on first
+navigation, not at startup.
 """
 
+from utils import startup
+
 import streamlit as st
 from utils.navigation import safe_rerun
 
-from app_pages.dashboard import show_dashboard
-from app_pages.accounts import show_accounts
-from app_pages.transactions import show_transactions
-from app_pages.add_transaction import show_add_transaction
-from app_pages.edit_transaction import show_edit_transaction
-from app_pages.budget_planner import show_budget_planner
-from app_pages.debug_splits import show_debug_splits
 from config import APP_VERSION
+from query_stats import query_log
+
+# page name → (module, render function), imported on first use
+PAGES = {
+    "dashboard": ("app_pages.dashboard", "show_dashboard"),
+    "accounts": ("app_pages.accounts", "show_accounts"),
+    "projection": ("app_pages.projection", "show_projection"),
+    "reconcile": ("app_pages.reconcile", "show_reconcile"),
+    "transactions": ("app_pages.transactions", "show_transactions"),
+    "add_transaction": ("app_pages.add_transaction", "show_add_transaction"),
+    "edit_transaction": ("app_pages.edit_transaction", "show_edit_transaction"),
+    "import_transactions": ("app_pages.import_transactions", "show_import_transactions"),
+    "backup": ("app_pages.backup", "show_backup"),
+    "recurring": ("app_pages.recurring", "show_recurring"),
+    "budgets": ("app_pages.budget_planner", "show_budget_planner"),
+    "diagnostics": ("app_pages.diagnostics", "show_diagnostics"),
+    "debug_splits": ("app_pages.debug_splits", "show_debug_splits"),
+}
 
 st.set_page_config(
     page_title="Lopez-Franks Budget App",
@@ -63,25 +79,43 @@ def render_navbar():
     # 🔥 Version label (this is the only addition)
     st.caption(f"Version {APP_VERSION}")
 
+    # Developer tools, out of the way of the main navigation
+    st.sidebar.markdown("**Developer tools**")
+    if st.sidebar.button("Diagnostics", key="nav_diagnostics"):
+        navigate_to("diagnostics")
+    if st.sidebar.button("Split debug", key="nav_debug_splits"):
+        navigate_to("debug_splits")
+
 def main():
+    # Queries made while rendering are attributed to this page
+    query_log.begin_rerun(st.session_state.page)
+    try:
+        render_page()
+    finally:
+        query_log.end_rerun()
+        startup.mark_first_render()
+
+
+def render_page():
     render_navbar()
 
     page = st.session_state.page
 
-    if page == "dashboard":
-        show_dashboard()
-    elif page == "accounts":
-        show_accounts()
-    elif page == "transactions":
-        show_transactions()
-    elif page == "add_transaction":
-        show_add_transaction()
-    elif page == "edit_transaction":
-        show_edit_transaction()
-    elif page == "budgets":
-        show_budget_planner()
-    else:
+    if page not in PAGES:
         st.error(f"Unknown page: {page}")
+        return
+
+    # Recurring transactions that came due since the last run (once a day).
+    # Never fatal: a missing recurring_rules table skips it, and a failed
+    # request is reported once and retried only after RECURRING_RETRY_SECONDS
+    try:
+        startup.import_module("db").materialize_recurring()
+    except RuntimeError as e:
+        st.warning(f"Recurring transactions could not be added: {e}")
+
+    module_name, function_name = PAGES[page]
+    show_page = getattr(startup.import_module(module_name), function_name)
+    show_page()
 
 if __name__ == "__main__":
     main()
@@ -1,41 +1,23 @@
 import streamlit as st
-from db import get_accounts, get_all_transactions
+from db import fetch_all, get_accounts, get_account_balances
+from utils.navigation import safe_rerun
 
 
 def show_accounts():
     st.header("Accounts")
 
-    accounts = get_accounts()
+    # Balances come from per-account monthly rollups kept current by
+    # every transaction write (split parents and transfers excluded).
+    data = fetch_all({"accounts": (get_accounts,), "balances": (get_account_balances,)})
+    accounts = data["accounts"]
     if not accounts:
         st.info("No accounts yet.")
         return
 
-    # Fetch all non-deleted, non-split-parent transactions
-    txs = [
-        t for t in get_all_transactions()
-        if not t.get("deleted")
-        and not t.get("is_split_parent")
-    ]
-
-    # Build a balance map
-    balances = {acc["id"]: 0.0 for acc in accounts}
-
-    for t in txs:
-        acc_id = t.get("account_id")
-        amt = float(t["amount"])
-        tx_type = t.get("type", "expense")
-
-        # Transfers will be handled in v1.2
-        if tx_type == "transfer":
-            continue
-
-        # Income increases the account balance
-        if tx_type == "income":
-            balances[acc_id] += amt
-
-        # Expenses decrease the account balance
-        else:
-            balances[acc_id] -= amt
+    balances = data["balances"]
+    if balances is None:
+        st.error("Account balances are unavailable right now. Try again shortly.")
+        return
 
     # Display account balances
     st.subheader("Account balances")
@@ -48,3 +30,11 @@ def show_accounts():
 
     st.markdown("---")
     st.write(f"**Total balance:** ${total_balance:,.2f}")
+
+    projection_col, reconcile_col, _ = st.columns([1, 1, 2])
+    if projection_col.button("Projected daily balance", key="accounts_projection"):
+        st.session_state.page = "projection"
+        safe_rerun()
+    if reconcile_col.button("Reconcile", key="accounts_reconcile"):
+        st.session_state.page = "reconcile"
+        safe_rerun()
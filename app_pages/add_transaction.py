@@ -1,6 +1,7 @@
 import streamlit as st
 import datetime
 from utils.navigation import safe_rerun
+from config import INCOME_CATEGORIES
 from db import get_accounts, insert_transaction
 
 
@@ -36,9 +37,7 @@ def show_add_transaction():
         category = (category_input or "").strip().lower() or None
 
         # Determine transaction type
-        income_categories = {"income", "paycheck", "deposit", "net paycheck"}
-
-        if category in income_categories:
+        if category in INCOME_CATEGORIES:
             tx_type = "income"
         else:
             tx_type = "expense"
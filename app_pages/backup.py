@@ -0,0 +1,136 @@
+import streamlit as st
+import datetime
+import os
+import tempfile
+
+from backup import (
+    EXPORT_TABLES,
+    FORMATS,
+    SNAPSHOT_SUFFIX,
+    available_formats,
+    export_table,
+    restore_snapshot,
+    verify_snapshot,
+    write_snapshot,
+)
+from utils.navigation import safe_rerun
+
+
+# ---------------------------------------------------------
+# Prepared downloads (st.session_state.backup_file)
+# ---------------------------------------------------------
+# Exports stream into a temporary file rather than memory; the latest one
+# is kept (path, download name, summary) until the next is prepared.
+def _prepare(suffix: str, write) -> None:
+    _discard()
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            summary = write(out)
+    except Exception:
+        os.remove(path)
+        raise
+    name = f"budget-{datetime.date.today().isoformat()}{suffix}"
+    st.session_state.backup_file = (path, name, summary)
+
+
+def _discard() -> None:
+    prepared = st.session_state.pop("backup_file", None)
+    if prepared and os.path.exists(prepared[0]):
+        os.remove(prepared[0])
+
+
+def _show_download() -> None:
+    prepared = st.session_state.get("backup_file")
+    if not prepared or not os.path.exists(prepared[0]):
+        return
+    path, name, summary = prepared
+    st.success(f"{name} ready: {summary} ({os.path.getsize(path) / 1e6:,.1f} MB)")
+    with open(path, "rb") as f:
+        st.download_button("⬇️ Download", f, file_name=name, key="backup_download")
+
+
+def show_backup():
+    st.header("Export & Backup")
+
+    if st.button("← Back to transactions", key="backup_back"):
+        st.session_state.page = "transactions"
+        safe_rerun()
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    st.subheader("Export a table")
+    col1, col2 = st.columns(2)
+    table = col1.selectbox("Table", EXPORT_TABLES, index=1, key="export_table")
+    fmt = col2.selectbox("Format", available_formats(), key="export_format")
+
+    if st.button("Prepare export", key="export_prepare"):
+        with st.spinner(f"Exporting {table}…"):
+            try:
+                _prepare(f"-{table}{FORMATS[fmt]}", lambda out: f"{export_table(table, fmt, out):,} rows")
+            except RuntimeError as e:
+                st.error(str(e))
+
+    # -----------------------------
+    # Backup
+    # -----------------------------
+    st.subheader("Backup")
+    st.caption("Every account, transaction, budget and rule, in one compressed snapshot that can be restored below.")
+
+    if st.button("Create backup", key="backup_create"):
+        with st.spinner("Backing up…"):
+            try:
+                _prepare(SNAPSHOT_SUFFIX, lambda out: f"{sum(write_snapshot(out)['rows'].values()):,} rows")
+            except RuntimeError as e:
+                st.error(str(e))
+
+    _show_download()
+
+    # -----------------------------
+    # Restore
+    # -----------------------------
+    st.subheader("Restore")
+    upload = st.file_uploader("Snapshot", type=["gz"], key="restore_file")
+    if not upload:
+        return
+
+    try:
+        info = verify_snapshot(upload)
+    except ValueError as e:
+        st.error(f"This snapshot can't be restored: {e}")
+        return
+
+    st.write(f"Snapshot from {info['created_at']} (version {info['app_version']}), checksums OK:")
+    st.table([{"table": t, "rows": n} for t, n in info["rows"].items()])
+    st.warning(
+        "Restoring merges this snapshot into the current data: rows with the same id are overwritten, "
+        "but rows added since the backup are kept and nothing is deleted. "
+        "Restore into an empty database to get exactly the snapshot back."
+    )
+
+    # Batches already loaded for this file, so a failed restore can resume
+    progress_key = (upload.name, upload.size)
+    if st.session_state.get("restore_progress", (None, 0))[0] != progress_key:
+        st.session_state.restore_progress = (progress_key, 0)
+    resume_from = st.session_state.restore_progress[1]
+
+    label = "Restore" if resume_from == 0 else f"Resume restore from batch {resume_from + 1}"
+    if not st.button(label, key="restore_run"):
+        return
+
+    progress = st.progress(resume_from / max(info["batches"], 1))
+    failed = None
+    for result in restore_snapshot(upload, resume_from):
+        if not result["success"]:
+            failed = result
+            break
+        st.session_state.restore_progress = (progress_key, result["batch"] + 1)
+        progress.progress((result["batch"] + 1) / info["batches"])
+
+    if failed:
+        st.error(f"Batch {failed['batch'] + 1} ({failed['table']}) failed: {failed['error']}")
+        st.info("Fix the problem and press resume: loaded batches are not written again.")
+    else:
+        st.session_state.restore_progress = (progress_key, 0)
+        st.success(f"Restored {sum(info['rows'].values()):,} rows.")
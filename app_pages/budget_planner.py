@@ -2,25 +2,226 @@ import streamlit as st
 import datetime
 import pandas as pd
 
+from aggregations import budget_grid, budget_totals, budgets_frame
 from db import (
+    apply_recurring_budgets,
+    copy_budgets,
+    get_pending_recurring_budgets,
+    get_recurring_occurrences,
     get_budgets_for_month,
+    get_budgets_for_range,
     upsert_budget,
-    supabase_url,
+    save_budget_changes,
+    get_supabase_url,
+    save_budget_rows,
 )
+from recurrence import TYPES
+from utils.dates import add_months, month_range
+from utils.navigation import safe_rerun
+
+BUDGET_TYPES = list(TYPES["budget"])
+
+
+def _diff_budget_rows(original: pd.DataFrame, edited: pd.DataFrame, section_type: str):
+    """
+    Compare the loaded rows with the data editor output.
+    Returns (upserts, delete_ids): new or changed rows to upsert, and ids
+    of rows that were removed or renamed (a rename is delete + insert,
+    because rows are upserted by category).
+    """
+    edited = edited.copy()
+    edited["category"] = edited["category"].astype("string").str.strip().str.lower()
+    edited["amount"] = pd.to_numeric(edited["amount"], errors="coerce").fillna(0.0)
+    edited = edited[edited["category"].fillna("") != ""]
+
+    if edited["category"].duplicated().any():
+        raise ValueError("Each category can only appear once.")
+
+    merged = edited.merge(
+        original[["id", "category", "amount"]],
+        on="id",
+        how="left",
+        suffixes=("", "_old"),
+    )
+    is_new = merged["category_old"].isna()
+    renamed = ~is_new & (merged["category"] != merged["category_old"])
+    changed = is_new | renamed | (merged["amount"] != merged["amount_old"])
+
+    kept_ids = set(merged.loc[~is_new, "id"])
+    removed = [i for i in original["id"] if i not in kept_ids]
+    delete_ids = removed + merged.loc[renamed, "id"].tolist()
+
+    upserts = merged.loc[changed, ["category", "amount"]].assign(type=section_type)
+    return upserts.to_dict("records"), delete_ids
+
+
+def _diff_budget_grid(rows, edited: pd.DataFrame, months):
+    """
+    Compare budget rows with the edited month × category grid.
+    Returns (upserts, deletes) for db.save_budget_rows(): every cell that
+    is new or changed, and every stored cell that was cleared or whose
+    category row was removed/renamed.
+    """
+    labels = {m.strftime("%Y-%m"): m.isoformat() for m in months}
+
+    stored = {
+        (str(r["category"]).strip().lower(), str(r["month"])[:10]): r
+        for r in rows
+    }
+
+    cells = edited.melt(
+        id_vars=["type", "category"], value_vars=list(labels), var_name="label", value_name="amount"
+    )
+    cells["category"] = cells["category"].astype("string").str.strip().str.lower()
+    cells = cells[cells["category"].fillna("") != ""].dropna(subset=["amount"])
+    cells["month"] = cells["label"].map(labels)
+    cells["type"] = cells["type"].fillna("budget")
+
+    upserts = []
+    kept = set()
+    for cell in cells[["category", "month", "amount", "type"]].to_dict("records"):
+        key = (cell["category"], cell["month"])
+        kept.add(key)
+        old = stored.get(key)
+        if old is None or float(old["amount"]) != float(cell["amount"]) or old["type"] != cell["type"]:
+            upserts.append(cell)
+
+    deletes = [
+        {"id": r["id"], "month": key[1]} for key, r in stored.items() if key not in kept
+    ]
+    return upserts, deletes
+
+
+def show_recurring_budgets(start: datetime.date, end: datetime.date, rows, key: str):
+    """
+    Recurring budgets due in [start, end) that haven't been planned yet,
+    with a button to write them.
+    """
+    pending = get_pending_recurring_budgets(start, end, rows)
+    if not pending:
+        return
+    with st.expander(f"{len(pending)} recurring budgets not applied yet"):
+        st.dataframe(
+            pd.DataFrame(pending)[["month", "type", "category", "amount"]],
+            use_container_width=True,
+            hide_index=True,
+        )
+        if st.button("Apply recurring budgets", key=key):
+            apply_recurring_budgets(start, end)
+            st.session_state.pop("budget_grid_editor", None)
+            for section_type in BUDGET_TYPES:
+                st.session_state.pop(f"editor_{section_type}", None)
+            st.success(f"Applied {len(pending)} recurring budgets.")
+            safe_rerun()
+
+
+def show_scheduled_transactions(start: datetime.date, end: datetime.date):
+    """
+    Recurring transactions due in [start, end) that aren't in the ledger
+    yet, to plan against.
+    """
+    scheduled = get_recurring_occurrences(start, end)
+    if not scheduled:
+        return
+    with st.expander(f"{len(scheduled)} recurring transactions scheduled"):
+        st.dataframe(
+            pd.DataFrame(scheduled)[["date", "type", "category", "description", "amount"]],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+
+def show_budget_grid(start: datetime.date, count: int):
+    """
+    Multi-month planner: one range query for the grid, one bulk write to save.
+    """
+    months = month_range(start, count)
+    end = add_months(start, count)
+
+    rows = get_budgets_for_range(start, end)
+    frame = budgets_frame(rows)
+    grid = budget_grid(frame, months)
+
+    show_recurring_budgets(start, end, rows, key="grid_recurring")
+    show_scheduled_transactions(start, end)
+
+    # Planned totals per month in one group-by
+    planned = budget_totals(frame)
+    if not planned.empty:
+        st.subheader("Planned Summary")
+        summary = planned.assign(month=planned["month"].dt.strftime("%Y-%m")).set_index("month")
+        money = st.column_config.NumberColumn(format="$%.2f")
+        st.dataframe(
+            summary.rename(columns={"income": "Income", "expenses": "Expenses", "net": "Net"}).T,
+            use_container_width=True,
+            column_config={label: money for label in summary.index},
+        )
+
+    st.markdown("---")
+
+    # Templates only fill categories not planned yet; existing cells are kept
+    if st.button(f"Copy previous {count} months into this view", key="grid_copy"):
+        copy_budgets(add_months(start, -count), start, count, overwrite=False)
+        st.session_state.pop("budget_grid_editor", None)
+        st.success("Budgets copied.")
+        safe_rerun()
+
+    editable = grid.reset_index()
+    edited = st.data_editor(
+        editable,
+        num_rows="dynamic",
+        hide_index=True,
+        column_config={
+            "type": st.column_config.SelectboxColumn("type", options=BUDGET_TYPES, required=True),
+        },
+        key="budget_grid_editor",
+    )
+
+    if st.button("Save budgets", key="grid_save"):
+        upserts, deletes = _diff_budget_grid(rows, edited, months)
+        if not upserts and not deletes:
+            st.info("No changes to save.")
+        else:
+            save_budget_rows(upserts, deletes)
+            st.session_state.pop("budget_grid_editor", None)
+            st.success(f"Saved {len(upserts)} changed and {len(deletes)} removed budget cells.")
+            safe_rerun()
 
 
 def show_budget_planner():
     st.title("Budget Planner")
 
-    st.write("SUPABASE URL:", supabase_url)
+    st.write("SUPABASE URL:", get_supabase_url())
+
+    if st.button("🔁 Recurring budgets and bills", key="budgets_recurring"):
+        st.session_state.page = "recurring"
+        safe_rerun()
 
     # Default to current month
     today = datetime.date.today()
     year = st.number_input("Year", value=today.year, step=1)
     month = st.number_input("Month", value=today.month, min_value=1, max_value=12)
 
+    view = st.radio("View", ["Month", "6 months", "Full year"], horizontal=True)
+    if view == "6 months":
+        show_budget_grid(datetime.date(int(year), int(month), 1), 6)
+        return
+    if view == "Full year":
+        show_budget_grid(datetime.date(int(year), 1, 1), 12)
+        return
+
+    this_month = datetime.date(int(year), int(month), 1)
+    if st.button("Copy last month's budgets", key="copy_last_month"):
+        copy_budgets(add_months(this_month, -1), this_month, 1, overwrite=False)
+        for section_type in BUDGET_TYPES:
+            st.session_state.pop(f"editor_{section_type}", None)
+        st.success("Budgets copied.")
+        safe_rerun()
+
     # Load budgets
     budgets = get_budgets_for_month(int(year), int(month))
+    show_recurring_budgets(this_month, add_months(this_month, 1), budgets, key="month_recurring")
+    show_scheduled_transactions(this_month, add_months(this_month, 1))
 
     # Convert to DataFrame for easier manipulation
     if budgets:
@@ -36,9 +237,10 @@ def show_budget_planner():
     # Summary (Income / Expenses / Net)
     # ---------------------------------------------------------
     if not df.empty:
-        income_total = df[df["type"] == "income"]["amount"].sum()
-        expense_total = df[df["type"] != "income"]["amount"].sum()
-        net_total = income_total - expense_total
+        planned = budget_totals(budgets_frame(budgets))
+        income_total = float(planned["income"].sum())
+        expense_total = float(planned["expenses"].sum())
+        net_total = float(planned["net"].sum())
 
         st.subheader("Planned Summary")
 
@@ -65,30 +267,34 @@ def show_budget_planner():
         # IMPORTANT: keep id internally, but hide it from the UI
         internal_df = section_df[["id", "category", "amount"]].copy()
 
-        # Show only category + amount to the user
+        # Show only category + amount to the user; id rides along hidden
+        # so added rows (id empty) and deleted rows can be told apart
         edited_df = st.data_editor(
-            internal_df.drop(columns=["id"]), # hide id from UI
+            internal_df,
             num_rows="dynamic",
+            column_config={"id": None},
+            hide_index=True,
             key=f"editor_{section_type}",
         )
 
-        # Reattach id after editing
-        edited_df = edited_df.join(internal_df["id"], how="left")
-
         col1, col2 = st.columns([1, 1])
 
-        # Save changes
+        # Save changes: only inserted / changed / deleted rows, in bulk
         if col1.button(f"Save {title}", key=f"save_{section_type}"):
-            for _, row in edited_df.iterrows():
-                upsert_budget(
-                    id=row["id"], # <-- this is the critical fix 
-                    category=row["category"], 
-                    year=int(year), 
-                    month=int(month), 
-                    amount=float(row["amount"]), 
-                    btype=section_type,
-                )
-            st.success(f"{title} saved.")
+            try:
+                upserts, delete_ids = _diff_budget_rows(internal_df, edited_df, section_type)
+            except ValueError as e:
+                st.error(str(e))
+                return
+
+            if not upserts and not delete_ids:
+                st.info("No changes to save.")
+            else:
+                save_budget_changes(int(year), int(month), upserts, delete_ids)
+                st.success(f"{title} saved.")
+                # Drop the editor's pending edits; they're in the data now
+                st.session_state.pop(f"editor_{section_type}", None)
+                safe_rerun()
 
         # Add new row
         with col2:
@@ -113,7 +319,7 @@ def show_budget_planner():
                             btype=section_type,
                         )
                         st.success(f"{title} added.")
-                        st.experimental_rerun()
+                        safe_rerun()
 
         st.markdown("---")
 
@@ -3,10 +3,9 @@ import datetime
 import pandas as pd
 import plotly.express as px
 
-from db import (
-    get_transactions_for_month,
-    get_monthly_budget_totals_by_category,
-)
+from aggregations import summarize_months, spending_by_category
+from db import get_recurring_occurrences
+from utils.dates import add_months
 
 
 def show_dashboard():
@@ -19,45 +18,41 @@ def show_dashboard():
     year = int(year)
     month = int(month)
 
-    # Load data
-    txs = get_transactions_for_month(year, month)
-    budgets = get_monthly_budget_totals_by_category(year, month)
+    # Load data (pre-aggregated actuals and totals, plus budgets)
+    summary = summarize_months([(year, month)])
+    actuals = summary["actuals"]
+
+    # Recurring transactions due later in the month aren't actuals yet
+    first = datetime.date(year, month, 1)
+    scheduled = get_recurring_occurrences(first, add_months(first, 1))
+    if scheduled:
+        with st.expander(
+            f"{len(scheduled)} recurring transactions still scheduled this month "
+            f"(${sum(tx['amount'] for tx in scheduled):,.2f})"
+        ):
+            st.dataframe(
+                pd.DataFrame(scheduled)[["date", "description", "category", "type", "amount"]],
+                use_container_width=True,
+                hide_index=True,
+                column_config={"amount": st.column_config.NumberColumn(format="$%.2f")},
+            )
 
-    if not txs and not budgets:
+    if actuals.empty and summary["budgets"].empty:
         st.info("No data for this month yet.")
         return
 
     # ---------------------------------------------------------
-    # Actuals by category + income/expense totals
+    # Overview metrics (split-aware: parents skipped, children counted)
     # ---------------------------------------------------------
-    actuals = {}
-    income_total = 0.0
-    expense_total = 0.0
-
-    for t in txs:
-        cat = (t.get("category") or "").lower()
-        amt = float(t["amount"])
-        tx_type = t.get("type", "expense")  # default to expense
-
-        # Track category totals
-        actuals[cat] = actuals.get(cat, 0.0) + amt
-
-        # Income vs expense logic (your version: expenses are positive → use abs)
-        if tx_type == "income":
-            income_total += amt
-        else:
-            expense_total += amt  # still positive, so abs() later
+    totals = summary["totals"]
+    income_total = float(totals["income"].sum())
+    expense_total = float(totals["expenses"].sum())
+    net = float(totals["net"].sum())
 
-    # Your requested logic: keep abs() for expenses
-    net = income_total - abs(expense_total)
-
-    # ---------------------------------------------------------
-    # Overview metrics
-    # ---------------------------------------------------------
     st.subheader("Overview")
     col1, col2, col3 = st.columns(3)
     col1.metric("Income", f"${income_total:,.2f}")
-    col2.metric("Spending", f"${abs(expense_total):,.2f}")
+    col2.metric("Spending", f"${expense_total:,.2f}")
     col3.metric("Net", f"${net:,.2f}")
 
     # ---------------------------------------------------------
@@ -66,55 +61,39 @@ def show_dashboard():
     st.markdown("---")
     st.subheader("Budget vs actual by category")
 
-    categories = sorted(
-        c for c in set(list(actuals.keys()) + list(budgets.keys())) if c
-    )
-
-    rows = []
-    for cat in categories:
-        b = budgets.get(cat, 0.0)
-        a = actuals.get(cat, 0.0)
-        diff = a - b
-        rows.append(
-            {
-                "Category": cat,
-                "Budgeted": b,
-                "Actual": a,
-                "Difference": diff,
+    variance = summary["variance"]
+
+    if not variance.empty:
+        df_display = variance[["category", "budgeted", "actual", "difference"]].rename(
+            columns={
+                "category": "Category",
+                "budgeted": "Budgeted",
+                "actual": "Actual",
+                "difference": "Difference",
             }
         )
-
-    if rows:
-        df = pd.DataFrame(rows)
-        df_display = df.copy()
-        df_display["Budgeted"] = df_display["Budgeted"].map(lambda x: f"${x:,.2f}")
-        df_display["Actual"] = df_display["Actual"].map(lambda x: f"${x:,.2f}")
-        df_display["Difference"] = df_display["Difference"].map(
-            lambda x: f"${x:,.2f}"
+        money = st.column_config.NumberColumn(format="$%.2f")
+        st.dataframe(
+            df_display,
+            use_container_width=True,
+            hide_index=True,
+            column_config={"Budgeted": money, "Actual": money, "Difference": money},
         )
-        st.dataframe(df_display, use_container_width=True)
 
         # ---------------------------------------------------------
         # Pie Chart (Actual Spending Only)
         # ---------------------------------------------------------
         st.markdown("**Spending by category (actuals only)**")
-        
+
         # Filter: only expense categories (exclude income)
-        expense_cats = {
-            cat: val for cat, val in actuals.items()
-            if cat and val > 0 and cat not in ["income", "net paycheck"]
-        }
-        
-        if expense_cats:
-            labels = list(expense_cats.keys())
-            sizes = [abs(v) for v in expense_cats.values()]
-        
+        expense_cats = spending_by_category(actuals)
+
+        if not expense_cats.empty:
             fig = px.pie(
-                names=labels,
-                values=sizes,
+                names=expense_cats.index,
+                values=expense_cats.abs().values,
                 title="Spending by Category",
                 hole=0.0,  # set to 0.4 for donut style
             )
-        
-            st.plotly_chart(fig, use_container_width=True)
 
+            st.plotly_chart(fig, use_container_width=True)
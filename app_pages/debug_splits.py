@@ -1,12 +1,13 @@
 import streamlit as st
-from db import get_all_transactions, get_child_transactions
+from db import get_split_parents, get_split_index
 
 
 def show_debug_splits():
     st.header("Debug: split transactions")
 
-    txs = get_all_transactions()
-    parents = [t for t in txs if t.get("is_split_parent", False)]
+    # Two queries total: parents, then all their children at once
+    parents = get_split_parents()
+    children_by_parent = get_split_index(parents)
 
     st.write(f"Found {len(parents)} split parent transactions.")
 
@@ -24,7 +25,7 @@ def show_debug_splits():
             }
         )
 
-        children = get_child_transactions(p["id"])
+        children = children_by_parent.get(p["id"], [])
         st.write(f"Children ({len(children)}):")
         for c in children:
             st.write(
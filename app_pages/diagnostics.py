@@ -0,0 +1,111 @@
+import streamlit as st
+import pandas as pd
+
+from query_stats import query_log
+from supabase_client import breaker
+from utils import startup
+from utils.navigation import safe_rerun
+
+
+def show_diagnostics():
+    st.header("Diagnostics: queries per rerun")
+
+    reruns = query_log.reruns()
+    queries = query_log.queries()
+
+    st.caption(
+        f"Budget per rerun: {query_log.budget_count} queries / "
+        f"{query_log.budget_ms:,.0f} ms in queries. "
+        f"Holding the last {len(reruns)} reruns and {len(queries)} queries."
+    )
+
+    health = breaker.snapshot()
+    if health["state"] == "closed":
+        st.success("Backend: healthy")
+    else:
+        st.warning(
+            f"Backend: circuit {health['state']} after {health['consecutive_failures']} "
+            "failed requests; cached data is being served."
+        )
+
+    col1, col2 = st.columns([1, 1])
+    col1.download_button(
+        "Export JSON lines",
+        data=query_log.to_jsonl(),
+        file_name="query_log.jsonl",
+        mime="application/jsonl",
+    )
+    if col2.button("Clear log", key="diag_clear"):
+        query_log.clear()
+        safe_rerun()
+
+    # ---------------------------------------------------------
+    # Cold start (this server process)
+    # ---------------------------------------------------------
+    st.subheader("Startup")
+    report = startup.report()
+    if report["first_render_ms"] is not None:
+        st.write(f"First render finished {report['first_render_ms']:,.0f} ms after app.py started.")
+    if report["costs"]:
+        st.dataframe(
+            pd.Series(report["costs"], name="ms").sort_values(ascending=False).rename_axis("first use of"),
+            use_container_width=True,
+        )
+
+    if not reruns:
+        st.info("No reruns recorded yet. Open a few pages, then come back.")
+        return
+
+    df = pd.DataFrame(reruns)
+    df["warnings"] = df["warnings"].map("; ".join)
+
+    # ---------------------------------------------------------
+    # Reruns over budget
+    # ---------------------------------------------------------
+    over = df[df["warnings"] != ""]
+    st.subheader("Over budget")
+    if over.empty:
+        st.success("No rerun went over the query budget.")
+    else:
+        st.dataframe(
+            over[["rerun", "started", "page", "queries", "query_ms", "total_ms", "warnings"]].iloc[::-1],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    # ---------------------------------------------------------
+    # Per page
+    # ---------------------------------------------------------
+    st.subheader("By page")
+    by_page = df.groupby("page").agg(
+        reruns=("rerun", "count"),
+        avg_queries=("queries", "mean"),
+        max_queries=("queries", "max"),
+        avg_query_ms=("query_ms", "mean"),
+        p95_total_ms=("total_ms", lambda s: s.quantile(0.95)),
+        avg_kb=("bytes", lambda s: s.mean() / 1024),
+    )
+    st.dataframe(by_page.round(1), use_container_width=True)
+
+    st.subheader("Recent reruns")
+    st.dataframe(
+        df[["rerun", "started", "page", "queries", "query_ms", "total_ms", "rows", "bytes", "errors"]]
+        .iloc[::-1]
+        .head(100),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    # ---------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------
+    if queries:
+        q = pd.DataFrame(queries)
+        st.subheader("Slowest queries")
+        st.dataframe(
+            q.sort_values("ms", ascending=False).head(25)[
+                ["at", "page", "target", "method", "ms", "rows", "bytes", "success", "error"]
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
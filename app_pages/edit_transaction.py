@@ -1,6 +1,7 @@
 import streamlit as st
-from db import get_transaction_by_id, update_transaction, get_accounts
+from db import fetch_all, get_transaction_by_id, update_transaction, get_accounts
 from utils.navigation import safe_rerun
+from config import INCOME_CATEGORIES
 
 
 def show_edit_transaction():
@@ -9,14 +10,16 @@ def show_edit_transaction():
         st.error("No transaction selected.")
         return
 
-    tx = get_transaction_by_id(tx_id)
+    # Both reads at once
+    data = fetch_all({"tx": (get_transaction_by_id, tx_id), "accounts": (get_accounts,)})
+    tx = data["tx"]
     if not tx:
         st.error("Transaction not found.")
         return
 
     st.header("Edit transaction")
 
-    accounts = get_accounts()
+    accounts = data["accounts"]
     account_names = [a["name"] for a in accounts]
     account_map = {a["name"]: a["id"] for a in accounts}
 
@@ -38,8 +41,7 @@ def show_edit_transaction():
     if col1.button("Save changes"):
         category = (category_input or "").strip().lower()
 
-        income_categories = {"income", "paycheck", "deposit", "net paycheck"}
-        tx_type = "income" if category in income_categories else "expense"
+        tx_type = "income" if category in INCOME_CATEGORIES else "expense"
 
         update_transaction(
             tx_id,
@@ -1,50 +1,219 @@
 import streamlit as st
 import pandas as pd
+from itertools import islice
 from utils.navigation import safe_rerun
-from db import insert_transaction, apply_category_rules
+from db import get_accounts, insert_transactions_in_batches, query_transactions
+from categorizer import load_rules
+from ofx import RECORD_FIELDS, read_transactions, statement_accounts
+from importer import (
+    DUPLICATE,
+    DUPLICATE_COLUMNS,
+    NEW,
+    SUSPECT,
+    DuplicateIndex,
+    normalize_chunk,
+    read_csv_chunks,
+    read_ofx_chunks,
+    to_records,
+)
+from config import IMPORT_BATCH_SIZE, IMPORT_CHUNK_ROWS
+
+# Skipped / suspected rows shown in the duplicate preview
+PREVIEW_ROWS = 200
+
+
+def _existing_transactions(start, end):
+    # Imports create top-level rows; split children would never match
+    return query_transactions(split="top", start=start, end=end, columns=DUPLICATE_COLUMNS)
+
+
+def _classified_chunks(file, read_chunks, normalize, index: DuplicateIndex):
+    """
+    (rows, rejected, labels) per chunk of the upload, labels from one
+    DuplicateIndex over the whole file.
+    """
+    file.seek(0)
+    for chunk in read_chunks(file, IMPORT_CHUNK_ROWS):
+        rows, bad = normalize(chunk)
+        yield rows, bad, index.classify(rows)
+
+
+def _statement_accounts(file):
+    # One streaming pass over the statement; kept for reruns on the same upload
+    key = (file.name, file.size)
+    cached = st.session_state.get("import_ofx_accounts")
+    if not cached or cached[0] != key:
+        file.seek(0)
+        cached = (key, statement_accounts(file))
+        file.seek(0)
+        st.session_state.import_ofx_accounts = cached
+    return cached[1]
+
+
+def _map_statement_accounts(file, accounts):
+    """
+    {lower-cased ACCTID: account id} from one selectbox per statement in
+    the file, each defaulting to an account whose name ends in the same
+    last four digits.
+    """
+    names = [a["name"] for a in accounts]
+    ids = {a["name"]: a["id"] for a in accounts}
+    mapping = {}
+    for acctid in _statement_accounts(file) or [""]:
+        suffix = acctid[-4:]
+        default = next((i for i, n in enumerate(names) if suffix and n.rstrip().endswith(suffix)), 0)
+        label = f"Import statement for …{suffix} into" if acctid else "Import into"
+        name = st.selectbox(label, names, index=default, key=f"import_ofx_account_{acctid}")
+        mapping[acctid.strip().lower()] = ids[name]
+    return mapping
 
 
 def show_import_transactions():
     st.header("Import Transactions")
 
-    file = st.file_uploader("Upload CSV", type=["csv"])
+    accounts = get_accounts()
+    if not accounts:
+        st.error("You must create an account first.")
+        return
+
+    file = st.file_uploader("Upload CSV, OFX or QFX", type=["csv", "ofx", "qfx"])
     if not file:
         return
 
-    df = pd.read_csv(file)
-    st.write("Preview:")
-    st.dataframe(df.head())
+    if file.name.lower().endswith((".ofx", ".qfx")):
+        # Bank statement: fixed fields, signed amounts, one account per statement
+        preview = pd.DataFrame.from_records(islice(read_transactions(file), 5), columns=list(RECORD_FIELDS))
+        file.seek(0)
+        st.write("Preview:")
+        st.dataframe(preview)
+
+        st.subheader("Accounts")
+        read_chunks = read_ofx_chunks
+        date_col, amount_col, desc_col = "date", "amount", "description"
+        category_col, account_col = "None", "account"
+        account_ids = _map_statement_accounts(file, accounts)
+        default_account_id = next(iter(account_ids.values()))
+        negative_is_expense = True
+    else:
+        # Only the first rows are needed for preview and column mapping
+        preview = pd.read_csv(file, nrows=5, dtype=str)
+        file.seek(0)
+        st.write("Preview:")
+        st.dataframe(preview)
 
-    st.subheader("Column Mapping")
+        st.subheader("Column Mapping")
 
-    columns = df.columns.tolist()
+        columns = preview.columns.tolist()
+        read_chunks = read_csv_chunks
 
-    date_col = st.selectbox("Date Column", columns)
-    amount_col = st.selectbox("Amount Column", columns)
-    desc_col = st.selectbox("Description Column", columns)
-    category_col = st.selectbox("Category Column (optional)", ["None"] + columns)
-    account_col = st.selectbox("Account Column (optional)", ["None"] + columns)
+        date_col = st.selectbox("Date Column", columns)
+        amount_col = st.selectbox("Amount Column", columns)
+        desc_col = st.selectbox("Description Column", columns)
+        category_col = st.selectbox("Category Column (optional)", ["None"] + columns)
+        account_col = st.selectbox("Account Column (optional)", ["None"] + columns)
+
+        account_names = [a["name"] for a in accounts]
+        default_account = st.selectbox("Default account", account_names)
+        default_account_id = next(a["id"] for a in accounts if a["name"] == default_account)
+        account_ids = {a["name"].strip().lower(): a["id"] for a in accounts}
+
+        negative_is_expense = st.checkbox(
+            "Negative amounts are expenses (bank export sign convention)", value=False
+        )
+    use_rules = st.checkbox("Categorize rows without a category using category rules", value=True)
+    batch_size = st.number_input(
+        "Rows per insert request", min_value=1, max_value=5000, value=IMPORT_BATCH_SIZE, step=100
+    )
+
+    import_suspects = st.checkbox(
+        "Also import suspected duplicates (same date, amount and account, different description)",
+        value=False,
+    )
+
+    def normalize(chunk):
+        return normalize_chunk(
+            chunk,
+            date_col,
+            amount_col,
+            desc_col,
+            None if category_col == "None" else category_col,
+            None if account_col == "None" else account_col,
+            account_ids,
+            default_account_id,
+            negative_is_expense,
+            load_rules() if use_rules else None,
+        )
+
+    # ---------------------------------------------------------
+    # Duplicate preview (nothing is written)
+    # ---------------------------------------------------------
+    if st.button("Check for duplicates"):
+        counts = {NEW: 0, DUPLICATE: 0, SUSPECT: 0}
+        flagged = {DUPLICATE: [], SUSPECT: []}
+        index = DuplicateIndex(_existing_transactions)
+        for rows, _, labels in _classified_chunks(file, read_chunks, normalize, index):
+            for label, n in labels.value_counts().items():
+                counts[label] += int(n)
+            for label, shown in flagged.items():
+                if sum(len(f) for f in shown) < PREVIEW_ROWS:
+                    shown.append(rows[labels == label].head(PREVIEW_ROWS))
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("New", f"{counts[NEW]:,}")
+        col2.metric("Already imported (skipped)", f"{counts[DUPLICATE]:,}")
+        col3.metric("Suspected duplicates", f"{counts[SUSPECT]:,}")
+
+        for label, title in ((DUPLICATE, "Skipped duplicates"), (SUSPECT, "Suspected duplicates")):
+            if counts[label]:
+                st.write(f"{title} (first {PREVIEW_ROWS}):")
+                st.dataframe(
+                    pd.concat(flagged[label]).head(PREVIEW_ROWS)[["date", "amount", "description", "category"]],
+                    use_container_width=True,
+                    hide_index=True,
+                )
 
     if st.button("Import"):
-        for _, row in df.iterrows():
-            category = None
-            if category_col != "None":
-                category = row[category_col]
+        progress = st.progress(0.0)
+        status = st.empty()
+        imported = 0
+        rejected = 0
+        skipped = 0
+        batches = 0
+        failed = []
+        keep = {NEW, SUSPECT} if import_suspects else {NEW}
+        index = DuplicateIndex(_existing_transactions)
+
+        for rows, bad, labels in _classified_chunks(file, read_chunks, normalize, index):
+            rejected += len(bad)
+            wanted = labels.isin(keep)
+            skipped += int((~wanted).sum())
+            rows = rows[wanted]
+
+            size = int(batch_size)
+            for result in insert_transactions_in_batches(to_records(rows), size):
+                batches += 1
+                if result["success"]:
+                    imported += result["rows"]
+                else:
+                    failed.append((batches, result))
 
-            auto_category = apply_category_rules(row[desc_col])
-            category = auto_category or category or "Uncategorized"
+            progress.progress(min(file.tell() / max(file.size, 1), 1.0))
+            status.write(f"Imported {imported:,} rows…")
 
-            insert_transaction({
-                "date": row[date_col],
-                "amount": float(row[amount_col]),
-                "description": row[desc_col],
-                "category": category,
-                "account": row[account_col] if account_col != "None" else "Checking"
-            })
+        progress.progress(1.0)
 
-        st.success("Imported!")
+        if rejected:
+            st.warning(f"Skipped {rejected:,} rows with an unreadable date or amount.")
+        if skipped:
+            st.info(f"Skipped {skipped:,} rows already in the ledger (or suspected to be).")
+        for batch_no, result in failed:
+            st.error(f"Batch {batch_no} ({result['rows']} rows) failed: {result['error']}")
+
+        if failed:
+            return
+
+        st.success(f"Imported {imported:,} transactions.")
 
         # rerun required to return to transactions
         st.session_state.page = "transactions"
         safe_rerun()
-
@@ -0,0 +1,75 @@
+import streamlit as st
+import datetime
+
+from config import PROJECTION_DAYS
+from db import get_accounts, get_recurring_occurrences
+from projection import load_projection
+
+HORIZONS = {"30 days": 30, "90 days": 90, "6 months": 182, "1 year": 365, "2 years": 730}
+
+
+def show_projection():
+    st.header("Projected daily balance")
+
+    accounts = get_accounts()
+    if not accounts:
+        st.info("No accounts yet.")
+        return
+    names = {a["id"]: a["name"] for a in accounts}
+
+    labels = list(HORIZONS)
+    default = next((i for i, days in enumerate(HORIZONS.values()) if days >= PROJECTION_DAYS), 0)
+    days = HORIZONS[st.selectbox("Horizon", labels, index=default)]
+
+    today = datetime.date.today()
+    # Recurring bills not in the ledger yet are projected on their due dates
+    recurring = get_recurring_occurrences(today, today + datetime.timedelta(days=days))
+    try:
+        result = load_projection(today, days, extra_flows=recurring)
+    except RuntimeError as e:
+        st.error(f"The projection can't be shown: {e}. Try again shortly.")
+        return
+    summary = result["summary"]
+    balances = result["balances"].rename(columns=names)
+
+    # ---------------------------------------------------------
+    # Safe to spend today
+    # ---------------------------------------------------------
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Balance today", f"${summary['today'].sum():,.2f}")
+    col2.metric("Lowest ahead", f"${balances.sum(axis=1).min():,.2f}")
+    col3.metric("True extra (safe to spend)", f"${summary['true_extra'].sum():,.2f}")
+
+    st.line_chart(balances.assign(Total=balances.sum(axis=1)))
+
+    st.subheader("By account")
+    table = summary.rename(index=names).reset_index().rename(
+        columns={
+            "account_id": "Account",
+            "today": "Today",
+            "lowest": "Lowest",
+            "lowest_on": "Lowest on",
+            "end": f"In {days} days",
+            "required": "Required minimum",
+            "true_extra": "True extra",
+        }
+    )
+    money = st.column_config.NumberColumn(format="$%.2f")
+    st.dataframe(
+        table,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            c: money for c in ("Today", "Lowest", f"In {days} days", "Required minimum", "True extra")
+        },
+    )
+
+    # ---------------------------------------------------------
+    # Lowest balance of each month
+    # ---------------------------------------------------------
+    st.subheader("Lowest balance of the month")
+    monthly = result["monthly"]
+    grid = monthly.assign(
+        month=monthly["month"].astype(str), account=monthly["account_id"].map(names)
+    ).pivot(index="month", columns="account", values="lowest")
+    st.dataframe(grid.style.format("${:,.2f}"), use_container_width=True)
@@ -0,0 +1,133 @@
+import streamlit as st
+import datetime
+
+from db import balance_delta, get_accounts, get_reconcile_transactions, set_cleared
+from utils.navigation import safe_rerun
+
+RECONCILE_COLUMNS = ("id", "date", "amount", "type", "description", "account_id", "is_split_parent", "cleared")
+
+
+# ---------------------------------------------------------
+# Working session (st.session_state.recon)
+# ---------------------------------------------------------
+# Checkmarks are staged here and the cleared total kept current by adding
+# or subtracting one row's amount per click; nothing is written until the
+# session is finished, in a single set_cleared() call. A failed read raises
+# RuntimeError: it must not look like an account with nothing to clear.
+def _start_session(account_id: str):
+    rows = get_reconcile_transactions(account_id, columns=RECONCILE_COLUMNS)
+    pending = [t for t in rows if not t.get("cleared")]
+    deltas = {t["id"]: balance_delta(t) for t in pending}
+    st.session_state.recon = {
+        "account_id": account_id,
+        "rows": pending,
+        "deltas": deltas,
+        "staged": set(),
+        "cleared": sum(balance_delta(t) for t in rows if t.get("cleared")),
+    }
+    for key in [k for k in st.session_state if str(k).startswith("recon_tx_")]:
+        del st.session_state[key]
+
+
+def _toggle(tx_id: str):
+    recon = st.session_state.recon
+    delta = recon["deltas"][tx_id]
+    if st.session_state[f"recon_tx_{tx_id}"]:
+        recon["staged"].add(tx_id)
+        recon["cleared"] += delta
+    else:
+        recon["staged"].discard(tx_id)
+        recon["cleared"] -= delta
+
+
+def _commit(recon, message: str) -> None:
+    count = set_cleared(sorted(recon["staged"]), True)
+    st.session_state.pop("recon", None)
+    # Shown after the rerun (st.success before safe_rerun() never renders)
+    st.session_state.recon_message = message.format(count=count)
+
+
+def show_reconcile():
+    st.header("Reconcile Account")
+
+    message = st.session_state.pop("recon_message", None)
+    if message:
+        st.success(message)
+
+    accounts = get_accounts()
+    if not accounts:
+        st.info("No accounts yet.")
+        return
+
+    names = {a["id"]: a["name"] for a in accounts}
+    account_id = st.selectbox("Account", list(names), format_func=names.get, key="recon_account")
+
+    recon = st.session_state.get("recon")
+    if recon is None or recon["account_id"] != account_id:
+        try:
+            _start_session(account_id)
+        except RuntimeError as e:
+            st.session_state.pop("recon", None)
+            st.error(f"Transactions can't be reconciled: {e}")
+            return
+        recon = st.session_state.recon
+
+    col1, col2 = st.columns(2)
+    statement_date = col1.date_input("Statement date", value=datetime.date.today(), key="recon_date")
+    statement_balance = col2.number_input(
+        "Statement ending balance", value=0.0, step=0.01, format="%.2f", key="recon_balance"
+    )
+
+    # Uncleared rows up to the statement date: the list below
+    through = statement_date.isoformat()
+    shown = [t for t in recon["rows"] if str(t["date"])[:10] <= through]
+
+    # ---------------------------------------------------------
+    # Totals (cleared includes the rows checked this session;
+    # uncleared covers the same rows as the list)
+    # ---------------------------------------------------------
+    difference = statement_balance - recon["cleared"]
+    uncleared = sum(recon["deltas"][t["id"]] for t in shown if t["id"] not in recon["staged"])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Cleared balance", f"${recon['cleared']:,.2f}")
+    col2.metric("Uncleared", f"${uncleared:,.2f}")
+    col3.metric("Difference to statement", f"${difference:,.2f}")
+
+    balanced = abs(difference) < 0.005
+    finish_col, save_col, discard_col = st.columns(3)
+    try:
+        if finish_col.button("Finish reconciliation", key="recon_finish", disabled=not balanced):
+            _commit(recon, "Reconciled: {count} transactions marked cleared.")
+            safe_rerun()
+        if save_col.button("Save cleared marks", key="recon_save", disabled=not recon["staged"]):
+            _commit(recon, "Saved: {count} transactions marked cleared.")
+            safe_rerun()
+        if discard_col.button("Discard changes", key="recon_discard", disabled=not recon["staged"]):
+            _start_session(account_id)
+            safe_rerun()
+    except RuntimeError as e:
+        st.error(str(e))
+        return
+
+    if not balanced:
+        st.caption(f"{len(recon['staged'])} checked this session; finish is enabled once the difference is $0.00.")
+
+    # ---------------------------------------------------------
+    # Uncleared transactions up to the statement date
+    # ---------------------------------------------------------
+    st.subheader("Uncleared transactions")
+    if not shown:
+        st.info("Nothing left to clear up to the statement date.")
+        return
+
+    for t in shown:
+        col1, col2, col3 = st.columns([4, 2, 1])
+        col1.write(f"{t['date']} — {t.get('description') or ''}")
+        col2.write(f"${recon['deltas'][t['id']]:,.2f}")
+        col3.checkbox(
+            "Clear",
+            value=t["id"] in recon["staged"],
+            key=f"recon_tx_{t['id']}",
+            on_change=_toggle,
+            args=(t["id"],),
+        )
@@ -0,0 +1,133 @@
+import streamlit as st
+import datetime
+import pandas as pd
+
+from db import add_recurring_rule, delete_recurring_rule, get_accounts, get_recurring_rules, update_recurring_rule
+from recurrence import FREQUENCIES, KINDS, TYPES
+from utils.navigation import safe_rerun
+
+RULE_COLUMNS = ["kind", "type", "description", "category", "amount", "frequency", "interval", "start_date", "end_date"]
+
+
+def _rule_label(rule, names) -> str:
+    what = rule.get("description") or rule.get("category") or rule["kind"]
+    where = f" · {names[rule['account_id']]}" if rule.get("account_id") in names else ""
+    return f"{what} — ${float(rule['amount']):,.2f} {rule['frequency']}{where}"
+
+
+def show_add_rule(accounts):
+    st.subheader("New recurring rule")
+    kind = st.radio("Kind", KINDS, horizontal=True, key="recurring_kind")
+
+    col1, col2 = st.columns(2)
+    # No default type: each kind has its own (budget rules need a planner section)
+    rule_type = col1.selectbox("Type", TYPES[kind], key=f"recurring_type_{kind}")
+    amount = col2.number_input("Amount", value=0.0, step=10.0, key="recurring_amount")
+    description = col1.text_input("Description", key="recurring_description")
+    category = col2.text_input("Category", key="recurring_category")
+
+    account_id = None
+    if kind == "transaction":
+        names = {a["name"]: a["id"] for a in accounts}
+        account_id = names[st.selectbox("Account", list(names), key="recurring_account")]
+
+    col1, col2 = st.columns(2)
+    frequency = col1.selectbox("Frequency", list(FREQUENCIES), index=3, key="recurring_frequency")
+    interval = col2.number_input("Every", min_value=1, value=1, step=1, key="recurring_interval")
+    start_date = col1.date_input("Starts", datetime.date.today(), key="recurring_start")
+    has_end = col2.checkbox("Ends", key="recurring_has_end")
+    end_date = col2.date_input("Last date", start_date, key="recurring_end") if has_end else None
+
+    if st.button("Add rule", key="recurring_add"):
+        if amount == 0.0:
+            st.error("Amount cannot be zero.")
+            return
+        if kind == "budget" and not category.strip():
+            st.error("Budget rules need a category.")
+            return
+        try:
+            add_recurring_rule(
+                {
+                    "kind": kind,
+                    "type": rule_type,
+                    "description": description or None,
+                    "category": category or None,
+                    "amount": amount,
+                    "account_id": account_id,
+                    "frequency": frequency,
+                    "interval": int(interval),
+                    "start_date": start_date.isoformat(),
+                    "end_date": end_date.isoformat() if end_date else None,
+                }
+            )
+        except (ValueError, RuntimeError) as e:
+            st.error(str(e))
+            return
+        st.success("Recurring rule added.")
+        safe_rerun()
+
+
+def show_edit_rule(rules, names):
+    st.subheader("Change a rule")
+    by_label = {_rule_label(rule, names): rule for rule in rules}
+    rule = by_label[st.selectbox("Rule", list(by_label), key="recurring_edit")]
+
+    col1, col2 = st.columns(2)
+    amount = col1.number_input("Amount", value=float(rule["amount"]), step=10.0, key=f"recurring_amount_{rule['id']}")
+    last = datetime.date.fromisoformat(str(rule["end_date"])[:10]) if rule.get("end_date") else None
+    has_end = col2.checkbox("Ends", value=last is not None, key=f"recurring_has_end_{rule['id']}")
+    end_date = (
+        col2.date_input("Last date", last or datetime.date.today(), key=f"recurring_end_{rule['id']}")
+        if has_end else None
+    )
+
+    save_col, delete_col, _ = st.columns([1, 1, 2])
+    try:
+        if save_col.button("Save rule", key="recurring_save"):
+            update_recurring_rule(
+                rule["id"], {"amount": amount, "end_date": end_date.isoformat() if end_date else None}
+            )
+            st.success("Rule saved.")
+            safe_rerun()
+        # Occurrences already in the ledger stay; only future ones stop
+        if delete_col.button("Stop rule", key="recurring_delete"):
+            delete_recurring_rule(rule["id"])
+            st.success("Rule stopped.")
+            safe_rerun()
+    except (ValueError, RuntimeError) as e:
+        st.error(str(e))
+
+
+def show_recurring():
+    st.header("Recurring transactions and budgets")
+
+    back_col, budgets_col, _ = st.columns([1, 1, 2])
+    if back_col.button("← Back to transactions", key="recurring_back"):
+        st.session_state.page = "transactions"
+        safe_rerun()
+    if budgets_col.button("Budget planner", key="recurring_budgets"):
+        st.session_state.page = "budgets"
+        safe_rerun()
+
+    accounts = get_accounts()
+    names = {a["id"]: a["name"] for a in accounts}
+    rules = get_recurring_rules()
+
+    if rules:
+        table = pd.DataFrame(rules).reindex(columns=RULE_COLUMNS + ["account_id"])
+        table["account"] = table.pop("account_id").map(names)
+        st.dataframe(
+            table,
+            use_container_width=True,
+            hide_index=True,
+            column_config={"amount": st.column_config.NumberColumn(format="$%.2f")},
+        )
+        show_edit_rule(rules, names)
+    else:
+        st.info("No recurring rules yet (they need sql/recurring.sql).")
+
+    st.markdown("---")
+    if not accounts:
+        st.error("You must create an account first.")
+        return
+    show_add_rule(accounts)
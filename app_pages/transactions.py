@@ -1,32 +1,150 @@
+import datetime
+from functools import partial
+
 import streamlit as st
-from db import get_all_transactions, get_accounts
+from db import (
+    fetch_all,
+    get_accounts,
+    get_running_balances,
+    get_search_facets,
+    get_transactions_page,
+    prefetch_transactions_page,
+    search_transactions,
+)
 from utils.navigation import safe_rerun
+from config import TRANSACTIONS_PAGE_SIZES
+
+
+def _reset_paging():
+    # Stack of cursors: entry i is the cursor that loads page i.
+    st.session_state.tx_page_cursors = [None]
+    st.session_state.tx_page_index = 0
+
+
+def _search_filters():
+    """
+    search_transactions() keyword arguments from the search panel, or None
+    while it is closed or every filter is empty.
+    """
+    if not st.checkbox("🔍 Search and filter", key="tx_search_on", on_change=_reset_paging):
+        return None
+
+    accounts = {a["id"]: a["name"] for a in get_accounts()}
+    facets = get_search_facets()
+    text = st.text_input("Search description, notes or category", key="tx_search_text", on_change=_reset_paging)
+
+    col1, col2, col3 = st.columns(3)
+    account_ids = col1.multiselect(
+        "Accounts", list(accounts), format_func=lambda a: accounts.get(a, "Unknown"),
+        key="tx_search_accounts", on_change=_reset_paging,
+    )
+    categories = col2.multiselect("Categories", facets["category"], key="tx_search_categories", on_change=_reset_paging)
+    types = col3.multiselect("Types", facets["type"], key="tx_search_types", on_change=_reset_paging)
+
+    col1, col2, col3, col4 = st.columns(4)
+    start = col1.date_input("From", value=None, key="tx_search_start", on_change=_reset_paging)
+    end = col2.date_input("To", value=None, key="tx_search_end", on_change=_reset_paging)
+    min_amount = col3.number_input("Min amount", value=None, step=1.0, key="tx_search_min", on_change=_reset_paging)
+    max_amount = col4.number_input("Max amount", value=None, step=1.0, key="tx_search_max", on_change=_reset_paging)
+
+    col1, col2 = st.columns(2)
+    sort = col1.selectbox("Sort by", ["date", "amount"], key="tx_search_sort", on_change=_reset_paging)
+    descending = col2.checkbox("Newest / largest first", value=True, key="tx_search_desc", on_change=_reset_paging)
+
+    filters = {
+        "text": text.strip(),
+        "account_ids": account_ids,
+        "categories": categories,
+        "types": types,
+        "start": start,
+        # "To" is inclusive on screen; the search end is exclusive
+        "end": end + datetime.timedelta(days=1) if end else None,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+    }
+    # Newest first with no filters is the plain list: keep its cursor paging
+    if all(v in (None, "", []) for v in filters.values()) and sort == "date" and descending:
+        return None
+    filters.update(sort=sort, descending=descending)
+    return filters
 
 
 def show_transactions():
     st.header("Transactions")
 
-    # Add Transaction button at the top
-    if st.button("➕ Add Transaction"):
+    # Add / Import / Export buttons at the top
+    add_col, import_col, export_col, recurring_col, _ = st.columns([1, 1, 1, 1, 2])
+
+    if add_col.button("➕ Add Transaction"):
         st.session_state.page = "add_transaction"
         safe_rerun()
 
-    accounts = {a["id"]: a["name"] for a in get_accounts()}
-    txs = [
-        t for t in get_all_transactions()
-        if not t.get("deleted")
-    ]
+    if import_col.button("📥 Import CSV / OFX"):
+        st.session_state.page = "import_transactions"
+        safe_rerun()
 
-    if not txs:
-        st.info("No transactions yet.")
-        return
+    if export_col.button("📤 Export & Backup"):
+        st.session_state.page = "backup"
+        safe_rerun()
 
-    st.subheader("All transactions")
+    if recurring_col.button("🔁 Recurring"):
+        st.session_state.page = "recurring"
+        safe_rerun()
 
-    # Sort newest → oldest
-    sorted_txs = sorted(txs, key=lambda x: x["date"], reverse=True)
+    if "tx_page_cursors" not in st.session_state:
+        _reset_paging()
 
-    for t in sorted_txs:
+    page_size = st.selectbox(
+        "Rows per page",
+        TRANSACTIONS_PAGE_SIZES,
+        index=1,
+        key="tx_page_size",
+        on_change=_reset_paging,
+    )
+
+    index = st.session_state.tx_page_index
+    filters = _search_filters()
+
+    if filters is None:
+        # Newest → oldest, fetched one page at a time from the server,
+        # alongside the account names
+        data = fetch_all({
+            "accounts": (get_accounts,),
+            "page": (get_transactions_page, st.session_state.tx_page_cursors[index], page_size),
+        })
+        page = data["page"]
+        txs = page["rows"]
+        next_cursor = page["next_cursor"]
+        has_next = next_cursor is not None
+
+        if not txs and index == 0:
+            st.info("No transactions yet.")
+            return
+
+        st.subheader(f"All transactions — page {index + 1}")
+    else:
+        # Matches come from the in-memory search index, paged by offset
+        data = fetch_all({
+            "accounts": (get_accounts,),
+            "result": (partial(search_transactions, **filters, offset=index * page_size, limit=page_size),),
+        })
+        result = data["result"]
+        txs = result["rows"]
+        next_cursor = None
+        has_next = (index + 1) * page_size < result["total"]
+
+        if not result["total"]:
+            st.info("No matching transactions.")
+            return
+
+        st.subheader(f"{result['total']:,} matching transactions — page {index + 1}")
+
+    accounts = {a["id"]: a["name"] for a in data["accounts"]}
+
+    # Account balance after each row, from monthly checkpoints
+    balances = get_running_balances(txs)
+
+    for t in txs:
         tx_id = t["id"]
         date = t["date"]
         desc = t.get("description", "")
@@ -36,19 +154,41 @@ def show_transactions():
         account_name = accounts.get(t.get("account_id"), "Unknown")
 
         # Display row
-        col1, col2, col3, col4, col5 = st.columns([2, 3, 2, 2, 1])
+        col1, col2, col3, col4, col5, col6 = st.columns([2, 3, 2, 2, 2, 1])
 
         col1.write(date)
         col2.write(f"{desc} ({account_name})")
         col3.write(category)
         col4.write(f"${amount:,.2f}")
+        if tx_id in balances:
+            col5.caption(f"Balance ${balances[tx_id]:,.2f}")
 
-        if col5.button("Edit", key=f"edit_{tx_id}"):
+        if col6.button("Edit", key=f"edit_{tx_id}"):
             st.session_state.edit_tx_id = tx_id
             st.session_state.page = "edit_transaction"
             safe_rerun()
 
-        if col5.button("Delete", key=f"delete_{tx_id}"):
+        if col6.button("Delete", key=f"delete_{tx_id}"):
             from db import delete_transaction
             delete_transaction(tx_id)
             safe_rerun()
+
+    # Pager
+    st.markdown("---")
+    prev_col, _, next_col = st.columns([1, 4, 1])
+
+    if prev_col.button("← Previous", key="tx_prev", disabled=index == 0):
+        st.session_state.tx_page_index = index - 1
+        safe_rerun()
+
+    if next_col.button("Next →", key="tx_next", disabled=not has_next):
+        if filters is None:
+            cursors = st.session_state.tx_page_cursors
+            del cursors[index + 1:]
+            cursors.append(next_cursor)
+        st.session_state.tx_page_index = index + 1
+        safe_rerun()
+
+    # Warm the cache so the next click doesn't wait on the network
+    if next_cursor is not None:
+        prefetch_transactions_page(next_cursor, page_size)
@@ -0,0 +1,299 @@
+"""
+backup.py
+
+Streaming export and snapshot backup/restore (roadmap 1.5).
+
+Tables are read a page at a time with keyset pagination
+(db.iter_table) and written through generators straight into the
+output file, so memory stays at one page however large the ledger is.
+
+- Export: one table as gzipped CSV or NDJSON, or Parquet (zstd, needs
+  pyarrow). For spreadsheets and other tools; not restorable.
+- Snapshot: every table as gzipped NDJSON, in batches of
+  BACKUP_BATCH_ROWS rows. Each batch line carries its rows and their
+  SHA-256; a trailer line records the batch and row counts, so a
+  truncated or edited file is caught before anything is written.
+- Restore: verify the whole snapshot, then upsert it batch by batch in
+  snapshot order (accounts before the transactions that reference them,
+  split parents before children). Upserts make a batch safe to load
+  twice, so a failed restore resumes from the batch that failed.
+  A restore merges rather than replaces: rows are matched by id, so
+  snapshot rows overwrite their current versions and anything created
+  since the backup (or deleted before the restore) is left as it is.
+  Restore into an empty database to get the snapshot back exactly.
+"""
+
+import csv
+import datetime
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import APP_VERSION, BACKUP_BATCH_ROWS
+from db import iter_table, restore_rows
+
+EXPORT_TABLES = ("accounts", "transactions", "budgets")
+
+# format → file suffix
+FORMATS = {"csv": ".csv.gz", "ndjson": ".ndjson.gz", "parquet": ".parquet"}
+
+SNAPSHOT_FORMAT = "budget-app-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot.ndjson.gz"
+
+# (table, split, required), in restore order. Optional tables come from
+# sql/ scripts that may not be deployed; they are skipped when missing.
+SNAPSHOT_SECTIONS: Tuple[Tuple[str, Optional[str], bool], ...] = (
+    ("accounts", None, True),
+    ("recurring_rules", None, False),
+    ("transactions", "top", True),
+    ("transactions", "child", True),
+    ("budgets", None, True),
+    ("category_rules", None, False),
+)
+
+# Numeric columns PostgREST may send as JSON integers on one page and
+# decimals on the next; Parquet needs one type per file
+_FLOAT_COLUMNS = {"amount", "min_balance"}
+
+
+def available_formats() -> List[str]:
+    """Export formats usable here (Parquet only with pyarrow installed)."""
+    return [f for f in FORMATS if f != "parquet" or importlib.util.find_spec("pyarrow") is not None]
+
+
+def _rechunk(pages: Iterable[List[Dict]], size: int) -> Iterator[List[Dict]]:
+    rows = (row for page in pages for row in page)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _checksum(rows: List[Dict]) -> str:
+    text = json.dumps(rows, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def write_csv(pages: Iterable[List[Dict]], out: BinaryIO) -> int:
+    with gzip.GzipFile(fileobj=out, mode="wb") as gz, \
+            io.TextIOWrapper(gz, encoding="utf-8", newline="") as text:
+        writer = None
+        count = 0
+        for page in pages:
+            if writer is None:
+                writer = csv.DictWriter(text, fieldnames=list(page[0]), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerows(page)
+            count += len(page)
+        return count
+
+
+def write_ndjson(pages: Iterable[List[Dict]], out: BinaryIO) -> int:
+    with gzip.GzipFile(fileobj=out, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8") as text:
+        count = 0
+        for page in pages:
+            text.writelines(json.dumps(row, default=str) + "\n" for row in page)
+            count += len(page)
+        return count
+
+
+def write_parquet(pages: Iterable[List[Dict]], out: BinaryIO) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    writer = None
+    count = 0
+    try:
+        for page in pages:
+            if writer is None:
+                # Schema from the first page; all-null columns become text
+                fields = []
+                for field in pa.Table.from_pylist(page).schema:
+                    if field.name in _FLOAT_COLUMNS:
+                        field = field.with_type(pa.float64())
+                    elif pa.types.is_null(field.type):
+                        field = field.with_type(pa.string())
+                    fields.append(field)
+                schema = pa.schema(fields)
+                writer = pq.ParquetWriter(out, schema, compression="zstd")
+            try:
+                writer.write_table(pa.Table.from_pylist(page, schema=schema))
+            except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                raise RuntimeError(f"Parquet export failed after {count} rows: {e}")
+            count += len(page)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export_table(table: str, fmt: str, out: BinaryIO) -> int:
+    """
+    Stream every row of `table` into `out` as `fmt` (a key of FORMATS).
+    Returns the number of rows written.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"fmt must be one of {sorted(WRITERS)}, not {fmt!r}")
+    return WRITERS[fmt](iter_table(table), out)
+
+
+# -----------------------------
+# Snapshots
+# -----------------------------
+def _snapshot_batches(batch_rows: int) -> Iterator[Tuple[str, List[Dict]]]:
+    for table, split, required in SNAPSHOT_SECTIONS:
+        pages = iter_table(table, split)
+        try:
+            for batch in _rechunk(pages, batch_rows):
+                yield table, batch
+        except LookupError:
+            if required:
+                raise
+        finally:
+            pages.close()
+
+
+def write_snapshot(out: BinaryIO, batch_rows: int = BACKUP_BATCH_ROWS) -> Dict:
+    """
+    Back up every table into `out`. Returns the trailer:
+    {"batches": n, "rows": {table: count}, "sha256": hash of the batch hashes}.
+    """
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "app_version": APP_VERSION,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+    digest = hashlib.sha256()
+    counts: Dict[str, int] = {}
+    batches = 0
+
+    with gzip.GzipFile(fileobj=out, mode="wb") as gz, io.TextIOWrapper(gz, encoding="utf-8") as text:
+        text.write(json.dumps(header) + "\n")
+        for table, rows in _snapshot_batches(batch_rows):
+            checksum = _checksum(rows)
+            digest.update(checksum.encode("ascii"))
+            text.write(json.dumps(
+                {"batch": batches, "table": table, "sha256": checksum, "rows": rows}, default=str
+            ) + "\n")
+            counts[table] = counts.get(table, 0) + len(rows)
+            batches += 1
+
+        trailer = {"end": True, "batches": batches, "rows": counts, "sha256": digest.hexdigest()}
+        text.write(json.dumps(trailer) + "\n")
+    return trailer
+
+
+def _read_lines(file: BinaryIO) -> Iterator[Dict]:
+    file.seek(0)
+    with gzip.GzipFile(fileobj=file, mode="rb") as gz:
+        try:
+            for number, line in enumerate(io.TextIOWrapper(gz, encoding="utf-8"), start=1):
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    raise ValueError(f"Snapshot line {number} is not valid JSON")
+        except (OSError, EOFError) as e:
+            raise ValueError(f"Snapshot is not a readable gzip file: {e}")
+
+
+def _batches(file: BinaryIO) -> Iterator[Tuple[Dict, Dict]]:
+    """
+    (header, batch) for every batch, each checked against its checksum;
+    the last item is (header, trailer) once the trailer has checked out.
+    Raises ValueError on the first problem.
+    """
+    lines = _read_lines(file)
+    header = next(lines, None)
+    if not header or header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError("Not a snapshot file")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}")
+
+    digest = hashlib.sha256()
+    counts: Dict[str, int] = {}
+    expected = 0
+    for line in lines:
+        if line.get("end"):
+            if line.get("batches") != expected or line.get("rows") != counts:
+                raise ValueError("Snapshot trailer doesn't match its batches")
+            if line.get("sha256") != digest.hexdigest():
+                raise ValueError("Snapshot checksum mismatch")
+            yield header, line
+            return
+        if line.get("batch") != expected:
+            raise ValueError(f"Snapshot batch {expected} is missing")
+        if _checksum(line["rows"]) != line.get("sha256"):
+            raise ValueError(f"Snapshot batch {expected} ({line.get('table')}) failed its checksum")
+        digest.update(line["sha256"].encode("ascii"))
+        counts[line["table"]] = counts.get(line["table"], 0) + len(line["rows"])
+        expected += 1
+        yield header, line
+
+    raise ValueError(f"Snapshot is truncated after batch {expected - 1}")
+
+
+def verify_snapshot(file: BinaryIO) -> Dict:
+    """
+    Check a whole snapshot without loading it. Returns
+    {"created_at", "app_version", "batches", "rows": {table: count}};
+    raises ValueError if any batch or the trailer doesn't check out.
+    """
+    for header, line in _batches(file):
+        pass
+    return {
+        "created_at": header.get("created_at"),
+        "app_version": header.get("app_version"),
+        "batches": line["batches"],
+        "rows": line["rows"],
+    }
+
+
+def restore_snapshot(file: BinaryIO, resume_from: int = 0) -> Iterator[Dict]:
+    """
+    Load a snapshot, one upsert per batch, starting at batch resume_from.
+    The file is verified first (ValueError if it doesn't check out).
+    Rows are merged in by id: rows the snapshot doesn't contain are
+    neither deleted nor changed.
+    Yields a result per batch, like db.insert_transactions_in_batches:
+        {"batch": i, "table": str, "rows": n, "success": bool, "error": str | None}
+    and stops after a failed batch; pass its number as resume_from to
+    carry on from there.
+    """
+    verify_snapshot(file)
+
+    for _, line in _batches(file):
+        if line.get("end"):
+            return
+        if line["batch"] < resume_from:
+            continue
+        result = {
+            "batch": line["batch"],
+            "table": line["table"],
+            "rows": len(line["rows"]),
+            "success": True,
+            "error": None,
+        }
+        if line["rows"]:
+            try:
+                restore_rows(line["table"], line["rows"])
+            except RuntimeError as e:
+                result.update(success=False, error=str(e))
+        yield result
+        if not result["success"]:
+            return
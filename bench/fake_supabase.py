@@ -0,0 +1,434 @@
+"""
+In-memory stand-in for the supabase-py client.
+
+Implements the PostgREST query-builder subset db.py uses:
+table().select/insert/update/upsert/delete, eq/neq/gt/gte/lt/lte/in_/is_/
+or_ filters and not_, order/limit/range/single, execute(), and rpc(). rpc()
+runs the Python function registered under that name, if any, and
+otherwise answers "function not found" so callers take their fallback path.
+
+Every execute() is counted and timed in `client.stats`, and can sleep
+`latency` seconds to stand in for the network round trip. Filtered and
+sorted results are memoized per table version, so paging through a large
+table with range() doesn't rescan it for every page.
+"""
+
+import copy
+import itertools
+import operator
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Row = Dict
+Predicate = Callable[[Row], bool]
+
+_OPS = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+# Equality filters on these columns are answered from a hash index
+INDEXED_COLUMNS = ("id", "parent_id", "account_id")
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+def _coerce(left, value):
+    # Filter values arrive as Python values or, from or_(), as strings
+    if isinstance(left, bool):
+        return bool(value)
+    if isinstance(left, (int, float)) and isinstance(value, str):
+        return float(value)
+    if isinstance(left, str) and not isinstance(value, str):
+        return str(value)
+    return value
+
+
+def _compare(op: str, column: str, value) -> Predicate:
+    fn = _OPS[op]
+
+    def predicate(row: Row) -> bool:
+        left = row.get(column)
+        # SQL semantics: comparisons with NULL are never true
+        if left is None or value is None:
+            return False
+        return fn(left, _coerce(left, value))
+
+    return predicate
+
+
+def _literal(text: str):
+    return {"true": True, "false": False, "null": None}.get(text, text)
+
+
+def _split_top_level(text: str) -> List[str]:
+    parts, depth, current = [], 0, ""
+    for ch in text:
+        if ch == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _parse_logic(text: str) -> Predicate:
+    """
+    PostgREST logic tree: "a.lt.1,and(b.eq.2,c.lt.3)" as used by or_().
+    """
+    match = re.fullmatch(r"(and|or)\((.*)\)", text)
+    if match:
+        children = [_parse_logic(p) for p in _split_top_level(match.group(2))]
+        combine = all if match.group(1) == "and" else any
+        return lambda row: combine(child(row) for child in children)
+
+    column, op, value = text.split(".", 2)
+    if op == "is":
+        wanted = _literal(value)
+        return lambda row: row.get(column) is wanted
+    return _compare(op, column, _literal(value))
+
+
+class _Table:
+    def __init__(self, name: str, rows: List[Row]):
+        self.name = name
+        self.rows: Dict[str, Row] = {str(r["id"]): r for r in rows}
+        self.version = 0
+        self._indexes: Dict[str, Dict] = {}
+        self._indexed_at = -1
+        self._memo: Dict[Tuple, List[Row]] = {}
+
+    def touch(self) -> None:
+        self.version += 1
+        self._memo.clear()
+
+    def index(self, column: str) -> Dict:
+        if self._indexed_at != self.version:
+            self._indexes = {}
+            self._indexed_at = self.version
+        if column not in self._indexes:
+            idx: Dict = {}
+            for row in self.rows.values():
+                idx.setdefault(row.get(column), []).append(row)
+            self._indexes[column] = idx
+        return self._indexes[column]
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeClient", table: _Table):
+        self._client = client
+        self._table = table
+        self.path = f"/{table.name}"
+        self._action = "select"
+        self._columns: Optional[List[str]] = None
+        self._payload = None
+        self._on_conflict: Optional[List[str]] = None
+        self._ignore_duplicates = False
+        self._filters: List[Tuple] = []
+        self._negate = False
+        self._order: List[Tuple[str, bool]] = []
+        self._offset = 0
+        self._limit: Optional[int] = None
+        self._single = False
+
+    # -----------------------------
+    # Actions
+    # -----------------------------
+    @property
+    def http_method(self) -> str:
+        return {"select": "GET", "insert": "POST", "upsert": "POST", "update": "PATCH", "delete": "DELETE"}[self._action]
+
+    def select(self, columns: str = "*"):
+        self._action = "select"
+        if columns.strip() != "*":
+            self._columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, payload):
+        self._action, self._payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id", ignore_duplicates: bool = False):
+        self._action, self._payload = "upsert", payload
+        self._on_conflict = [c.strip() for c in on_conflict.split(",")]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload):
+        self._action, self._payload = "update", payload
+        return self
+
+    def delete(self):
+        self._action = "delete"
+        return self
+
+    # -----------------------------
+    # Filters and modifiers
+    # -----------------------------
+    def _filter(self, op: str, column: str, value):
+        if self._negate:
+            op, self._negate = f"not.{op}", False
+        self._filters.append((op, column, value))
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def is_(self, column, value):
+        return self._filter("is", column, value)
+
+    def eq(self, column, value):
+        return self._filter("eq", column, value)
+
+    def neq(self, column, value):
+        return self._filter("neq", column, value)
+
+    def gt(self, column, value):
+        return self._filter("gt", column, value)
+
+    def gte(self, column, value):
+        return self._filter("gte", column, value)
+
+    def lt(self, column, value):
+        return self._filter("lt", column, value)
+
+    def lte(self, column, value):
+        return self._filter("lte", column, value)
+
+    def in_(self, column, values):
+        return self._filter("in", column, tuple(values))
+
+    def or_(self, filters: str):
+        return self._filter("or", filters, None)
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    # -----------------------------
+    # Execution
+    # -----------------------------
+    def _predicate(self, op: str, column: str, value) -> Predicate:
+        if op.startswith("not."):
+            inner = self._predicate(op[4:], column, value)
+            return lambda row: not inner(row)
+        if op == "is":
+            wanted = _literal(value) if isinstance(value, str) else value
+            return lambda row: row.get(column) is wanted
+        if op == "in":
+            wanted = set(value)
+            return lambda row: row.get(column) in wanted
+        if op == "or":
+            return _parse_logic(f"or({column})")
+        return _compare(op, column, value)
+
+    def _candidates(self) -> Tuple[List[Row], List[Tuple]]:
+        for i, (op, column, value) in enumerate(self._filters):
+            if column in INDEXED_COLUMNS and op in ("eq", "in"):
+                idx = self._table.index(column)
+                keys = [value] if op == "eq" else dict.fromkeys(value)
+                rows = [row for key in keys for row in idx.get(key, ())]
+                return rows, self._filters[:i] + self._filters[i + 1:]
+        return list(self._table.rows.values()), self._filters
+
+    def _matching(self) -> List[Row]:
+        key = (tuple(self._filters), tuple(self._order))
+        if self._action == "select" and key in self._table._memo:
+            return self._table._memo[key]
+
+        rows, filters = self._candidates()
+        predicates = [self._predicate(*f) for f in filters]
+        rows = [row for row in rows if all(p(row) for p in predicates)]
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+
+        if self._action == "select":
+            self._table._memo[key] = rows
+        return rows
+
+    def _project(self, row: Row) -> Row:
+        if self._columns is None:
+            return dict(row)
+        return {c: row.get(c) for c in self._columns}
+
+    def _write_rows(self) -> List[Row]:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        table = self._table
+        written = []
+
+        for item in payload:
+            item = copy.deepcopy(item)
+            existing = None
+            if self._action == "upsert":
+                if item.get("id") is not None:
+                    existing = table.rows.get(str(item["id"]))
+                if existing is None:
+                    existing = next(
+                        (
+                            row for row in table.rows.values()
+                            if all(row.get(c) == item.get(c) for c in self._on_conflict)
+                        ),
+                        None,
+                    )
+            if existing is not None and self._ignore_duplicates:
+                continue
+            if existing is not None:
+                existing.update(item)
+                existing["updated_at"] = self._client.now()
+                written.append(existing)
+            else:
+                item.setdefault("id", self._client.new_id())
+                item["updated_at"] = self._client.now()
+                table.rows[str(item["id"])] = item
+                written.append(item)
+
+        return written
+
+    def _run(self):
+        table = self._table
+
+        if self._action in ("insert", "upsert"):
+            written = self._write_rows()
+            table.touch()
+            return [dict(row) for row in written]
+
+        rows = self._matching()
+
+        if self._action == "update":
+            for row in rows:
+                row.update(copy.deepcopy(self._payload))
+                row["updated_at"] = self._client.now()
+            table.touch()
+            return [dict(row) for row in rows]
+
+        if self._action == "delete":
+            for row in rows:
+                del table.rows[str(row["id"])]
+            table.touch()
+            return [dict(row) for row in rows]
+
+        end = None if self._limit is None else self._offset + self._limit
+        data = [self._project(row) for row in rows[self._offset:end]]
+        if self._single:
+            if len(data) != 1:
+                raise FakeAPIError(f"PGRST116: expected 1 row, got {len(data)}")
+            return data[0]
+        return data
+
+    def execute(self) -> FakeResponse:
+        started = time.perf_counter()
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        # db.fetch_all() sends requests from several threads; the
+        # "network" wait overlaps, the in-memory work is serialized
+        with self._client.lock:
+            try:
+                data = self._run()
+            finally:
+                self._client.record(self._table.name, time.perf_counter() - started)
+        return FakeResponse(data)
+
+
+class _FakeRPC:
+    def __init__(self, client: "FakeClient", name: str, params: Dict):
+        self._client = client
+        self._name = name
+        self._params = params
+        self.path = f"/rpc/{name}"
+        self.http_method = "POST"
+
+    def execute(self) -> FakeResponse:
+        function = self._client.functions.get(self._name)
+        if function is None:
+            self._client.record(f"rpc:{self._name}", 0.0)
+            raise FakeAPIError(f"PGRST202: Could not find the function public.{self._name}")
+
+        started = time.perf_counter()
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        with self._client.lock:
+            try:
+                tables = {name: list(t.rows.values()) for name, t in self._client._tables.items()}
+                data = function(tables, self._params)
+            finally:
+                self._client.record(f"rpc:{self._name}", time.perf_counter() - started)
+        return FakeResponse(copy.deepcopy(data))
+
+
+class FakeClient:
+    """
+    Drop-in for supabase.Client over in-memory tables
+    ({"transactions": [rows], ...}; every row needs an "id").
+    `functions` stands in for Postgres functions:
+    {name: fn(tables, params) -> rows}, called by rpc(name, params).
+    """
+
+    def __init__(
+        self,
+        tables: Dict[str, List[Row]],
+        latency: float = 0.0,
+        functions: Optional[Dict[str, Callable[[Dict[str, List[Row]], Dict], Any]]] = None,
+    ):
+        self.latency = latency
+        self.functions = dict(functions or {})
+        self.lock = threading.RLock()
+        self._tables = {name: _Table(name, copy.deepcopy(rows)) for name, rows in tables.items()}
+        self._ids = itertools.count(1)
+        self._clock = itertools.count(1)
+        self.stats = {"requests": 0, "seconds": 0.0, "by_table": {}}
+
+    def table(self, name: str) -> FakeQuery:
+        if name not in self._tables:
+            self._tables[name] = _Table(name, [])
+        return FakeQuery(self, self._tables[name])
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> _FakeRPC:
+        return _FakeRPC(self, name, dict(params or {}))
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=next(self._ids)))
+
+    def now(self) -> str:
+        # Monotonic, sortable stand-in for now(): one tick per write
+        return f"2100-01-01T00:00:00.{next(self._clock):06d}+00:00"
+
+    def record(self, table: str, seconds: float) -> None:
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["seconds"] += seconds
+            self.stats["by_table"][table] = self.stats["by_table"].get(table, 0) + 1
+
+    def reset_stats(self) -> None:
+        self.stats = {"requests": 0, "seconds": 0.0, "by_table": {}}
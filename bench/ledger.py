@@ -0,0 +1,153 @@
+"""
+Deterministic synthetic ledger: accounts, transactions (with splits and
+soft-deleted rows) and monthly budgets shaped like the real tables.
+
+Same arguments → same rows, so benchmark runs are comparable.
+"""
+
+import datetime
+import random
+import uuid
+from typing import Dict, List
+
+from utils.dates import add_months, month_range
+
+ACCOUNT_NAMES = [
+    "Joint Checking",
+    "Savings",
+    "Visa",
+    "Mastercard",
+    "Emergency Fund",
+    "Cash",
+    "Brokerage",
+    "Kids Savings",
+]
+
+# category → (budget type, share of transactions, typical amount)
+CATEGORIES = {
+    "net paycheck": ("income", 0.04, 2400.0),
+    "rent": ("bill", 0.01, 1850.0),
+    "electric": ("bill", 0.01, 140.0),
+    "internet": ("bill", 0.01, 75.0),
+    "phone": ("bill", 0.01, 90.0),
+    "groceries": ("budget", 0.25, 85.0),
+    "dining": ("budget", 0.15, 40.0),
+    "gas": ("budget", 0.10, 45.0),
+    "household": ("budget", 0.08, 35.0),
+    "entertainment": ("budget", 0.06, 30.0),
+    "kids": ("budget", 0.06, 50.0),
+    "medical": ("budget", 0.04, 120.0),
+    "miscellaneous": ("budget", 0.14, 25.0),
+    "emergency fund": ("savings", 0.02, 200.0),
+    "vacation": ("savings", 0.02, 150.0),
+}
+
+MERCHANTS = {
+    "groceries": ["Costco", "Trader Joe's", "Safeway", "Aldi"],
+    "dining": ["Chipotle", "Local Diner", "Pizza Place", "Coffee Shop"],
+    "gas": ["Shell", "Chevron", "Costco Gas"],
+    "household": ["Target", "Home Depot", "Amazon"],
+    "entertainment": ["Netflix", "Movie Theater", "Steam"],
+}
+
+
+def _id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _stamp(rng: random.Random, day: datetime.date) -> str:
+    return f"{day.isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}+00:00"
+
+
+def generate_ledger(
+    transactions: int,
+    months: int = 24,
+    accounts: int = 6,
+    split_ratio: float = 0.02,
+    deleted_ratio: float = 0.01,
+    seed: int = 0,
+    end: datetime.date = datetime.date(2026, 1, 1),
+) -> Dict[str, List[Dict]]:
+    """
+    {"accounts": [...], "transactions": [...], "budgets": [...]} with
+    `transactions` rows in total (split children included), dated over the
+    `months` months before `end`, and one budget per category per month.
+    """
+    rng = random.Random(seed)
+    start = add_months(end, -months)
+    span_days = (end - start).days
+
+    account_rows = []
+    for i in range(accounts):
+        name = ACCOUNT_NAMES[i % len(ACCOUNT_NAMES)]
+        if i >= len(ACCOUNT_NAMES):
+            name += f" {i // len(ACCOUNT_NAMES) + 1}"
+        account_rows.append({"id": _id(rng), "name": name})
+    account_ids = [a["id"] for a in account_rows]
+    # Most activity lands on the first two accounts, like a real household
+    account_weights = [4, 3] + [1] * max(accounts - 2, 0)
+
+    names = list(CATEGORIES)
+    weights = [CATEGORIES[c][1] for c in names]
+
+    rows: List[Dict] = []
+    while len(rows) < transactions:
+        category = rng.choices(names, weights)[0]
+        btype, _, typical = CATEGORIES[category]
+        day = start + datetime.timedelta(days=rng.randrange(span_days))
+        amount = round(max(1.0, rng.lognormvariate(0, 0.5) * typical), 2)
+        merchant = rng.choice(MERCHANTS.get(category, [category.title()]))
+        tx = {
+            "id": _id(rng),
+            "date": day.isoformat(),
+            "amount": amount,
+            "description": merchant,
+            "category": category,
+            "type": "income" if btype == "income" else "expense",
+            "account_id": rng.choices(account_ids, account_weights[:accounts])[0],
+            "notes": None,
+            "deleted": rng.random() < deleted_ratio,
+            "is_split_parent": False,
+            "parent_id": None,
+            "updated_at": _stamp(rng, day),
+        }
+        rows.append(tx)
+
+        if btype != "income" and rng.random() < split_ratio and len(rows) + 2 <= transactions:
+            tx["is_split_parent"] = True
+            parts = min(rng.randint(2, 4), transactions - len(rows))
+            cuts = sorted(rng.uniform(0, amount) for _ in range(parts - 1))
+            bounds = [0.0] + cuts + [amount]
+            shares = [round(b - a, 2) for a, b in zip(bounds, bounds[1:])]
+            shares[-1] = round(amount - sum(shares[:-1]), 2)
+            for share in shares:
+                rows.append(
+                    dict(
+                        tx,
+                        id=_id(rng),
+                        amount=share,
+                        category=rng.choice(names[5:13]),
+                        is_split_parent=False,
+                        parent_id=tx["id"],
+                    )
+                )
+
+    budget_rows = []
+    for month in month_range(start, months):
+        for category, (btype, share, typical) in CATEGORIES.items():
+            # Expected monthly volume at this ledger size, rounded to $10
+            per_month = transactions * share / months
+            planned = round(per_month * typical / 10) * 10 if btype == "budget" else typical
+            budget_rows.append(
+                {
+                    "id": _id(rng),
+                    "category": category,
+                    "year": month.year,
+                    "month": month.isoformat(),
+                    "amount": float(planned),
+                    "type": btype,
+                    "updated_at": _stamp(rng, month),
+                }
+            )
+
+    return {"accounts": account_rows, "transactions": rows, "budgets": budget_rows}
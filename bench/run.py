@@ -0,0 +1,338 @@
+"""
+Benchmark runner: times the data path of each page (db reads plus the
+aggregation the page does) against an in-memory Supabase stand-in loaded
+with a synthetic ledger, at several ledger sizes.
+
+    python -m bench.run                         # 10k, 100k and 1M rows
+    python -m bench.run --sizes 10000 --latency 0.05
+    python -m bench.run --baseline <commit>     # compare with an earlier run
+    python -m bench.run --server-aggregates     # as if sql/monthly_aggregates.sql were deployed
+
+Cold import time of db.py and the page modules is measured too, each in
+a fresh interpreter, so startup cost is tracked alongside page timings.
+
+Each scenario is timed cold (db cache and rollups cleared) and warm
+(straight after, everything cached). Results are appended to
+bench/results.jsonl (untracked; --results picks another file), one JSON
+object per (size, scenario), so later runs can be compared against them.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from bench.fake_supabase import FakeClient
+from bench.ledger import generate_ledger
+from utils.dates import add_months, month_range
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results.jsonl")
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+LEDGER_END = datetime.date(2026, 1, 1)
+REGRESSION_RATIO = 1.2
+
+
+# Modules timed on a cold interpreter (startup cost of each page)
+IMPORT_MODULES = (
+    "db",
+    "aggregations",
+    "app_pages.accounts",
+    "app_pages.transactions",
+    "app_pages.dashboard",
+    "app_pages.budget_planner",
+)
+
+
+def load_app(client: FakeClient):
+    """
+    Import db.py wired to `client` instead of a live Supabase project.
+    """
+    import db
+
+    db.set_client(client)
+    db._replica = None
+    return db
+
+
+def aggregate_functions(db) -> Dict[str, Callable]:
+    """
+    FakeClient functions standing in for sql/monthly_aggregates.sql,
+    built on the in-process rules db.py falls back to.
+    """
+
+    def function(name: str) -> Callable:
+        def run(tables: Dict[str, List[Dict]], params: Dict) -> List[Dict]:
+            start, end = params.get("start_month"), params.get("end_month")
+            rows = [
+                tx for tx in tables.get("transactions", [])
+                if not tx.get("deleted")
+                and (start is None or str(tx["date"])[:10] >= start)
+                and (end is None or str(tx["date"])[:10] < end)
+            ]
+            return db._LOCAL_AGGREGATES[name](rows)
+
+        return run
+
+    return {name: function(name) for name in db._LOCAL_AGGREGATES}
+
+
+def measure_imports(repeat: int) -> List[Dict]:
+    """
+    Import time of each module in IMPORT_MODULES, each in a fresh
+    interpreter so shared dependencies are counted every time.
+    """
+    code = (
+        "import importlib, sys, time; t = time.perf_counter(); "
+        "importlib.import_module(sys.argv[1]); print((time.perf_counter() - t) * 1000)"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print("\ncold imports")
+    results = []
+    for name in IMPORT_MODULES:
+        timings = []
+        for _ in range(repeat):
+            out = subprocess.run(
+                [sys.executable, "-c", code, name], cwd=root, capture_output=True, text=True
+            )
+            if out.returncode != 0:
+                break
+            timings.append(float(out.stdout.strip().splitlines()[-1]))
+        if not timings:
+            print(f"  {name:<28} failed to import")
+            continue
+        result = {"size": 0, "scenario": f"import {name}", "cold_ms": round(statistics.median(timings), 2)}
+        results.append(result)
+        print(f"  {name:<28} {result['cold_ms']:>8.1f} ms")
+    return results
+
+
+# -----------------------------
+# Scenarios (one per page)
+# -----------------------------
+def _last_month():
+    month = add_months(LEDGER_END, -1)
+    return month.year, month.month
+
+
+def scenario_dashboard(db):
+    from aggregations import spending_by_category, summarize_months
+
+    summary = summarize_months([_last_month()])
+    spending_by_category(summary["actuals"])
+
+
+def scenario_accounts(db):
+    db.get_accounts()
+    db.get_account_balances()
+
+
+def scenario_transactions(db):
+    db.get_accounts()
+    page = db.get_transactions_page(None, 50)
+    db.get_transactions_page(page["next_cursor"], 50)
+
+
+def scenario_transaction_search(db):
+    db.search_transactions("gro", types=["expense"], limit=50)
+    db.search_transactions(min_amount=100, max_amount=200, sort="amount", offset=50, limit=50)
+
+
+def scenario_budget_month(db):
+    from aggregations import budget_totals, budgets_frame
+
+    budget_totals(budgets_frame(db.get_budgets_for_month(*_last_month())))
+
+
+def scenario_budget_year(db):
+    from aggregations import budget_grid, budget_totals, budgets_frame
+
+    start = add_months(LEDGER_END, -12)
+    frame = budgets_frame(db.get_budgets_for_range(start, LEDGER_END))
+    budget_grid(frame, month_range(start, 12))
+    budget_totals(frame)
+
+
+def scenario_debug_splits(db):
+    db.get_split_index(db.get_split_parents())
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "dashboard": scenario_dashboard,
+    "accounts": scenario_accounts,
+    "transactions": scenario_transactions,
+    "transaction_search": scenario_transaction_search,
+    "budget_planner_month": scenario_budget_month,
+    "budget_planner_year": scenario_budget_year,
+    "debug_splits": scenario_debug_splits,
+}
+
+
+# -----------------------------
+# Timing
+# -----------------------------
+def _reset(db) -> None:
+    db.clear_cache()
+    db._rollups.reset()
+    db._search.reset()
+    db._missing_rpcs.clear()
+
+
+def _time(db, client: FakeClient, fn: Callable, cold: bool) -> Dict:
+    if cold:
+        _reset(db)
+    client.reset_stats()
+    started = time.perf_counter()
+    fn(db)
+    elapsed = time.perf_counter() - started
+    return {
+        "ms": elapsed * 1000,
+        "queries": client.stats["requests"],
+        "server_ms": client.stats["seconds"] * 1000,
+    }
+
+
+def run_size(
+    db, size: int, repeat: int, latency: float, scenarios: List[str], server_aggregates: bool = False
+) -> List[Dict]:
+    built = time.perf_counter()
+    functions = aggregate_functions(db) if server_aggregates else None
+    client = FakeClient(generate_ledger(size, end=LEDGER_END), latency=latency, functions=functions)
+    print(f"\n{size:,} rows (ledger built in {time.perf_counter() - built:.1f}s)")
+
+    db.set_client(client)
+    results = []
+    for name in scenarios:
+        cold, warm = [], []
+        for _ in range(repeat):
+            cold.append(_time(db, client, SCENARIOS[name], cold=True))
+            warm.append(_time(db, client, SCENARIOS[name], cold=False))
+
+        result = {
+            "size": size,
+            "scenario": name,
+            "cold_ms": round(statistics.median(r["ms"] for r in cold), 2),
+            "warm_ms": round(statistics.median(r["ms"] for r in warm), 2),
+            "cold_queries": cold[-1]["queries"],
+            "warm_queries": warm[-1]["queries"],
+            "cold_server_ms": round(statistics.median(r["server_ms"] for r in cold), 2),
+        }
+        results.append(result)
+        print(
+            f"  {name:<22} cold {result['cold_ms']:>10.1f} ms ({result['cold_queries']:>4} q)"
+            f"   warm {result['warm_ms']:>9.1f} ms ({result['warm_queries']:>3} q)"
+        )
+    return results
+
+
+# -----------------------------
+# Results
+# -----------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path: str = RESULTS_PATH) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def save_results(rows: List[Dict], path: str = RESULTS_PATH) -> None:
+    with open(path, "a") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def compare(current: List[Dict], previous: List[Dict]) -> List[Dict]:
+    """
+    Cold timings of `current` vs the same (size, scenario) in `previous`.
+    Returns the rows that got slower by more than REGRESSION_RATIO.
+    """
+    before = {(r["size"], r["scenario"]): r for r in previous}
+    regressions = []
+    print("\nvs baseline (cold ms):")
+    for row in current:
+        old = before.get((row["size"], row["scenario"]))
+        if old is None:
+            continue
+        ratio = row["cold_ms"] / old["cold_ms"] if old["cold_ms"] else float("inf")
+        flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+        print(
+            f"  {row['size']:>9,} {row['scenario']:<22} "
+            f"{old['cold_ms']:>10.1f} → {row['cold_ms']:>10.1f}  x{ratio:.2f}{flag}"
+        )
+        if flag:
+            regressions.append(row)
+    return regressions
+
+
+def _baseline_rows(history: List[Dict], baseline: str) -> List[Dict]:
+    # A commit or run id; "last" is the most recent earlier run
+    if baseline == "last":
+        runs = [r["run"] for r in history]
+        return [r for r in history if runs and r["run"] == runs[-1]]
+    return [r for r in history if baseline in (r.get("commit"), r.get("run"))]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--baseline", help='commit or run id to compare against, or "last"')
+    parser.add_argument(
+        "--server-aggregates", action="store_true", help="answer the aggregate RPCs instead of PGRST202"
+    )
+    parser.add_argument("--no-imports", action="store_true", help="skip the cold import timings")
+    parser.add_argument("--results", default=RESULTS_PATH, help="results history file to append to and compare with")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    history = load_results(args.results)
+    db = load_app(FakeClient({}))
+
+    run_id = uuid.uuid4().hex[:8]
+    meta = {
+        "run": run_id,
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "latency": args.latency,
+        "python": sys.version.split()[0],
+        "server_aggregates": args.server_aggregates,
+    }
+
+    results = []
+    if not args.no_imports:
+        results.extend({**meta, **row} for row in measure_imports(args.repeat))
+    for size in args.sizes:
+        for row in run_size(db, size, args.repeat, args.latency, args.scenarios, args.server_aggregates):
+            results.append({**meta, **row})
+
+    if not args.no_save:
+        save_results(results, args.results)
+        print(f"\nSaved {len(results)} results to {args.results} (run {run_id})")
+
+    if args.baseline:
+        regressions = compare(results, _baseline_rows(history, args.baseline))
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
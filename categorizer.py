@@ -0,0 +1,135 @@
+"""
+categorizer.py
+
+Auto-categorization: a transaction whose description contains a rule's
+match_text (case-insensitive) gets that rule's category. When several
+rules match, the highest priority wins, then the longest match_text.
+
+Rules are compiled once into one regex per priority level: the
+match_texts are merged into a character trie, so each position of a
+description is tried against every rule in a single pass of the regex
+engine, longest match first. A whole column is categorized at once over
+its distinct descriptions, and results are memoized per rule set, so
+repeated merchant strings across chunks and imports cost a dict lookup.
+"""
+
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from config import CATEGORIZER_MEMO_MAX
+from db import get_category_rules
+
+# (match_text, category, priority)
+Rule = Tuple[str, str, int]
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex matching any of `words`, factored on shared prefixes. At a given
+    position it matches the longest word that fits there.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ends here but longer ones continue: try them first (greedy)
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class RuleSet:
+    """
+    Compiled category rules. Build with load_rules() (cached per rule
+    set) rather than directly, so the memo is shared across imports.
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        # Per priority (highest first): {match_text: category}; the first
+        # rule listed wins between identical match_texts
+        levels: Dict[int, Dict[str, str]] = {}
+        for match_text, category, priority in rules:
+            text = (match_text or "").strip().lower()
+            if text:
+                levels.setdefault(int(priority), {}).setdefault(text, (category or "").strip().lower())
+
+        self._levels: List[Tuple[re.Pattern, Dict[str, str]]] = [
+            # Lookahead, so findall reports the longest match at every position
+            (re.compile("(?=(" + _trie_pattern(texts) + "))"), texts)
+            for _, texts in sorted(levels.items(), reverse=True)
+        ]
+        self._memo: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(texts) for _, texts in self._levels)
+
+    def categorize(self, description: Optional[str]) -> Optional[str]:
+        """Category for one description, or None if no rule matches."""
+        result = self.categorize_many(pd.Series([description], dtype="string"))
+        return None if pd.isna(result.iloc[0]) else result.iloc[0]
+
+    def categorize_many(self, descriptions: pd.Series) -> pd.Series:
+        """
+        Category per description (same index), NA where no rule matches.
+        """
+        keys = descriptions.astype("string").fillna("").str.lower()
+        if not self._levels:
+            return pd.Series(pd.NA, index=descriptions.index, dtype="string")
+
+        with self._lock:
+            known = {k: self._memo[k] for k in keys.unique() if k in self._memo}
+        pending = pd.Series([k for k in keys.unique() if k not in known], dtype="string")
+
+        found = self._match(pending)
+        with self._lock:
+            if len(self._memo) + len(found) > CATEGORIZER_MEMO_MAX:
+                self._memo.clear()
+            self._memo.update(found)
+        known.update(found)
+
+        return keys.map(known).astype("string")
+
+    def _match(self, texts: pd.Series) -> Dict[str, Optional[str]]:
+        result: Dict[str, Optional[str]] = dict.fromkeys(texts, None)
+        remaining = texts
+        for pattern, categories in self._levels:
+            if remaining.empty:
+                break
+            hits = remaining.str.findall(pattern)
+            matched = hits.str.len() > 0
+            for text, found in zip(remaining[matched], hits[matched]):
+                result[text] = categories[max(found, key=len)]
+            # Lower priorities only see what nothing above matched
+            remaining = remaining[~matched]
+        return result
+
+
+@lru_cache(maxsize=4)
+def _compiled(rules: Tuple[Rule, ...]) -> RuleSet:
+    return RuleSet(rules)
+
+
+def load_rules() -> RuleSet:
+    """
+    The current rules from db.py, compiled. Recompiled only when the
+    rules change, so the memo survives across chunks and imports.
+    """
+    rules = tuple(
+        (r["match_text"], r["category"], r["priority"] or 1) for r in get_category_rules()
+    )
+    return _compiled(rules)
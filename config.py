@@ -7,3 +7,71 @@ Version 1.0.0 — January 2026
 - Fully functional navigation
 - Ready for daily personal use
 """
+
+# Shared read cache in db.py (seconds / max cached query results)
+CACHE_TTL_SECONDS = 60
+CACHE_MAX_ENTRIES = 256
+
+# Transactions list: rows per page (bounds widgets created per render)
+TRANSACTIONS_PAGE_SIZES = (25, 50, 100)
+
+# Categories that mark a transaction as income
+INCOME_CATEGORIES = {"income", "paycheck", "deposit", "net paycheck"}
+
+# CSV import: rows parsed per chunk / rows sent per insert request
+IMPORT_CHUNK_ROWS = 5000
+IMPORT_BATCH_SIZE = 500
+
+# Backups (backup.py): rows per snapshot batch, which is also the rows
+# written per restore request
+BACKUP_BATCH_ROWS = 500
+
+# Auto-categorization (categorizer.py): descriptions remembered per rule set
+CATEGORIZER_MEMO_MAX = 100_000
+
+# Projected daily balance (projection.py): default horizon in days, and the
+# required minimum for accounts without their own min_balance
+PROJECTION_DAYS = 90
+PROJECTION_MIN_BALANCE = 0.0
+
+# Recurring transactions (db.materialize_recurring): after a failed run,
+# page loads skip it for this long instead of retrying on every rerun
+RECURRING_RETRY_SECONDS = 5 * 60
+
+# Per-account monthly balance rollups are rebuilt from the ledger this often
+ROLLUP_REFRESH_SECONDS = 15 * 60
+
+# Transaction search index (search_index.py), rebuilt from the ledger this often
+SEARCH_REFRESH_SECONDS = 15 * 60
+
+# Local SQLite replica of accounts/transactions/budgets (replica.py).
+# Needs sql/replica_updated_at.sql deployed. Deltas are pulled at most every
+# REPLICA_SYNC_SECONDS; a full re-pull (to drop rows deleted elsewhere)
+# every REPLICA_FULL_SYNC_SECONDS.
+REPLICA_ENABLED = False
+REPLICA_PATH = ".replica/budget.sqlite3"
+REPLICA_SYNC_SECONDS = 30
+REPLICA_FULL_SYNC_SECONDS = 6 * 60 * 60
+
+# Query instrumentation (query_stats.py): a rerun making more queries or
+# spending longer in them than this is flagged on the diagnostics page
+QUERY_BUDGET_COUNT = 25
+QUERY_BUDGET_MS = 1500
+QUERY_LOG_MAX_QUERIES = 5000
+QUERY_LOG_MAX_RERUNS = 500
+
+# Supabase HTTP client (supabase_client.py): timeouts in seconds, pool size,
+# retries for reads, and the circuit breaker that fails fast (serving
+# cached data) after repeated transient errors
+HTTP_CONNECT_TIMEOUT = 3.0
+HTTP_READ_TIMEOUT = 10.0
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE = 10
+HTTP_KEEPALIVE_EXPIRY = 30.0
+HTTP_READ_RETRIES = 2
+HTTP_RETRY_BACKOFF = 0.25
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 30
+
+# db.fetch_all(): independent reads of one page run on this many threads
+FETCH_MAX_WORKERS = 8
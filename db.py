@@ -1,49 +1,779 @@
+import bisect
+import copy
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-from typing import Dict, List, Optional
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from utils import startup
+from utils.dates import add_months, month_range, month_start
 
-print(">>> USING NEW DB.PY <<<")
+from config import (
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    FETCH_MAX_WORKERS,
+    IMPORT_BATCH_SIZE,
+    RECURRING_RETRY_SECONDS,
+    REPLICA_ENABLED,
+    REPLICA_FULL_SYNC_SECONDS,
+    REPLICA_PATH,
+    REPLICA_SYNC_SECONDS,
+    ROLLUP_REFRESH_SECONDS,
+    SEARCH_REFRESH_SECONDS,
+)
+import recurrence
+import supabase_client
+from query_stats import query_log
+from replica import TABLES as REPLICA_TABLES, LocalReplica
+from search_index import SEARCH_COLUMNS, TransactionIndex
+
+if TYPE_CHECKING:
+    from postgrest import SyncPostgrestClient
+
+# -----------------------------
+# Client
+# -----------------------------
+_client: Optional["SyncPostgrestClient"] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> "SyncPostgrestClient":
+    """
+    The pooled REST client (see supabase_client.py), built on first use.
+    db.py stays imported for the life of the server process, so every
+    session shares it and its kept-alive connections.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                started = time.perf_counter()
+                # OLD FORMAT SECRETS (kept for stability)
+                _client = supabase_client.create_pooled_client(
+                    st.secrets["SUPABASE_URL"], st.secrets["SUPABASE_KEY"]
+                )
+                startup.record("supabase client", (time.perf_counter() - started) * 1000)
+    return _client
+
+
+def set_client(client) -> None:
+    """
+    Use `client` for every query from now on (the benchmarks pass an
+    in-memory stand-in). Cached results from the old client are dropped.
+    """
+    global _client, _materialize_failed_at
+    with _client_lock:
+        _client = client
+    _cache.clear()
+    _rollups.reset()
+    _search.reset()
+    _missing_rpcs.clear()
+    _materialize_failed_at = None
+
+
+def get_supabase_url() -> str:
+    return st.secrets["SUPABASE_URL"]
 
-# OLD FORMAT SECRETS (kept for stability)
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 # -----------------------------
 # Internal execution wrapper
 # -----------------------------
 def _exec(query):
+    started = time.perf_counter()
     try:
-        resp = query.execute()
-        return {"success": True, "data": resp.data}
+        resp = supabase_client.execute(query)
+        result = {"success": True, "data": resp.data}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        result = {"success": False, "error": str(e)}
+    query_log.record(query, time.perf_counter() - started, result)
+    return result
+
+
+# -----------------------------
+# Read cache
+# -----------------------------
+class _TTLCache:
+    """
+    Small process-wide LRU cache with per-entry TTL.
+
+    Streamlit imports db.py once per server process, so every session
+    shares this instance; all access goes through a single lock.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, allow_stale: bool = False):
+        # Expired entries stay until evicted or invalidated, so a stale
+        # copy can still be served while the backend is down.
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic() and not allow_stale:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, object], bool]) -> None:
+        with self._lock:
+            stale = [k for k, (_, v) in self._entries.items() if predicate(k, v)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = _TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+def _cached_exec(key: Tuple, query):
+    """
+    Run a read query through the shared cache.
+    Only successful responses are stored, so errors are retried next time.
+    If the request fails, an expired copy is served instead when there is
+    one (flagged "stale"). Callers get a private copy because pages are
+    free to mutate rows.
+    """
+    hit = _cache.get(key)
+    if hit is not None:
+        return {"success": True, "data": copy.deepcopy(hit)}
+
+    r = _exec(query)
+    if r["success"]:
+        _cache.set(key, copy.deepcopy(r["data"]))
+        return r
+
+    stale = _cache.get(key, allow_stale=True)
+    if stale is not None:
+        return {"success": True, "data": copy.deepcopy(stale), "stale": True}
+    return r
+
+
+def _month_key(date_value) -> Optional[Tuple[int, int]]:
+    if not date_value:
+        return None
+    text = str(date_value)
+    return int(text[0:4]), int(text[5:7])
+
+
+def _contains_transaction(value, transaction_id) -> bool:
+    if isinstance(value, dict):
+        return value.get("id") == transaction_id
+    if isinstance(value, list):
+        return any(isinstance(row, dict) and row.get("id") == transaction_id for row in value)
+    return False
+
+
+def _invalidate_transactions(rows: List[Dict], extra_ids: Tuple = ()) -> None:
+    """
+    Drop only the cache entries a transaction write can affect: query
+    results whose date range covers a written row, the row itself, its
+    parent's children list and any other cached result containing it.
+    """
+    keys = []
+    ids = set(extra_ids)
+    dates = set()
+
+    for row in rows or []:
+        ids.add(row.get("id"))
+        if row.get("date"):
+            dates.add(str(row["date"])[:10])
+        if row.get("parent_id"):
+            keys.append(("child_transactions", row["parent_id"]))
+
+    ids.discard(None)
+    keys.extend(("transaction", tx_id) for tx_id in ids)
+    _cache.invalidate(*keys)
+
+    def in_range(start, end) -> bool:
+        # A query sees the write if a written row's date is in its range
+        return any((start is None or d >= start) and (end is None or d < end) for d in dates)
+
+    # Any write can shift rows across keyset / query page boundaries, and a
+    # new child can join any batched children lookup. Updates only return
+    # the new row, so aggregates are dropped whatever range they cover.
+    _cache.invalidate_where(
+        lambda key, value: key[0] in ("transactions_page", "children_for_parents", "aggregate")
+        or (key[0] == "transactions_query" and in_range(key[1][3], key[1][4]))
+        or (
+            key[0] != "budgets"
+            and any(_contains_transaction(value, tx_id) for tx_id in ids)
+        )
+    )
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+# -----------------------------
+# Concurrent reads
+# -----------------------------
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS, thread_name_prefix="db-fetch")
+_fetch_local = threading.local()
+
+
+def _run_fetch(context, fn, args):
+    _fetch_local.in_pool = True
+    try:
+        with query_log.attach(context):
+            return fn(*args)
+    finally:
+        _fetch_local.in_pool = False
+
+
+def fetch_all(calls: Dict[Hashable, Tuple]) -> Dict[Hashable, object]:
+    """
+    Run independent reads at the same time, so a page waits for its
+    slowest query instead of the sum of them:
+
+        data = fetch_all({
+            "tx": (get_transaction_by_id, tx_id),
+            "accounts": (get_accounts,),
+        })
+
+    Returns {name: result}; the first exception raised by a call is
+    re-raised. Calls made from inside a fetch run inline, so nested fan-out
+    can't exhaust the pool. Queries count towards the calling rerun.
+    """
+    if len(calls) <= 1 or getattr(_fetch_local, "in_pool", False):
+        return {name: fn(*args) for name, (fn, *args) in calls.items()}
+
+    context = query_log.context()
+    futures = {
+        name: _fetch_pool.submit(_run_fetch, context, fn, args)
+        for name, (fn, *args) in calls.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+# -----------------------------
+# Local replica
+# -----------------------------
+_replica: Optional[LocalReplica] = (
+    LocalReplica(REPLICA_PATH, REPLICA_SYNC_SECONDS, REPLICA_FULL_SYNC_SECONDS)
+    if REPLICA_ENABLED
+    else None
+)
+
+
+def _pull_rows(table: str, since: Optional[str], start: int, limit: int) -> Optional[List[Dict]]:
+    q = (
+        get_client().table(table)
+        .select("*")
+        .order("updated_at")
+        .order("id")
+        .range(start, start + limit - 1)
+    )
+    if since is not None:
+        q = q.gte("updated_at", since)
+    r = _exec(q)
+    return r["data"] if r["success"] else None
+
+
+def _use_replica() -> bool:
+    """
+    True if reads should be served from the local replica.
+    Pulls deltas first when the last sync is older than REPLICA_SYNC_SECONDS;
+    if that fails, a replica that has been fully synced once still serves.
+    """
+    if _replica is None:
+        return False
+    if not _replica.fresh:
+        _replica.sync(_pull_rows)
+    return _replica.synced
+
+
+def _replica_apply(table: str, rows: List[Dict]) -> None:
+    if _replica is not None:
+        _replica.apply(table, rows)
+
+
+def _replica_mark_stale() -> None:
+    # After an RPC write, whose returned rows may not be all it changed
+    if _replica is not None:
+        _replica.mark_stale()
 
 
 # -----------------------------
 # Accounts
 # -----------------------------
 def get_accounts() -> List[Dict]:
-    q = supabase.table("accounts").select("*").order("name")
-    r = _exec(q)
+    if _use_replica():
+        return _replica.select("accounts", order="name")
+
+    q = get_client().table("accounts").select("*").order("name")
+    r = _cached_exec(("accounts",), q)
     return r["data"] if r["success"] else []
 
 
+# -----------------------------
+# Account balance rollups
+# -----------------------------
+def balance_delta(tx: Dict) -> float:
+    """
+    How much a transaction moves its account balance.
+    Deleted rows and split parents (their children carry the amounts)
+    don't count; transfers are ignored until v1.2.
+    """
+    if tx.get("deleted") or tx.get("is_split_parent"):
+        return 0.0
+
+    tx_type = tx.get("type", "expense")
+    if tx_type == "transfer":
+        return 0.0
+
+    amt = float(tx["amount"])
+    return amt if tx_type == "income" else -amt
+
+
+class _BalanceRollups:
+    """
+    Per-account, per-month balance totals: {(account_id, "YYYY-MM"): total}.
+
+    Built once from the ledger, then kept current by the transaction
+    write functions applying before/after deltas. Rebuilt from scratch
+    every ROLLUP_REFRESH_SECONDS to pick up writes made elsewhere.
+
+    Also serves month-end checkpoints for running balances: per account,
+    the closing balance of every month (a prefix sum over its buckets),
+    computed on first use. A write only drops the checkpoints from its
+    month on; they are re-summed from the last one still valid.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._buckets: Dict[Tuple, float] = {}
+        # account → ([month, ...], [closing balance, ...]), months ascending
+        self._checkpoints: Dict[str, Tuple[List[str], List[float]]] = {}
+        # account → earliest month whose checkpoint is out of date
+        self._stale_from: Dict[str, str] = {}
+        self._built_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._built_at is not None
+            and time.monotonic() - self._built_at < self.refresh_seconds
+        )
+
+    def _bucket(self, tx: Dict) -> Tuple:
+        return tx.get("account_id"), str(tx.get("date"))[:7]
+
+    def _add(self, buckets: Dict[Tuple, float], tx: Dict, sign: float) -> None:
+        delta = balance_delta(tx)
+        if delta:
+            key = self._bucket(tx)
+            buckets[key] = buckets.get(key, 0.0) + sign * delta
+            if buckets is self._buckets:
+                account_id, month = key
+                stale = self._stale_from.get(account_id)
+                if stale is None or month < stale:
+                    self._stale_from[account_id] = month
+
+    def _ledger(self) -> Optional[List[Dict]]:
+        # Counted rows only: not deleted, not split parents
+        return _fetch_transactions(
+            _transaction_spec(
+                split="leaf",
+                columns=("id", "date", "amount", "type", "account_id", "is_split_parent"),
+            )
+        )
+
+    def build(self) -> bool:
+        with self._build_lock:
+            if self.ready:
+                return True
+
+            rows = self._ledger()
+            if rows is None:
+                return False
+
+            buckets: Dict[Tuple, float] = {}
+            for tx in rows:
+                self._add(buckets, tx, 1.0)
+
+            with self._lock:
+                self._buckets = buckets
+                self._checkpoints = {}
+                self._stale_from = {}
+                self._built_at = time.monotonic()
+            return True
+
+    def reset(self) -> None:
+        # Previous row unknown: a delta can't be computed, rebuild instead.
+        self._built_at = None
+
+    def apply(self, old_rows: List[Dict], new_rows: List[Dict]) -> None:
+        if self._built_at is None:
+            return
+        with self._lock:
+            for tx in old_rows or []:
+                self._add(self._buckets, tx, -1.0)
+            for tx in new_rows or []:
+                self._add(self._buckets, tx, 1.0)
+
+    def balances(self) -> Dict[str, float]:
+        with self._lock:
+            totals: Dict[str, float] = {}
+            for (account_id, _), amount in self._buckets.items():
+                totals[account_id] = totals.get(account_id, 0.0) + amount
+            return totals
+
+    def opening_balance(self, account_id: str, month: str) -> float:
+        """
+        Balance of account_id before `month` ("YYYY-MM") begins: the
+        closing checkpoint of the latest earlier month with activity.
+        """
+        with self._lock:
+            months, closing = self._checkpoints.get(account_id, ([], []))
+            stale = self._stale_from.pop(account_id, None)
+            if account_id not in self._checkpoints or stale is not None:
+                # Keep checkpoints before the first changed month, re-sum the rest
+                keep = bisect.bisect_left(months, stale) if stale is not None else 0
+                months, closing = months[:keep], closing[:keep]
+                total = closing[-1] if closing else 0.0
+                for m in sorted(m for (a, m) in self._buckets if a == account_id and (not months or m > months[-1])):
+                    total += self._buckets[(account_id, m)]
+                    months.append(m)
+                    closing.append(total)
+                self._checkpoints[account_id] = (months, closing)
+
+            i = bisect.bisect_left(months, month)
+            return closing[i - 1] if i else 0.0
+
+
+_rollups = _BalanceRollups(ROLLUP_REFRESH_SECONDS)
+
+
+_RUNNING_COLUMNS = ("id", "date", "amount", "type", "account_id", "is_split_parent")
+
+
+def _month_running_balances(month: str) -> Dict[str, Tuple[List[Tuple[str, str]], List[float]]]:
+    # Per account: (date, id) keys of the month's counted rows in order, and
+    # the balance after each, starting from the month's opening checkpoint
+    start = datetime.date.fromisoformat(month + "-01")
+    rows = query_transactions(split="leaf", start=start, end=add_months(start, 1), columns=_RUNNING_COLUMNS)
+
+    result: Dict[str, Tuple[List[Tuple[str, str]], List[float]]] = {}
+    for tx in rows:
+        account_id = tx.get("account_id")
+        if account_id not in result:
+            result[account_id] = ([], [])
+        keys, running = result[account_id]
+        before = running[-1] if running else _rollups.opening_balance(account_id, month)
+        keys.append((str(tx["date"])[:10], str(tx["id"])))
+        running.append(before + balance_delta(tx))
+    return result
+
+
+def get_running_balances(rows: List[Dict]) -> Dict[str, float]:
+    """
+    {transaction id: account balance right after it} for `rows` (e.g. one
+    page of the transaction list), in (date, id) order per account.
+
+    Each row costs a lookup from its month's opening checkpoint (see
+    _BalanceRollups.opening_balance) plus a prefix sum over that month's
+    rows, which are read once per month through the query cache.
+    Split parents and deleted rows show the balance at their position.
+    """
+    if not rows or (not _rollups.ready and not _rollups.build()):
+        return {}
+
+    months = sorted({str(tx["date"])[:7] for tx in rows if tx.get("date")})
+    by_month = fetch_all({month: (_month_running_balances, month) for month in months})
+
+    result = {}
+    for tx in rows:
+        if not tx.get("date"):
+            continue
+        month = str(tx["date"])[:7]
+        account_id = tx.get("account_id")
+        keys, running = by_month[month].get(account_id, ([], []))
+        i = bisect.bisect_right(keys, (str(tx["date"])[:10], str(tx["id"])))
+        result[tx["id"]] = running[i - 1] if i else _rollups.opening_balance(account_id, month)
+    return result
+
+
+def get_account_balances() -> Optional[Dict[str, float]]:
+    """
+    {account_id: balance}, accounts without transactions left out.
+    Computed by the account_balances RPC (one row per account); where that
+    isn't deployed, summed from the monthly rollups. None if neither is
+    available, so callers can tell that from an empty ledger.
+    """
+    rows = _server_aggregate("account_balances", None, None)
+    if rows is not None:
+        return {row["account_id"]: float(row["balance"]) for row in rows}
+
+    if not _rollups.ready and not _rollups.build():
+        return None
+    return _rollups.balances()
+
+
 # -----------------------------
 # Transactions
 # -----------------------------
+TRANSACTION_COLUMNS = (
+    "id", "date", "amount", "description", "category", "type",
+    "account_id", "notes", "deleted", "is_split_parent", "parent_id",
+)
+
+# split= filters: which rows of a split family to return
+SPLIT_ROLES = {
+    "parent": "split parents only",
+    "child": "split children only",
+    "top": "everything but split children (parents + normal rows)",
+    "leaf": "everything but split parents (children + normal rows)",
+}
+
+_QUERY_PAGE_SIZE = 1000
+
+
+def _transaction_spec(
+    deleted: Optional[bool] = False,
+    split: Optional[str] = None,
+    account_id: Optional[str] = None,
+    start=None,
+    end=None,
+    category=None,
+    columns=TRANSACTION_COLUMNS,
+) -> Tuple:
+    if split is not None and split not in SPLIT_ROLES:
+        raise ValueError(f"split must be one of {sorted(SPLIT_ROLES)}, not {split!r}")
+    if isinstance(category, str):
+        category = (category,)
+    if category is not None:
+        category = tuple(sorted(c.strip().lower() for c in category))
+    columns = tuple(columns)
+    if "id" not in columns:
+        columns = ("id",) + columns
+    return (
+        deleted,
+        split,
+        account_id,
+        None if start is None else str(start)[:10],
+        None if end is None else str(end)[:10],
+        category,
+        columns,
+    )
+
+
+def _spec_where(spec: Tuple) -> Tuple[str, List]:
+    # Same filters as SQL for the local replica
+    deleted, split, account_id, start, end, category, _ = spec
+    clauses, params = [], []
+    if deleted is not None:
+        clauses.append("deleted = ?")
+        params.append(int(deleted))
+    if split == "parent":
+        clauses.append("is_split_parent = 1")
+    elif split == "child":
+        clauses.append("parent_id IS NOT NULL")
+    elif split == "top":
+        clauses.append("parent_id IS NULL")
+    elif split == "leaf":
+        clauses.append("COALESCE(is_split_parent, 0) = 0")
+    if account_id is not None:
+        clauses.append("account_id = ?")
+        params.append(account_id)
+    if start is not None:
+        clauses.append("date >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("date < ?")
+        params.append(end)
+    if category is not None:
+        clauses.append(f"category IN ({', '.join('?' for _ in category)})")
+        params.extend(category)
+    return " AND ".join(clauses), params
+
+
+def _spec_query(spec: Tuple, page_start: int):
+    deleted, split, account_id, start, end, category, columns = spec
+    q = get_client().table("transactions").select(", ".join(columns))
+    if deleted is not None:
+        q = q.eq("deleted", deleted)
+    if split == "parent":
+        q = q.eq("is_split_parent", True)
+    elif split == "child":
+        q = q.not_.is_("parent_id", "null")
+    elif split == "top":
+        q = q.is_("parent_id", "null")
+    elif split == "leaf":
+        # NULL counts as not a parent, as in sql/monthly_aggregates.sql
+        q = q.or_("is_split_parent.is.null,is_split_parent.eq.false")
+    if account_id is not None:
+        q = q.eq("account_id", account_id)
+    if start is not None:
+        q = q.gte("date", start)
+    if end is not None:
+        q = q.lt("date", end)
+    if category is not None:
+        q = q.in_("category", list(category))
+    return q.order("date").order("id").range(page_start, page_start + _QUERY_PAGE_SIZE - 1)
+
+
+def _fetch_transactions(spec: Tuple) -> Optional[List[Dict]]:
+    """
+    All rows matching spec, paged through PostgREST's row limit.
+    None if any page failed.
+    """
+    columns = spec[-1]
+    if _use_replica():
+        where, params = _spec_where(spec)
+        rows = _replica.select("transactions", where, params, order="date, id")
+        return [{c: row.get(c) for c in columns} for row in rows]
+
+    rows: List[Dict] = []
+    page_start = 0
+    while True:
+        r = _cached_exec(("transactions_query", spec, page_start), _spec_query(spec, page_start))
+        if not r["success"]:
+            return None
+        rows.extend(r["data"])
+        if len(r["data"]) < _QUERY_PAGE_SIZE:
+            return rows
+        page_start += _QUERY_PAGE_SIZE
+
+
+def query_transactions(
+    deleted: Optional[bool] = False,
+    split: Optional[str] = None,
+    account_id: Optional[str] = None,
+    start=None,
+    end=None,
+    category=None,
+    columns=TRANSACTION_COLUMNS,
+) -> List[Dict]:
+    """
+    Transactions filtered and projected server-side, ordered by (date, id).
+
+    deleted:    False (default) / True, or None for both
+    split:      None for every row, or a key of SPLIT_ROLES
+    account_id: one account
+    start, end: date range, start inclusive, end exclusive (date or "YYYY-MM-DD")
+    category:   one category or a list of them (matched lower-cased)
+    columns:    the columns to download ("id" is always included)
+    """
+    spec = _transaction_spec(deleted, split, account_id, start, end, category, columns)
+    rows = _fetch_transactions(spec)
+    return rows if rows is not None else []
+
+
 def get_all_transactions() -> List[Dict]:
-    q = supabase.table("transactions").select(
-        "id, date, amount, description, category, type, "
-        "account_id, notes, deleted, is_split_parent, parent_id"
+    # Every row, deleted included, every column
+    return query_transactions(deleted=None)
+
+
+def get_transactions_page(
+    cursor: Optional[Tuple[str, str]] = None, limit: int = 50
+) -> Dict:
+    """
+    One page of non-deleted transactions, newest first, using keyset
+    pagination on (date, id). Pass the returned next_cursor to get the
+    following page; it is None on the last page.
+    """
+    if _use_replica():
+        where, params = "deleted = 0", []
+        if cursor is not None:
+            where += " AND (date < ? OR (date = ? AND id < ?))"
+            params = [cursor[0], cursor[0], cursor[1]]
+        rows = _replica.select(
+            "transactions", where, params, order="date DESC, id DESC", limit=limit + 1
+        )
+    else:
+        rows = _fetch_transactions_page(cursor, limit)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1]["date"], rows[-1]["id"])
+
+    return {"rows": rows, "next_cursor": next_cursor}
+
+
+def _fetch_transactions_page(cursor: Optional[Tuple[str, str]], limit: int) -> List[Dict]:
+    q = (
+        get_client().table("transactions")
+        .select(
+            "id, date, amount, description, category, type, "
+            "account_id, notes, deleted, is_split_parent, parent_id"
+        )
+        .eq("deleted", False)
+        .order("date", desc=True)
+        .order("id", desc=True)
+        .limit(limit + 1)
     )
-    r = _exec(q)
+    if cursor is not None:
+        last_date, last_id = cursor
+        q = q.or_(f"date.lt.{last_date},and(date.eq.{last_date},id.lt.{last_id})")
+
+    r = _cached_exec(("transactions_page", cursor, limit), q)
     return r["data"] if r["success"] else []
 
 
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+
+def prefetch_transactions_page(cursor: Optional[Tuple[str, str]], limit: int = 50) -> None:
+    """
+    Warm the cache with the next page in a background thread so the
+    "Next" click is a memory hit. No-op if already cached or in flight,
+    or when pages are read from the local replica.
+    """
+    key = ("transactions_page", cursor, limit)
+    if cursor is None or _cache.get(key) is not None:
+        return
+    if _replica is not None and _replica.synced:
+        return
+
+    with _prefetch_lock:
+        if key in _prefetching:
+            return
+        _prefetching.add(key)
+
+    def _run():
+        try:
+            get_transactions_page(cursor, limit)
+        finally:
+            with _prefetch_lock:
+                _prefetching.discard(key)
+
+    threading.Thread(target=_run, daemon=True).start()
+
+
 def get_transaction_by_id(transaction_id: str) -> Optional[Dict]:
+    if _use_replica():
+        rows = _replica.select("transactions", "id = ?", [transaction_id])
+        return rows[0] if rows else None
+
     q = (
-        supabase.table("transactions")
+        get_client().table("transactions")
         .select(
             "id, date, amount, description, category, type, "
             "account_id, notes, deleted, is_split_parent, parent_id"
@@ -51,13 +781,16 @@ def get_transaction_by_id(transaction_id: str) -> Optional[Dict]:
         .eq("id", transaction_id)
         .single()
     )
-    r = _exec(q)
+    r = _cached_exec(("transaction", transaction_id), q)
     return r["data"] if r["success"] else None
 
 
 def get_child_transactions(parent_id: str) -> List[Dict]:
+    if _use_replica():
+        return _replica.select("transactions", "parent_id = ? AND deleted = 0", [parent_id])
+
     q = (
-        supabase.table("transactions")
+        get_client().table("transactions")
         .select(
             "id, date, amount, description, category, type, "
             "account_id, notes, deleted, is_split_parent, parent_id"
@@ -65,29 +798,121 @@ def get_child_transactions(parent_id: str) -> List[Dict]:
         .eq("parent_id", parent_id)
         .eq("deleted", False)
     )
-    r = _exec(q)
+    r = _cached_exec(("child_transactions", parent_id), q)
     return r["data"] if r["success"] else []
 
 
+_SPLIT_ID_CHUNK = 200
+
+
+def get_children_for_parents(parent_ids: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Non-deleted children of many split parents in one `in` query per
+    chunk of ids (chunked only to keep the URL short).
+    Returns {parent_id: [children]}; parents without children map to [].
+    """
+    index: Dict[str, List[Dict]] = {pid: [] for pid in parent_ids}
+    ids = list(index)
+
+    if _use_replica():
+        for start in range(0, len(ids), _SPLIT_ID_CHUNK):
+            chunk = ids[start:start + _SPLIT_ID_CHUNK]
+            marks = ", ".join("?" for _ in chunk)
+            for child in _replica.select(
+                "transactions", f"parent_id IN ({marks}) AND deleted = 0", chunk
+            ):
+                index.setdefault(child["parent_id"], []).append(child)
+        return index
+
+    for start in range(0, len(ids), _SPLIT_ID_CHUNK):
+        chunk = ids[start:start + _SPLIT_ID_CHUNK]
+        q = (
+            get_client().table("transactions")
+            .select(
+                "id, date, amount, description, category, type, "
+                "account_id, notes, deleted, is_split_parent, parent_id"
+            )
+            .in_("parent_id", chunk)
+            .eq("deleted", False)
+        )
+        r = _cached_exec(("children_for_parents", tuple(chunk)), q)
+        for child in r["data"] if r["success"] else []:
+            index.setdefault(child["parent_id"], []).append(child)
+
+    return index
+
+
+def get_split_parents() -> List[Dict]:
+    return query_transactions(split="parent")
+
+
+def get_split_index(parents: Optional[List[Dict]] = None) -> Dict[str, List[Dict]]:
+    """
+    parent_id → children for the given parents (all split parents if
+    None). Costs one query for the parents plus one for their children.
+    """
+    if parents is None:
+        parents = get_split_parents()
+    return get_children_for_parents([p["id"] for p in parents])
+
+
 def insert_transaction(data: Dict):
     if data.get("category"):
         data["category"] = data["category"].strip().lower()
 
-    q = supabase.table("transactions").insert(data)
+    q = get_client().table("transactions").insert(data)
     r = _exec(q)
 
     if not r["success"]:
         raise RuntimeError(f"Insert transaction failed: {r['error']}")
 
+    _invalidate_transactions(r["data"])
+    _rollups.apply([], r["data"])
+    _replica_apply("transactions", r["data"])
+    _search.apply(r["data"])
+
     return r["data"]
 
 
+def insert_transactions_in_batches(rows: List[Dict], batch_size: int = IMPORT_BATCH_SIZE):
+    """
+    Bulk insert, one request per batch of rows.
+    Yields a result dict per batch so callers can report progress and
+    keep going past a failed batch:
+        {"batch": i, "rows": n, "success": bool, "error": str | None}
+    """
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        for row in batch:
+            if row.get("category"):
+                row["category"] = row["category"].strip().lower()
+
+        q = get_client().table("transactions").insert(batch)
+        r = _exec(q)
+
+        if r["success"]:
+            _invalidate_transactions(r["data"])
+            _rollups.apply([], r["data"])
+            _replica_apply("transactions", r["data"])
+            _search.apply(r["data"])
+
+        yield {
+            "batch": start // batch_size,
+            "rows": len(batch),
+            "success": r["success"],
+            "error": r.get("error"),
+        }
+
+
 def update_transaction(transaction_id: str, data: Dict):
     if data.get("category"):
         data["category"] = data["category"].strip().lower()
 
+    # Previous version of the row, for the balance rollup delta
+    old = get_transaction_by_id(transaction_id) if _rollups.ready else None
+
     q = (
-        supabase.table("transactions")
+        get_client().table("transactions")
         .update(data)
         .eq("id", transaction_id)
     )
@@ -96,12 +921,25 @@ def update_transaction(transaction_id: str, data: Dict):
     if not r["success"]:
         raise RuntimeError(f"Update transaction failed: {r['error']}")
 
+    if old is None:
+        _rollups.reset()
+    else:
+        _rollups.apply([old], r["data"])
+
+    # Cached results holding the old version of the row (e.g. its old
+    # month) are found by id, the new month from the returned row.
+    _invalidate_transactions(r["data"], (transaction_id,))
+    _replica_apply("transactions", r["data"])
+    _search.apply(r["data"])
+
     return r["data"]
 
 
 def delete_transaction(transaction_id: str):
+    old = get_transaction_by_id(transaction_id) if _rollups.ready else None
+
     q = (
-        supabase.table("transactions")
+        get_client().table("transactions")
         .update({"deleted": True})
         .eq("id", transaction_id)
     )
@@ -110,67 +948,344 @@ def delete_transaction(transaction_id: str):
     if not r["success"]:
         raise RuntimeError(f"Delete transaction failed: {r['error']}")
 
+    if old is None:
+        _rollups.reset()
+    else:
+        _rollups.apply([old], r["data"])
+
+    _invalidate_transactions(r["data"], (transaction_id,))
+    _replica_apply("transactions", r["data"])
+    _search.apply(r["data"])
+
     return r["data"]
 
 
+# Ids per request when set_cleared falls back to a filtered update (the
+# ids go in the URL there)
+_CLEAR_BATCH = 150
+
+
+def get_reconcile_transactions(account_id: str, columns=TRANSACTION_COLUMNS) -> List[Dict]:
+    """
+    An account's non-deleted transactions, split parents left out, for
+    reconciliation (columns should include "cleared"). Unlike
+    query_transactions(), a failed read raises RuntimeError rather than
+    returning []: no rows means a fully reconciled account.
+    """
+    spec = _transaction_spec(False, "leaf", account_id, None, None, None, columns)
+    rows = _fetch_transactions(spec)
+    if rows is not None:
+        return rows
+
+    # Name the usual cause rather than a bare failure
+    r = _exec(get_client().table("transactions").select("cleared").limit(1))
+    if not r["success"] and _is_missing_column(r["error"]):
+        raise RuntimeError("Transactions have no cleared column yet: apply sql/reconcile.sql")
+    raise RuntimeError("Transactions could not be read")
+
+
+def _clear_error(error: str) -> RuntimeError:
+    if _is_missing_column(error):
+        return RuntimeError("Transactions have no cleared column yet: apply sql/reconcile.sql")
+    return RuntimeError(f"Marking transactions cleared failed: {error}")
+
+
+def set_cleared(transaction_ids: List[str], cleared: bool = True) -> int:
+    """
+    Set the reconciliation flag on many transactions at once: one
+    set_cleared RPC call, or filtered updates of _CLEAR_BATCH ids where
+    that function isn't deployed. Balances don't change, so the rollups
+    are left alone. Returns the number of rows updated.
+    """
+    ids = list(dict.fromkeys(transaction_ids))
+    if not ids:
+        return 0
+
+    r = _exec(get_client().rpc("set_cleared", {"transaction_ids": ids, "value": cleared}))
+    if r["success"]:
+        updated = r["data"] or []
+    elif _is_missing_function(r["error"]):
+        updated = []
+        for start in range(0, len(ids), _CLEAR_BATCH):
+            q = (
+                get_client().table("transactions")
+                .update({"cleared": cleared})
+                .in_("id", ids[start:start + _CLEAR_BATCH])
+            )
+            r = _exec(q)
+            if not r["success"]:
+                _invalidate_transactions(updated, tuple(ids))
+                _replica_apply("transactions", updated)
+                raise _clear_error(r["error"])
+            updated.extend(r["data"])
+    else:
+        raise _clear_error(r["error"])
+
+    _invalidate_transactions(updated, tuple(ids))
+    _replica_apply("transactions", updated)
+    _replica_mark_stale()
+    return len(updated)
+
+
+# -----------------------------
+# Search
+# -----------------------------
+_search = TransactionIndex(SEARCH_REFRESH_SECONDS)
+
+
+def _search_ledger() -> Optional[List[Dict]]:
+    return _fetch_transactions(_transaction_spec(columns=SEARCH_COLUMNS))
+
+
+def search_transactions(
+    text: str = "",
+    account_ids: Optional[List[str]] = None,
+    categories: Optional[List[str]] = None,
+    types: Optional[List[str]] = None,
+    start=None,
+    end=None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: str = "date",
+    descending: bool = True,
+    offset: int = 0,
+    limit: int = 50,
+) -> Dict:
+    """
+    Non-deleted transactions matching every given filter, from the
+    in-memory index (search_index.py):
+
+    text:                  words matched anywhere in description, notes
+                           or category (each word must match)
+    account_ids, categories, types: any of the listed values
+    start, end:            date range, start inclusive, end exclusive
+    min_amount, max_amount: inclusive
+    sort:                  "date" or "amount"; offset / limit page through
+
+    Returns {"rows": [...], "total": n}; empty if the index can't be built.
+    """
+    if not _search.ready and not _search.build(_search_ledger):
+        return {"rows": [], "total": 0}
+
+    rows, total = _search.search(
+        text,
+        account_ids,
+        categories,
+        types,
+        None if start is None else str(start)[:10],
+        None if end is None else str(end)[:10],
+        min_amount,
+        max_amount,
+        sort,
+        descending,
+        offset,
+        limit,
+    )
+    return {"rows": rows, "total": total}
+
+
+def get_search_facets() -> Dict[str, List]:
+    """Distinct categories and types in the index, for filter widgets."""
+    if not _search.ready and not _search.build(_search_ledger):
+        return {"category": [], "type": []}
+    return {facet: _search.facet_values(facet) for facet in ("category", "type")}
+
+
 # -----------------------------
 # Monthly Queries
 # -----------------------------
 def get_transactions_for_month(year: int, month: int) -> List[Dict]:
+    """
+    The month's transactions, with the recurring occurrences not in the
+    ledger yet merged in by date (their id starts with "recurring:").
+    """
     start = f"{year}-{month:02d}-01"
     end_month = month + 1 if month < 12 else 1
     end_year = year if month < 12 else year + 1
     end = f"{end_year}-{end_month:02d}-01"
 
-    q = (
-        supabase.table("transactions")
-        .select(
-            "id, date, amount, description, category, type, "
-            "account_id, notes, deleted, is_split_parent, parent_id"
-        )
-        .gte("date", start)
-        .lt("date", end)
-        .eq("deleted", False)
+    rows = query_transactions(start=start, end=end)
+    pending = get_recurring_occurrences(start, end)
+    if not pending:
+        return rows
+    return sorted(rows + pending, key=lambda tx: (str(tx["date"])[:10], str(tx["id"])))
+
+
+# -----------------------------
+# Aggregates
+# -----------------------------
+# Postgres functions in sql/monthly_aggregates.sql; each has an in-process
+# twin below with identical rules, used when the function isn't deployed
+# (and by the local replica, whose reads never touch the network).
+_missing_rpcs = set()
+
+
+def _local_category_totals(rows: List[Dict]) -> List[Dict]:
+    # Split parents skipped (children carry the categories); deleted rows
+    # are already filtered out by the query
+    totals: Dict[Tuple, float] = {}
+    for tx in rows:
+        if tx.get("is_split_parent"):
+            continue
+        key = (str(tx["date"])[:7] + "-01", (tx.get("category") or "").strip().lower())
+        totals[key] = totals.get(key, 0.0) + float(tx["amount"] or 0)
+    return [
+        {"month": month, "category": category, "actual": actual}
+        for (month, category), actual in sorted(totals.items())
+    ]
+
+
+def _local_income_expense(rows: List[Dict]) -> List[Dict]:
+    totals: Dict[str, List[float]] = {}
+    for tx in rows:
+        if tx.get("is_split_parent"):
+            continue
+        month = str(tx["date"])[:7] + "-01"
+        bucket = totals.setdefault(month, [0.0, 0.0])
+        bucket[0 if (tx.get("type") or "expense") == "income" else 1] += float(tx["amount"] or 0)
+    return [
+        {"month": month, "income": income, "expenses": abs(expenses), "net": income - abs(expenses)}
+        for month, (income, expenses) in sorted(totals.items())
+    ]
+
+
+def _local_account_balances(rows: List[Dict]) -> List[Dict]:
+    totals: Dict[str, float] = {}
+    for tx in rows:
+        delta = balance_delta(tx)
+        if delta:
+            totals[tx["account_id"]] = totals.get(tx["account_id"], 0.0) + delta
+    return [{"account_id": a, "balance": b} for a, b in sorted(totals.items())]
+
+
+_AGGREGATE_COLUMNS = ("date", "amount", "category", "type", "account_id", "is_split_parent")
+
+_LOCAL_AGGREGATES = {
+    "monthly_category_totals": _local_category_totals,
+    "monthly_income_expense": _local_income_expense,
+    "account_balances": _local_account_balances,
+}
+
+
+def _server_aggregate(name: str, start, end) -> Optional[List[Dict]]:
+    """
+    Rows of the `name` RPC for start <= month < end (both None for
+    all-time functions). None if the function isn't deployed or failed.
+    """
+    if name in _missing_rpcs or _use_replica():
+        return None
+
+    params = {} if start is None else {"start_month": start, "end_month": end}
+    r = _cached_exec(("aggregate", name, start, end), get_client().rpc(name, params))
+    if r["success"]:
+        return r["data"]
+    if _is_missing_function(r["error"]):
+        _missing_rpcs.add(name)
+    return None
+
+
+def _aggregate(name: str, start, end) -> List[Dict]:
+    rows = _server_aggregate(name, start, end)
+    if rows is not None:
+        return rows
+
+    # In-process fallback over just the columns the rules need
+    tx = query_transactions(
+        split="leaf",
+        start=start,
+        end=end,
+        columns=_AGGREGATE_COLUMNS,
     )
-    r = _exec(q)
-    return r["data"] if r["success"] else []
+    return _LOCAL_AGGREGATES[name](tx)
+
+
+def get_monthly_category_totals(start: datetime.date, end: datetime.date) -> List[Dict]:
+    """
+    [{"month": "YYYY-MM-01", "category", "actual"}] for start <= month < end.
+    Split-aware: parents skipped, children counted; deleted rows excluded.
+    """
+    return _aggregate("monthly_category_totals", month_start(start).isoformat(), month_start(end).isoformat())
+
+
+def get_monthly_income_expense(start: datetime.date, end: datetime.date) -> List[Dict]:
+    """
+    [{"month": "YYYY-MM-01", "income", "expenses", "net"}] for start <= month < end.
+    Expenses are every type other than "income", reported as abs(total).
+    """
+    return _aggregate("monthly_income_expense", month_start(start).isoformat(), month_start(end).isoformat())
 
 
 # -----------------------------
 # Budgets (Supabase v2 FIXED)
 # -----------------------------
-def get_monthly_budget_totals_by_category(year: int, month: int) -> Dict[str, float]:
+def _invalidate_budgets(year: int, month: int) -> None:
     month_date = f"{year}-{month:02d}-01"
-
-    q = (
-        supabase.table("budgets")
-        .select("category, amount")
-        .eq("year", year)
-        .eq("month", month_date)
+    _cache.invalidate(("budgets", "totals", year, month), ("budgets", "month", year, month))
+    _cache.invalidate_where(
+        lambda key, value: key[:2] == ("budgets", "range") and key[2] <= month_date < key[3]
     )
-    r = _exec(q)
 
-    if not r["success"]:
-        return {}
+
+def get_monthly_budget_totals_by_category(year: int, month: int) -> Dict[str, float]:
+    month_date = f"{year}-{month:02d}-01"
+
+    if _use_replica():
+        rows = _replica.select("budgets", "month = ?", [month_date])
+    else:
+        q = (
+            get_client().table("budgets")
+            .select("category, amount")
+            .eq("year", year)
+            .eq("month", month_date)
+        )
+        r = _cached_exec(("budgets", "totals", year, month), q)
+        if not r["success"]:
+            return {}
+        rows = r["data"]
 
     totals = {}
-    for row in r["data"]:
+    for row in rows:
         cat = (row["category"] or "").lower()
         totals[cat] = totals.get(cat, 0.0) + float(row["amount"])
 
     return totals
 
 
+def get_budgets_for_range(start: datetime.date, end: datetime.date) -> List[Dict]:
+    """
+    All budget rows with start <= month < end in one query.
+    aggregations.budget_grid() turns them into a month × category pivot.
+    """
+    start = month_start(start).isoformat()
+    end = month_start(end).isoformat()
+
+    if _use_replica():
+        return _replica.select("budgets", "month >= ? AND month < ?", [start, end], order="month")
+
+    q = (
+        get_client().table("budgets")
+        .select("*")
+        .gte("month", start)
+        .lt("month", end)
+        .order("month")
+    )
+    r = _cached_exec(("budgets", "range", start, end), q)
+    return r["data"] if r["success"] else []
+
+
 def get_budgets_for_month(year: int, month: int):
     month_date = f"{year}-{month:02d}-01"
 
+    if _use_replica():
+        return _replica.select("budgets", "month = ?", [month_date])
+
     q = (
-        supabase.table("budgets")
+        get_client().table("budgets")
         .select("*")
         .eq("year", year)
         .eq("month", month_date)
     )
-    r = _exec(q)
+    r = _cached_exec(("budgets", "month", year, month), q)
     return r["data"] if r["success"] else []
 
 
@@ -188,7 +1303,7 @@ def upsert_budget(category: str, year: int, month: int, amount: float, btype: st
     if id is not None:
         payload["id"] = id
 
-    q = supabase.table("budgets").upsert(
+    q = get_client().table("budgets").upsert(
         payload,
         on_conflict="category,year,month"   # <-- FIXED
     )
@@ -197,8 +1312,470 @@ def upsert_budget(category: str, year: int, month: int, amount: float, btype: st
     if not r["success"]:
         raise RuntimeError(f"Budget upsert failed: {r['error']}")
 
+    _invalidate_budgets(year, month)
+    _replica_apply("budgets", r["data"])
+
     return r["data"]
 
 
-supabase_url = SUPABASE_URL
+def save_budget_changes(year: int, month: int, upserts: List[Dict], delete_ids: List[str]):
+    """
+    Apply a single-month planner diff in bulk: one delete for removed rows
+    (by id) and one upsert for new/changed rows (by category, year, month).
+    Each upsert dict needs category, amount and type.
+    """
+    month_date = f"{year}-{month:02d}-01"
+    save_budget_rows(
+        [dict(row, month=month_date) for row in upserts],
+        [{"id": i, "month": month_date} for i in delete_ids],
+    )
+
+
+def save_budget_rows(upserts: List[Dict], deletes: List[Dict]):
+    """
+    Bulk write for any number of months: one delete request for
+    `deletes` ({"id", "month"}) and one upsert for `upserts`
+    ({"category", "month", "amount", "type"}, month as "YYYY-MM-01").
+    """
+    touched = {_month_key(row["month"]) for row in list(upserts) + list(deletes)}
+
+    try:
+        if deletes:
+            q = get_client().table("budgets").delete().in_("id", [row["id"] for row in deletes])
+            r = _exec(q)
+            if not r["success"]:
+                raise RuntimeError(f"Budget delete failed: {r['error']}")
+            if _replica is not None:
+                _replica.delete("budgets", [row["id"] for row in deletes])
+
+        if upserts:
+            payload = [
+                {
+                    "category": row["category"].strip().lower(),
+                    "year": int(str(row["month"])[:4]),
+                    "month": str(row["month"])[:10],
+                    "amount": float(row["amount"]),
+                    "type": row["type"],
+                }
+                for row in upserts
+            ]
+            q = get_client().table("budgets").upsert(payload, on_conflict="category,year,month")
+            r = _exec(q)
+            if not r["success"]:
+                raise RuntimeError(f"Budget upsert failed: {r['error']}")
+            _replica_apply("budgets", r["data"])
+    finally:
+        for year, month in touched:
+            _invalidate_budgets(year, month)
+
+
+def _is_missing_function(error: str) -> bool:
+    return "PGRST202" in error or "Could not find the function" in error
 
+
+def _is_missing_table(error: str) -> bool:
+    return "PGRST205" in error or "42P01" in error or "Could not find the table" in error
+
+
+def _is_missing_column(error: str) -> bool:
+    return "PGRST204" in error or "42703" in error or ("column" in error and "does not exist" in error)
+
+
+def copy_budgets(
+    source_start: datetime.date,
+    target_start: datetime.date,
+    months: int = 1,
+    overwrite: bool = True,
+):
+    """
+    Budget templates: clone `months` months of budgets starting at
+    source_start onto the same number of months starting at target_start
+    (e.g. last month → this month, last year → this year).
+
+    Runs server-side as one statement through the clone_budgets RPC
+    (sql/clone_budgets.sql). If that function isn't deployed yet, falls
+    back to one range read plus one bulk upsert.
+    """
+    source_start = month_start(source_start)
+    target_start = month_start(target_start)
+    source_end = add_months(source_start, months)
+    offset = (target_start.year - source_start.year) * 12 + target_start.month - source_start.month
+
+    q = get_client().rpc(
+        "clone_budgets",
+        {
+            "src_start": source_start.isoformat(),
+            "src_end": source_end.isoformat(),
+            "month_offset": offset,
+            "overwrite": overwrite,
+        },
+    )
+    r = _exec(q)
+
+    if not r["success"]:
+        if not _is_missing_function(r["error"]):
+            raise RuntimeError(f"Budget copy failed: {r['error']}")
+
+        rows = get_budgets_for_range(source_start, source_end)
+        upserts = [
+            {
+                "category": row["category"],
+                "month": add_months(datetime.date.fromisoformat(str(row["month"])[:10]), offset).isoformat(),
+                "amount": row["amount"],
+                "type": row["type"],
+            }
+            for row in rows
+        ]
+        if not overwrite:
+            target_end = add_months(target_start, months)
+            existing = {
+                (row["category"], str(row["month"])[:10])
+                for row in get_budgets_for_range(target_start, target_end)
+            }
+            upserts = [u for u in upserts if (u["category"], u["month"]) not in existing]
+        save_budget_rows(upserts, [])
+        return upserts
+
+    for month in month_range(target_start, months):
+        _invalidate_budgets(month.year, month.month)
+    _replica_apply("budgets", r["data"])
+    _replica_mark_stale()
+    return r["data"]
+
+
+# -----------------------------
+# Category rules
+# -----------------------------
+def get_category_rules() -> List[Dict]:
+    """
+    Auto-categorization rules (match_text, category, priority), highest
+    priority first. See categorizer.py for how they are applied.
+    """
+    q = (
+        get_client()
+        .table("category_rules")
+        .select("id, match_text, category, priority")
+        .order("priority", desc=True)
+        .order("id")
+    )
+    r = _cached_exec(("category_rules",), q)
+    return r["data"] if r["success"] else []
+
+
+def add_category_rule(match_text: str, category: str, priority: int = 1):
+    payload = {
+        "match_text": match_text.strip().lower(),
+        "category": category.strip().lower(),
+        "priority": int(priority),
+    }
+    r = _exec(get_client().table("category_rules").insert(payload))
+
+    if not r["success"]:
+        raise RuntimeError(f"Category rule insert failed: {r['error']}")
+
+    _cache.invalidate(("category_rules",))
+    return r["data"]
+
+
+def delete_category_rule(rule_id: str):
+    r = _exec(get_client().table("category_rules").delete().eq("id", rule_id))
+
+    if not r["success"]:
+        raise RuntimeError(f"Category rule delete failed: {r['error']}")
+
+    _cache.invalidate(("category_rules",))
+    return r["data"]
+
+
+# -----------------------------
+# Recurring transactions and budgets
+# -----------------------------
+# Schedules live in recurring_rules (sql/recurring.sql) and are expanded
+# by recurrence.py for the window asked for; expanded windows are cached
+# like query results. Only transaction occurrences that come due are
+# written to the ledger (materialize_recurring); budgets on request.
+_materialized_on: Optional[datetime.date] = None
+# time.monotonic() of the last failed daily run; retried only after
+# RECURRING_RETRY_SECONDS, so a down backend isn't hit on every rerun
+_materialize_failed_at: Optional[float] = None
+# One materialization at a time per process; across processes the unique
+# (recurring_id, date) index makes repeated inserts no-ops
+_materialize_lock = threading.Lock()
+
+
+def _invalidate_recurring() -> None:
+    _cache.invalidate_where(lambda key, value: key[0] in ("recurring_rules", "recurring"))
+
+
+def get_recurring_rules(kind: Optional[str] = None) -> List[Dict]:
+    """Active schedules, optionally only one kind ("transaction" / "budget")."""
+    q = get_client().table("recurring_rules").select("*").eq("active", True).order("created_at")
+    r = _cached_exec(("recurring_rules",), q)
+    rules = r["data"] if r["success"] else []
+    return [rule for rule in rules if kind is None or rule["kind"] == kind]
+
+
+def _check_recurring_type(kind: str, rule_type) -> None:
+    # No default: 'expense' suits transactions but isn't a budget section
+    if rule_type not in recurrence.TYPES[kind]:
+        raise ValueError(f"type of a {kind} rule must be one of {recurrence.TYPES[kind]}")
+
+
+def add_recurring_rule(data: Dict):
+    if data.get("kind") not in recurrence.KINDS:
+        raise ValueError(f"kind must be one of {recurrence.KINDS}")
+    if data.get("frequency") not in recurrence.FREQUENCIES:
+        raise ValueError(f"frequency must be one of {sorted(recurrence.FREQUENCIES)}")
+    _check_recurring_type(data["kind"], data.get("type"))
+    if data.get("category"):
+        data["category"] = data["category"].strip().lower()
+
+    r = _exec(get_client().table("recurring_rules").insert(data))
+    if not r["success"]:
+        raise RuntimeError(f"Recurring rule insert failed: {r['error']}")
+
+    _invalidate_recurring()
+    return r["data"]
+
+
+def update_recurring_rule(rule_id: str, data: Dict):
+    if "frequency" in data and data["frequency"] not in recurrence.FREQUENCIES:
+        raise ValueError(f"frequency must be one of {sorted(recurrence.FREQUENCIES)}")
+    if "type" in data:
+        kind = next((rule["kind"] for rule in get_recurring_rules() if rule["id"] == rule_id), None)
+        if kind is None:
+            raise ValueError(f"No active recurring rule {rule_id}")
+        _check_recurring_type(kind, data["type"])
+    if data.get("category"):
+        data["category"] = data["category"].strip().lower()
+
+    r = _exec(get_client().table("recurring_rules").update(data).eq("id", rule_id))
+    if not r["success"]:
+        raise RuntimeError(f"Recurring rule update failed: {r['error']}")
+
+    _invalidate_recurring()
+    return r["data"]
+
+
+def delete_recurring_rule(rule_id: str):
+    # Soft delete: occurrences already in the ledger keep their recurring_id
+    return update_recurring_rule(rule_id, {"active": False})
+
+
+def get_recurring_occurrences(start: datetime.date, end: datetime.date) -> List[Dict]:
+    """
+    Transaction occurrences with start <= date < end that are not in the
+    ledger yet, in date order: after each rule's last_materialized, and
+    with no ledger row (deleted or not) for the same recurring_id and date.
+    """
+    key = ("recurring", "transaction", str(start)[:10], str(end)[:10])
+    hit = _cache.get(key)
+    if hit is None:
+        rules = get_recurring_rules("transaction")
+        done = {rule["id"]: rule.get("last_materialized") for rule in rules}
+        hit = sorted(
+            (
+                row
+                for row in recurrence.expand_transactions(rules, start, end)
+                if done[row["recurring_id"]] is None or row["date"] > str(done[row["recurring_id"]])[:10]
+            ),
+            key=lambda row: row["date"],
+        )
+        _cache.set(key, hit)
+    if not hit:
+        return []
+
+    # A watermark can lag behind rows another session already wrote;
+    # this read is cached and invalidated with every transaction write
+    posted = {
+        (row.get("recurring_id"), str(row["date"])[:10])
+        for row in query_transactions(deleted=None, start=start, end=end, columns=("date", "recurring_id"))
+    }
+    return [copy.deepcopy(row) for row in hit if (row["recurring_id"], row["date"]) not in posted]
+
+
+def materialize_recurring(through: Optional[datetime.date] = None) -> int:
+    """
+    Write every transaction occurrence due by `through` (default today)
+    that isn't in the ledger yet, in one insert, then move the rules'
+    last_materialized forward. Runs at most once a day per process when
+    called without `through`, and after a failure (RuntimeError) not again
+    for RECURRING_RETRY_SECONDS. Returns the number of rows written.
+
+    Safe to run from concurrent sessions and processes: rules are read
+    uncached, and occurrences already in the ledger are skipped by the
+    unique (recurring_id, date) index (sql/recurring.sql), so a watermark
+    that lags behind an earlier insert can't duplicate rows.
+    """
+    global _materialize_failed_at
+    with _materialize_lock:
+        if through is None and _materialize_failed_at is not None:
+            if time.monotonic() - _materialize_failed_at < RECURRING_RETRY_SECONDS:
+                return 0
+        try:
+            written = _materialize_recurring(through)
+        except RuntimeError:
+            _materialize_failed_at = time.monotonic()
+            raise
+        _materialize_failed_at = None
+        return written
+
+
+def _materialize_recurring(through: Optional[datetime.date]) -> int:
+    global _materialized_on
+    today = datetime.date.today()
+    if through is None:
+        if _materialized_on == today:
+            return 0
+        through = today
+
+    # Straight from the server: a cached copy may predate another
+    # session's watermark update
+    q = get_client().table("recurring_rules").select("*").eq("active", True).order("created_at")
+    r = _exec(q)
+    if not r["success"]:
+        if _is_missing_table(r["error"]):
+            # sql/recurring.sql not deployed: nothing to materialize
+            _materialized_on = today
+            return 0
+        raise RuntimeError(f"Recurring rules could not be read: {r['error']}")
+    rules = [rule for rule in r["data"] if rule["kind"] == "transaction"]
+
+    due = []
+    written = 0
+    for rule in rules:
+        last = rule.get("last_materialized")
+        start = datetime.date.fromisoformat(str(last)[:10]) + datetime.timedelta(days=1) if last else None
+        window_start = start or datetime.date.fromisoformat(str(rule["start_date"])[:10])
+        due.extend(recurrence.expand_transactions([rule], window_start, through + datetime.timedelta(days=1)))
+
+    if due:
+        payload = [{k: v for k, v in row.items() if k != "id"} for row in due]
+        # A single insert is one statement: all occurrences land or none do.
+        # Occurrences already written are ignored, and left out of r["data"]
+        q = get_client().table("transactions").upsert(
+            payload, on_conflict="recurring_id,date", ignore_duplicates=True
+        )
+        r = _exec(q)
+        if not r["success"]:
+            raise RuntimeError(f"Recurring materialization failed: {r['error']}")
+        written = len(r["data"])
+        _invalidate_transactions(r["data"])
+        _rollups.apply([], r["data"])
+        _replica_apply("transactions", r["data"])
+        _search.apply(r["data"])
+
+        q = (
+            get_client().table("recurring_rules")
+            .update({"last_materialized": through.isoformat()})
+            .in_("id", sorted({row["recurring_id"] for row in due}))
+        )
+        r = _exec(q)
+        if not r["success"]:
+            raise RuntimeError(f"Recurring rule update failed: {r['error']}")
+        _invalidate_recurring()
+
+    if through >= today:
+        _materialized_on = today
+    return written
+
+
+def get_pending_recurring_budgets(
+    start: datetime.date, end: datetime.date, existing: Optional[List[Dict]] = None
+) -> List[Dict]:
+    """
+    Recurring budget rows for start <= month < end whose (category, month)
+    has no budget row yet. `existing` are the budget rows already loaded
+    for the window (read here when not given).
+    """
+    if existing is None:
+        existing = get_budgets_for_range(start, end)
+    planned = {(row["category"], str(row["month"])[:10]) for row in existing}
+
+    key = ("recurring", "budget", str(start)[:10], str(end)[:10])
+    expanded = _cache.get(key)
+    if expanded is None:
+        expanded = list(recurrence.expand_budgets(get_recurring_rules("budget"), start, end))
+        _cache.set(key, expanded)
+
+    pending = []
+    for row in expanded:
+        # The first rule listed wins when two plan the same category and month
+        if (row["category"], row["month"]) not in planned:
+            planned.add((row["category"], row["month"]))
+            pending.append(copy.deepcopy(row))
+    return pending
+
+
+def apply_recurring_budgets(start: datetime.date, end: datetime.date) -> List[Dict]:
+    """
+    Write the pending recurring budgets for start <= month < end as real
+    budget rows (one bulk upsert). Categories already planned are kept.
+    """
+    pending = get_pending_recurring_budgets(start, end)
+    if pending:
+        save_budget_rows(pending, [])
+    return pending
+
+
+# -----------------------------
+# Export and restore
+# -----------------------------
+# Whole-table reads for backup.py. They go to the server directly, past
+# the read cache and the local replica, so an export neither evicts the
+# cache nor captures a stale copy.
+def iter_table(table: str, split: Optional[str] = None, page_size: int = _QUERY_PAGE_SIZE) -> Iterator[List[Dict]]:
+    """
+    Every row of `table` (all columns), one page at a time in id order.
+    split="top" / "child" restricts transactions to one side of the split
+    families (see SPLIT_ROLES).
+
+    Keyset pagination on id: each page is an indexed range read however
+    deep the export is, and paging only stops on an empty page, so a
+    server row limit below page_size can't silently truncate it.
+    Raises RuntimeError if a page fails, LookupError if the table doesn't
+    exist.
+    """
+    if split not in (None, "top", "child"):
+        raise ValueError(f"split must be None, 'top' or 'child', not {split!r}")
+
+    last_id = None
+    while True:
+        q = get_client().table(table).select("*")
+        if split == "top":
+            q = q.is_("parent_id", "null")
+        elif split == "child":
+            q = q.not_.is_("parent_id", "null")
+        if last_id is not None:
+            q = q.gt("id", last_id)
+        r = _exec(q.order("id").limit(page_size))
+
+        if not r["success"]:
+            if _is_missing_table(r["error"]):
+                raise LookupError(f"No table {table}: {r['error']}")
+            raise RuntimeError(f"Export of {table} failed: {r['error']}")
+        if not r["data"]:
+            return
+        yield r["data"]
+        last_id = r["data"][-1]["id"]
+
+
+def restore_rows(table: str, rows: List[Dict]) -> List[Dict]:
+    """
+    Write backed-up rows as they were, ids included. An upsert on id, so
+    loading the same batch twice (a resumed restore) changes nothing.
+    Everything derived from the tables is dropped afterwards.
+    """
+    q = get_client().table(table).upsert(rows, on_conflict="id")
+    r = _exec(q)
+
+    if not r["success"]:
+        raise RuntimeError(f"Restore of {table} failed: {r['error']}")
+
+    clear_cache()
+    _rollups.reset()
+    _search.reset()
+    if table in REPLICA_TABLES:
+        _replica_apply(table, r["data"])
+
+    return r["data"]
@@ -0,0 +1,262 @@
+"""
+importer.py
+
+Vectorized normalization for bulk transaction imports.
+Turns raw bank-export chunks (CSV, or OFX/QFX statements via ofx.py)
+into rows ready for db.insert_transactions_in_batches(), and flags rows
+that are already in the ledger (DuplicateIndex). No Streamlit or network
+calls here.
+"""
+
+import datetime
+import warnings
+from collections import Counter
+from itertools import islice
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import ofx
+from config import IMPORT_CHUNK_ROWS, INCOME_CATEGORIES
+from utils.dates import add_months
+
+if TYPE_CHECKING:
+    from categorizer import RuleSet
+
+TRANSACTION_COLUMNS = [
+    "date",
+    "amount",
+    "description",
+    "category",
+    "type",
+    "account_id",
+    "notes",
+    "deleted",
+    "is_split_parent",
+    "parent_id",
+]
+
+
+def read_csv_chunks(file, chunk_rows: int = IMPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV upload as DataFrames of at most chunk_rows rows.
+    Everything is read as text; normalize_chunk() does the parsing.
+    """
+    return pd.read_csv(file, chunksize=chunk_rows, dtype=str, skipinitialspace=True)
+
+
+def read_ofx_chunks(file, chunk_rows: int = IMPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Stream an OFX/QFX statement as DataFrames of at most chunk_rows
+    transactions, columns ofx.RECORD_FIELDS (all text). For
+    normalize_chunk() with date_col="date", amount_col="amount",
+    desc_col="description", account_col="account" and
+    negative_is_expense=True.
+    """
+    records = ofx.read_transactions(file)
+    while True:
+        batch = list(islice(records, chunk_rows))
+        if not batch:
+            return
+        yield pd.DataFrame.from_records(batch, columns=list(ofx.RECORD_FIELDS))
+
+
+def parse_amounts(values: pd.Series) -> pd.Series:
+    """
+    "$1,234.56" → 1234.56, "(12.00)" → -12.0. Unparseable values become NaN.
+    """
+    text = values.astype("string").str.strip()
+    text = text.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    text = text.str.replace(r"[\$,\s]", "", regex=True)
+    return pd.to_numeric(text, errors="coerce")
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse to ISO "YYYY-MM-DD" strings. Unparseable values become NA.
+    """
+    with warnings.catch_warnings():
+        # Format is inferred from the first value and applied to the
+        # whole column; only rows that don't fit it are parsed one by one.
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(values, errors="coerce")
+        retry = parsed.isna() & values.notna()
+        if retry.any():
+            parsed[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    return parsed.dt.strftime("%Y-%m-%d")
+
+
+def normalize_categories(values: pd.Series) -> pd.Series:
+    text = values.astype("string").str.strip().str.lower()
+    return text.mask(text == "")
+
+
+def normalize_chunk(
+    chunk: pd.DataFrame,
+    date_col: str,
+    amount_col: str,
+    desc_col: str,
+    category_col: Optional[str],
+    account_col: Optional[str],
+    account_ids: Dict[str, str],
+    default_account_id: str,
+    negative_is_expense: bool = False,
+    rules: Optional["RuleSet"] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Map one raw chunk onto the transactions schema.
+
+    account_ids maps lower-cased account names to ids; names that don't
+    match fall back to default_account_id. Rows without a category get
+    one from `rules` (categorizer.load_rules()) where a rule matches their
+    description, else "uncategorized". Returns (rows, rejected) where
+    rejected holds the raw rows whose date or amount could not be parsed.
+    """
+    out = pd.DataFrame(index=chunk.index)
+
+    out["date"] = parse_dates(chunk[date_col])
+    amounts = parse_amounts(chunk[amount_col])
+    out["description"] = chunk[desc_col].astype("string").str.strip().fillna("")
+
+    if category_col:
+        categories = normalize_categories(chunk[category_col])
+    else:
+        categories = pd.Series(pd.NA, index=chunk.index, dtype="string")
+    if rules is not None and len(rules):
+        missing = categories.isna()
+        if missing.any():
+            categories = categories.astype("string")
+            categories[missing] = rules.categorize_many(out["description"][missing])
+    out["category"] = categories.fillna("uncategorized")
+
+    if negative_is_expense:
+        # Bank-style sign: money out is negative. Stored as positive expenses.
+        out["type"] = np.where(amounts < 0, "expense", "income")
+        out["amount"] = amounts.abs()
+    else:
+        out["type"] = np.where(out["category"].isin(INCOME_CATEGORIES), "income", "expense")
+        out["amount"] = amounts
+
+    if account_col:
+        names = chunk[account_col].astype("string").str.strip().str.lower()
+        out["account_id"] = names.map(account_ids).fillna(default_account_id)
+    else:
+        out["account_id"] = default_account_id
+
+    out["notes"] = None
+    out["deleted"] = False
+    out["is_split_parent"] = False
+    out["parent_id"] = None
+
+    valid = out["date"].notna() & out["amount"].notna()
+    return out.loc[valid, TRANSACTION_COLUMNS], chunk.loc[~valid]
+
+
+def to_records(rows: pd.DataFrame):
+    """
+    DataFrame → list of JSON-safe dicts (NaN/NA become None).
+    """
+    return rows.astype(object).where(rows.notna(), None).to_dict("records")
+
+
+# -----------------------------
+# Duplicate detection
+# -----------------------------
+# Columns of existing transactions needed to fingerprint them
+DUPLICATE_COLUMNS = ("date", "amount", "description", "account_id")
+
+NEW, DUPLICATE, SUSPECT = "new", "duplicate", "suspect"
+
+
+def normalize_descriptions(values: pd.Series) -> pd.Series:
+    return values.astype("string").fillna("").str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def fingerprints(rows: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+    """
+    (exact, loose) 64-bit hashes per row. exact covers date, amount (in
+    cents, sign ignored), normalized description and account; loose
+    leaves out the description.
+    """
+    loose_cols = pd.DataFrame(
+        {
+            "date": rows["date"].astype("string").str[:10],
+            "cents": (pd.to_numeric(rows["amount"], errors="coerce").abs() * 100).round().fillna(0).astype("int64"),
+            "account_id": rows["account_id"].astype("string"),
+        },
+        index=rows.index,
+    )
+    loose = pd.util.hash_pandas_object(loose_cols, index=False)
+    exact = pd.util.hash_pandas_object(
+        loose_cols.assign(description=normalize_descriptions(rows["description"])), index=False
+    )
+    return exact, loose
+
+
+class DuplicateIndex:
+    """
+    Fingerprints of the existing ledger, for one import.
+
+    `load(start, end)` returns existing transactions (DUPLICATE_COLUMNS)
+    for start <= date < end; each month is loaded once, the first time a
+    chunk has rows in it. classify() labels incoming rows:
+
+    - "duplicate": an existing row has the same date, amount, description
+      and account. Counted as a multiset, so two identical coffees on the
+      same day in the file are both duplicates only if both exist already.
+    - "suspect": not a duplicate, but an existing row has the same date,
+      amount and account (the bank may have reworded the description).
+    - "new": everything else.
+
+    A chunk's months are loaded before any of its rows are written, so
+    rows this import inserts are never mistaken for pre-existing ones.
+    """
+
+    def __init__(self, load: Callable[[datetime.date, datetime.date], List[Dict]]):
+        self._load = load
+        self._months: set = set()
+        self._exact: Counter = Counter()
+        self._loose: set = set()
+        # Occurrences of each exact fingerprint already classified this import
+        self._seen: Counter = Counter()
+
+    def _ensure_months(self, dates: pd.Series) -> None:
+        missing = sorted(set(dates.dropna().str[:7]) - self._months)
+        if not missing:
+            return
+
+        # One read spanning every month not loaded yet; rows in months that
+        # were already loaded are dropped rather than counted twice
+        start = datetime.date.fromisoformat(missing[0] + "-01")
+        end = add_months(datetime.date.fromisoformat(missing[-1] + "-01"), 1)
+        existing = pd.DataFrame.from_records(self._load(start, end), columns=list(DUPLICATE_COLUMNS))
+        existing = existing[existing["date"].astype("string").str[:7].isin(missing)]
+        self._months.update(missing)
+
+        if existing.empty:
+            return
+        exact, loose = fingerprints(existing)
+        self._exact.update(exact.value_counts().to_dict())
+        self._loose.update(loose.unique().tolist())
+
+    def classify(self, rows: pd.DataFrame) -> pd.Series:
+        """
+        "new" / "duplicate" / "suspect" per row of a normalized chunk
+        (same index). Call once per chunk, in file order.
+        """
+        if rows.empty:
+            return pd.Series(NEW, index=rows.index, dtype="object")
+
+        self._ensure_months(rows["date"].astype("string"))
+        exact, loose = fingerprints(rows)
+
+        occurrence = exact.groupby(exact, sort=False).cumcount() + exact.map(self._seen).fillna(0)
+        duplicate = occurrence < exact.map(self._exact).fillna(0)
+        suspect = ~duplicate & loose.isin(self._loose)
+        self._seen.update(exact.value_counts().to_dict())
+
+        labels = pd.Series(NEW, index=rows.index, dtype="object")
+        labels[suspect] = SUSPECT
+        labels[duplicate] = DUPLICATE
+        return labels
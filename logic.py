@@ -1,29 +1,45 @@
-from db import (
-    get_transactions,
-    get_splits_for_transaction
-)
+from typing import Dict, List, Optional
 
-def get_transactions_with_splits():
-    txs = get_transactions()
-    result = []
+from aggregations import category_actuals, transactions_frame
+from db import get_children_for_parents, query_transactions
+
+
+def get_transactions_with_splits(transactions: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Top-level transactions with their split children under tx["splits"].
+
+    Children are fetched for all split parents at once (see
+    db.get_children_for_parents), so this costs O(1) queries no matter
+    how many splits exist. Child rows themselves are not returned at the
+    top level.
+    """
+    if transactions is None:
+        # Children come back under their parents, not as top-level rows
+        transactions = query_transactions(split="top")
+
+    parent_ids = [t["id"] for t in transactions if t.get("is_split_parent")]
+    children = get_children_for_parents(parent_ids) if parent_ids else {}
 
-    for tx in txs:
-        splits = get_splits_for_transaction(tx["id"])
-        tx["splits"] = splits
+    result = []
+    for tx in transactions:
+        if tx.get("parent_id"):
+            continue
+        tx["splits"] = children.get(tx["id"], [])
         result.append(tx)
 
     return result
 
-def compute_category_totals(transactions):
-    totals = {}
 
-    for tx in transactions:
-        if tx["splits"]:
-            for s in tx["splits"]:
-                cat = s["category"]
-                totals[cat] = totals.get(cat, 0) + s["amount"]
-        else:
-            cat = tx["category"]
-            totals[cat] = totals.get(cat, 0) + tx["amount"]
-
-    return totals
+def compute_category_totals(transactions: List[Dict]) -> Dict[str, float]:
+    """
+    Category totals where a split transaction counts through its splits.
+    Expects the output of get_transactions_with_splits().
+    """
+    leaves = [
+        dict(leaf, is_split_parent=False)
+        for tx in transactions
+        for leaf in (tx.get("splits") or [tx])
+    ]
+
+    actuals = category_actuals(transactions_frame(leaves))
+    return actuals.groupby("category")["actual"].sum().to_dict()
@@ -0,0 +1,226 @@
+"""
+ofx.py
+
+Streaming reader for OFX / QFX bank and credit card statements (roadmap
+1.5), for importer.read_ofx_chunks().
+
+Both dialects go through one tokenizer:
+- OFX 1.x is SGML: a "KEY:VALUE" header, then tags whose leaf elements
+  are never closed (<TRNAMT>-12.50).
+- OFX 2.x is XML: <?xml?> and <?OFX?> processing instructions, then
+  the same tags, every one closed.
+A tag followed by text is a leaf value; anything else opens an aggregate,
+closed by its end tag together with anything left open inside it (an
+empty SGML leaf, which looks like an aggregate).
+
+The upload is read and decoded READ_SIZE bytes at a time and
+transactions are yielded as soon as their </STMTTRN> is seen, so a
+multi-year statement never sits in memory as a whole. QFX is OFX with a
+few extra Intuit tags, which are ignored.
+
+Pure parsing: no Streamlit, network or pandas here.
+"""
+
+import codecs
+import html
+import re
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+READ_SIZE = 1 << 16
+
+# Fields of each yielded transaction
+RECORD_FIELDS = ("date", "amount", "description", "memo", "trntype", "fitid", "account")
+
+# Aggregates holding the statement's own account, and a transfer's other
+# side (inside a transaction)
+_ACCOUNT_FROM = {"BANKACCTFROM", "CCACCTFROM"}
+_ACCOUNT_TO = {"BANKACCTTO", "CCACCTTO"}
+# Blocks inside a transaction whose leaves aren't the transaction's own
+_TRANSACTION_SKIP = _ACCOUNT_TO | {"CURRENCY", "ORIGCURRENCY"}
+
+_XML_ENCODING = re.compile(rb"""<\?xml[^>]*encoding\s*=\s*["']([A-Za-z0-9._-]+)["']""")
+_SGML_HEADER = re.compile(rb"^\s*(ENCODING|CHARSET)\s*:\s*(\S+)", re.MULTILINE)
+
+# OFX 1.x CHARSET header values
+_CHARSETS = {"1252": "cp1252", "ISO-8859-1": "latin-1", "8859-1": "latin-1", "NONE": "cp1252"}
+
+
+def _encoding(head: bytes) -> str:
+    """
+    Text encoding from the start of the file: the XML declaration, else
+    the SGML ENCODING / CHARSET headers (Windows-1252 when unspecified).
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    match = _XML_ENCODING.search(head)
+    if match:
+        return match.group(1).decode("ascii")
+    if head.lstrip().startswith(b"<"):
+        return "utf-8"
+
+    headers = {key.decode("ascii"): value.decode("ascii").upper() for key, value in _SGML_HEADER.findall(head)}
+    if headers.get("ENCODING") in ("UTF-8", "UNICODE"):
+        return "utf-8"
+    return _CHARSETS.get(headers.get("CHARSET", "1252"), "cp1252")
+
+
+def _pieces(stream: BinaryIO, read_size: int) -> Iterator[List[str]]:
+    """
+    The decoded document split on "<", one list per read: each piece is
+    "TAG ...>text" (or "/TAG>text"). A piece is only handed out once the
+    next "<" has been read, so its text is complete.
+    """
+    head = stream.read(read_size)
+    try:
+        decoder = codecs.getincrementaldecoder(_encoding(head))(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("cp1252")(errors="replace")
+
+    rest = ""
+    chunk = head
+    while chunk:
+        pieces = (rest + decoder.decode(chunk)).split("<")
+        rest = pieces.pop()
+        yield pieces
+        chunk = stream.read(read_size)
+    yield [rest + decoder.decode(b"", final=True)]
+
+
+def _token(piece: str) -> Optional[Tuple[bool, str, str]]:
+    tag, found, text = piece.partition(">")
+    # Text before the first tag, <?xml?> / <?OFX?>, comments, <EMPTY/>
+    if not found or not tag or tag[0] in "?!" or tag[-1] == "/":
+        return None
+    closing = tag[0] == "/"
+    if closing:
+        tag = tag[1:]
+    if " " in tag:
+        tag = tag.split(None, 1)[0]
+    text = text.strip()
+    if "&" in text:
+        text = html.unescape(text)
+    return closing, tag.upper(), text
+
+
+def tokens(stream: BinaryIO, read_size: int = READ_SIZE) -> Iterator[Tuple[bool, str, str]]:
+    """
+    (closing, TAG, text) per tag, in document order; text is what follows
+    the tag up to the next one, stripped and unescaped.
+    """
+    for pieces in _pieces(stream, read_size):
+        for piece in pieces:
+            token = _token(piece)
+            if token is not None:
+                yield token
+
+
+def _account_block(stack: List[str]) -> Optional[str]:
+    # Innermost account aggregate. An empty SGML leaf (<BRANCHID> with no
+    # value) looks like an unclosed aggregate, so the direct parent can't be
+    # relied on.
+    for tag in reversed(stack):
+        if tag in _ACCOUNT_FROM or tag in _ACCOUNT_TO:
+            return tag
+    return None
+
+
+def _pop(stack: List[str], tag: str) -> None:
+    # Close `tag` and anything left open inside it; stray end tags are ignored
+    if tag in stack:
+        del stack[len(stack) - 1 - stack[::-1].index(tag):]
+
+
+def _iso_date(value: Optional[str]) -> Optional[str]:
+    # "20240115", "20240115120000", "20240115120000.000[-5:EST]" → "2024-01-15"
+    digits = (value or "")[:8]
+    if len(digits) < 8 or not digits.isdigit():
+        return None
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}"
+
+
+def _amount(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    # Some banks write a decimal comma ("-12,50")
+    if "," in value and "." not in value:
+        value = value.replace(",", ".")
+    return value.replace("+", "")
+
+
+def _record(fields: Dict[str, str], account: Optional[str]) -> Dict[str, Optional[str]]:
+    name = fields.get("NAME") or ""
+    memo = fields.get("MEMO") or ""
+    return {
+        "date": _iso_date(fields.get("DTPOSTED") or fields.get("DTUSER")),
+        "amount": _amount(fields.get("TRNAMT")),
+        "description": name or memo,
+        "memo": memo if name else "",
+        "trntype": (fields.get("TRNTYPE") or "").lower() or None,
+        "fitid": fields.get("FITID"),
+        "account": account,
+    }
+
+
+def read_transactions(stream: BinaryIO, read_size: int = READ_SIZE) -> Iterator[Dict[str, Optional[str]]]:
+    """
+    Every transaction of every statement in the file, in file order, as
+    RECORD_FIELDS dicts of strings: date ("YYYY-MM-DD"), amount (signed
+    as in the file, negative = money out), description (NAME, else
+    MEMO), memo, trntype, fitid and account (the statement's ACCTID).
+    """
+    stack: List[str] = []
+    account: Optional[str] = None
+    fields: Optional[Dict[str, str]] = None
+    transaction_depth = 0
+
+    for pieces in _pieces(stream, read_size):
+        for piece in pieces:
+            # _token() inlined for plain tags: this runs once per tag
+            tag, found, text = piece.partition(">")
+            if not found or not tag.isalnum():
+                token = _token(piece)
+                if token is None:
+                    continue
+                closing, tag, text = token
+            else:
+                closing = False
+                tag = tag.upper()
+                text = text.strip()
+                if "&" in text:
+                    text = html.unescape(text)
+            if closing:
+                _pop(stack, tag)
+                if tag == "STMTTRN" and fields is not None:
+                    yield _record(fields, account)
+                    fields = None
+                continue
+
+            if text:
+                if fields is not None:
+                    nested = stack[transaction_depth:]
+                    if not nested or not _TRANSACTION_SKIP.intersection(nested):
+                        fields.setdefault(tag, text)
+                elif tag == "ACCTID" and _account_block(stack) in _ACCOUNT_FROM:
+                    account = text
+                continue
+
+            stack.append(tag)
+            if tag == "STMTTRN":
+                fields = {}
+                transaction_depth = len(stack)
+            elif tag in ("STMTRS", "CCSTMTRS"):
+                account = None
+
+
+def statement_accounts(stream: BinaryIO, read_size: int = READ_SIZE) -> List[str]:
+    """ACCTIDs of the statements in the file, in order of appearance."""
+    accounts: List[str] = []
+    stack: List[str] = []
+    for closing, tag, text in tokens(stream, read_size):
+        if closing:
+            _pop(stack, tag)
+        elif not text:
+            stack.append(tag)
+        elif tag == "ACCTID" and _account_block(stack) in _ACCOUNT_FROM and text not in accounts:
+            accounts.append(text)
+    return accounts
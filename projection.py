@@ -0,0 +1,184 @@
+"""
+projection.py
+
+Projected daily balance (roadmap 1.3): end-of-day balance per account
+over a horizon, the lowest point of each month, and the "true extra"
+that is safe to spend today without any account dropping below its
+required minimum.
+
+Everything is one day × account grid: signed amounts are pivoted onto
+the days they land on (actual, future-dated and any extra flows such as
+recurring bills), and balances are a single cumulative sum down the grid
+on top of each account's opening balance. Results are memoized on a
+digest of the inputs, so reruns over unchanged data reuse them.
+"""
+
+import datetime
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import PROJECTION_MIN_BALANCE
+from db import fetch_all, get_account_balances, get_accounts, query_transactions
+
+# Downloaded per transaction dated from the projection start onwards
+FLOW_COLUMNS = ["date", "account_id", "amount", "type", "is_split_parent"]
+
+# Projections kept for reuse (distinct start / horizon / data)
+_MEMO_MAX = 8
+_memo: "OrderedDict[Tuple, Dict]" = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+# -----------------------------
+# Grid
+# -----------------------------
+def flows_frame(rows: List[Dict]) -> pd.DataFrame:
+    """
+    Transaction-like rows → (date, account_id, delta), with delta signed
+    the way db.balance_delta() moves a balance.
+    """
+    df = pd.DataFrame.from_records(rows, columns=FLOW_COLUMNS + ["deleted"])
+    if df.empty:
+        return pd.DataFrame(
+            {
+                "date": pd.Series(dtype="datetime64[ns]"),
+                "account_id": pd.Series(dtype="object"),
+                "delta": pd.Series(dtype="float64"),
+            }
+        )
+
+    tx_type = df["type"].fillna("expense").astype("string")
+    amount = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
+    counted = ~(df["deleted"].fillna(False).astype(bool) | df["is_split_parent"].fillna(False).astype(bool))
+    counted &= tx_type != "transfer"
+
+    delta = np.where(tx_type == "income", amount, -amount)
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime(df["date"].astype("string").str[:10]),
+            "account_id": df["account_id"],
+            "delta": np.where(counted, delta, 0.0),
+        }
+    )
+
+
+def daily_grid(flows: pd.DataFrame, accounts: List[str], start: datetime.date, days: int) -> pd.DataFrame:
+    """
+    Net movement per day (rows) and account (columns) for `days` days
+    from `start`; flows outside the window are ignored.
+    """
+    index = pd.date_range(start, periods=days, freq="D")
+    if flows.empty:
+        return pd.DataFrame(0.0, index=index, columns=accounts)
+
+    moves = flows.groupby(["date", "account_id"], sort=False)["delta"].sum().unstack(fill_value=0.0)
+    return moves.reindex(index=index, columns=accounts, fill_value=0.0).fillna(0.0)
+
+
+def project(
+    opening: pd.Series,
+    flows: pd.DataFrame,
+    start: datetime.date,
+    days: int,
+    minimums: pd.Series,
+) -> Dict[str, pd.DataFrame]:
+    """
+    opening:  balance per account at the start of `start`
+    flows:    flows_frame() output
+    minimums: required minimum balance per account
+
+    Returns
+      "balances": end-of-day balance, days × accounts
+      "monthly":  lowest balance and its date per (month, account)
+      "summary":  per account: today, lowest, lowest_on, end, required,
+                  true_extra (lowest - required over the horizon, >= 0)
+    """
+    accounts = list(opening.index)
+    balances = daily_grid(flows, accounts, start, days).cumsum() + opening
+
+    by_month = balances.groupby(balances.index.to_period("M"))
+    monthly = pd.concat(
+        {"lowest": by_month.min().stack(), "lowest_on": by_month.idxmin().stack()}, axis=1
+    ).rename_axis(["month", "account_id"])
+
+    required = minimums.reindex(accounts).fillna(PROJECTION_MIN_BALANCE)
+    lowest = balances.min()
+    summary = pd.DataFrame(
+        {
+            "today": balances.iloc[0],
+            "lowest": lowest,
+            "lowest_on": balances.idxmin(),
+            "end": balances.iloc[-1],
+            "required": required,
+            "true_extra": (lowest - required).clip(lower=0.0),
+        }
+    ).rename_axis("account_id")
+
+    return {"balances": balances, "monthly": monthly.reset_index(), "summary": summary}
+
+
+# -----------------------------
+# Loading
+# -----------------------------
+def _digest(*parts: pd.DataFrame) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def load_projection(
+    start: datetime.date,
+    days: int,
+    extra_flows: Optional[Iterable[Dict]] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    project() over every account from `start`, from current balances and
+    the transactions dated `start` or later. extra_flows are transaction-
+    like rows that aren't in the ledger yet (e.g. recurring bills).
+    Raises RuntimeError when current balances can't be read: projecting
+    from zero would invent the lowest balances and safe-to-spend.
+    """
+    data = fetch_all(
+        {
+            "accounts": (get_accounts,),
+            "balances": (get_account_balances,),
+            "flows": (partial(query_transactions, split="leaf", start=start, columns=FLOW_COLUMNS),),
+        }
+    )
+    if data["balances"] is None:
+        raise RuntimeError("Account balances are unavailable")
+    accounts = [a["id"] for a in data["accounts"]]
+    minimums = pd.Series(
+        {a["id"]: a.get("min_balance") for a in data["accounts"]}, index=accounts, dtype="float64"
+    )
+
+    # Balances include future-dated rows; back them out to get the opening
+    ledger = flows_frame(data["flows"])
+    pending = ledger.groupby("account_id")["delta"].sum()
+    opening = (
+        pd.Series(data["balances"], index=accounts, dtype="float64").fillna(0.0)
+        - pending.reindex(accounts).fillna(0.0)
+    )
+
+    flows = pd.concat([ledger, flows_frame(list(extra_flows or []))], ignore_index=True)
+
+    key = (start, days, _digest(flows, opening.to_frame(), minimums.to_frame()))
+    with _memo_lock:
+        hit = _memo.get(key)
+        if hit is not None:
+            _memo.move_to_end(key)
+            return hit
+
+    result = project(opening, flows, start, days, minimums)
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > _MEMO_MAX:
+            _memo.popitem(last=False)
+    return result
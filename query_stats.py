@@ -0,0 +1,195 @@
+"""
+query_stats.py
+
+Per-query and per-rerun instrumentation for db._exec().
+
+Every request records its target, method, duration, row count and an
+approximate payload size, tagged with the page that was rendering. app.py
+brackets each Streamlit rerun with begin_rerun() / end_rerun(), which sums
+the queries made on that script thread and flags reruns over the query
+count or time budget. The diagnostics page shows it; to_jsonl() exports it.
+"""
+
+import datetime
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import (
+    QUERY_BUDGET_COUNT,
+    QUERY_BUDGET_MS,
+    QUERY_LOG_MAX_QUERIES,
+    QUERY_LOG_MAX_RERUNS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows serialized to estimate the size of a large response
+_SIZE_SAMPLE_ROWS = 20
+
+
+def approx_bytes(data) -> int:
+    """
+    JSON size of a response, extrapolated from a sample for long lists.
+    """
+    if data is None:
+        return 0
+    if isinstance(data, list) and len(data) > _SIZE_SAMPLE_ROWS:
+        sample = len(json.dumps(data[:_SIZE_SAMPLE_ROWS], default=str))
+        return int(sample * len(data) / _SIZE_SAMPLE_ROWS)
+    return len(json.dumps(data, default=str))
+
+
+def _target(query) -> str:
+    # postgrest request builders carry the REST path: "/transactions", "/rpc/clone_budgets"
+    path = getattr(query, "path", None)
+    if path:
+        return str(path).strip("/")
+    return type(query).__name__
+
+
+class QueryLog:
+    """
+    Bounded, process-wide log of queries and rerun summaries.
+    The rerun in progress is tracked per thread, since Streamlit runs
+    each session's script on its own thread.
+    """
+
+    def __init__(self, max_queries: int, max_reruns: int, budget_count: int, budget_ms: float):
+        self.budget_count = budget_count
+        self.budget_ms = budget_ms
+        self._queries: deque = deque(maxlen=max_queries)
+        self._reruns: deque = deque(maxlen=max_reruns)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._seq = 0
+
+    # -----------------------------
+    # Reruns
+    # -----------------------------
+    def begin_rerun(self, page: str) -> None:
+        with self._lock:
+            self._seq += 1
+            rerun_id = self._seq
+        self._local.rerun = {
+            "rerun": rerun_id,
+            "page": page,
+            "started": datetime.datetime.now().isoformat(timespec="seconds"),
+            "_t0": time.perf_counter(),
+            "queries": 0,
+            "query_ms": 0.0,
+            "rows": 0,
+            "bytes": 0,
+            "errors": 0,
+        }
+
+    def end_rerun(self) -> Optional[Dict]:
+        current = getattr(self._local, "rerun", None)
+        if current is None:
+            return None
+        self._local.rerun = None
+
+        summary = {k: v for k, v in current.items() if not k.startswith("_")}
+        summary["total_ms"] = round((time.perf_counter() - current["_t0"]) * 1000, 2)
+        summary["query_ms"] = round(summary["query_ms"], 2)
+
+        warnings = []
+        if summary["queries"] > self.budget_count:
+            warnings.append(f"{summary['queries']} queries (budget {self.budget_count})")
+        if summary["query_ms"] > self.budget_ms:
+            warnings.append(f"{summary['query_ms']:.0f} ms in queries (budget {self.budget_ms:.0f} ms)")
+        summary["warnings"] = warnings
+
+        if warnings:
+            logger.warning("Rerun of %s over query budget: %s", summary["page"], "; ".join(warnings))
+
+        with self._lock:
+            self._reruns.append(summary)
+        return summary
+
+    def current_page(self) -> Optional[str]:
+        current = getattr(self._local, "rerun", None)
+        return current["page"] if current else None
+
+    def context(self) -> Optional[Dict]:
+        """The rerun in progress on this thread, to hand to worker threads."""
+        return getattr(self._local, "rerun", None)
+
+    @contextmanager
+    def attach(self, context: Optional[Dict]):
+        """
+        Count queries made on this (worker) thread towards `context`,
+        the rerun that started the work.
+        """
+        previous = getattr(self._local, "rerun", None)
+        self._local.rerun = context
+        try:
+            yield
+        finally:
+            self._local.rerun = previous
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def record(self, query, seconds: float, result: Dict) -> None:
+        data = result.get("data")
+        if isinstance(data, list):
+            rows = len(data)
+        else:
+            rows = 0 if data is None else 1
+
+        current = getattr(self._local, "rerun", None)
+        entry = {
+            "at": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "page": current["page"] if current else "background",
+            "rerun": current["rerun"] if current else None,
+            "target": _target(query),
+            "method": getattr(query, "http_method", None),
+            "ms": round(seconds * 1000, 2),
+            "rows": rows,
+            "bytes": approx_bytes(data),
+            "success": result["success"],
+            "error": result.get("error"),
+        }
+
+        with self._lock:
+            # Worker threads may be adding to the same rerun concurrently
+            if current is not None:
+                current["queries"] += 1
+                current["query_ms"] += entry["ms"]
+                current["rows"] += rows
+                current["bytes"] += entry["bytes"]
+                current["errors"] += not result["success"]
+            self._queries.append(entry)
+
+    # -----------------------------
+    # Reporting
+    # -----------------------------
+    def queries(self) -> List[Dict]:
+        with self._lock:
+            return list(self._queries)
+
+    def reruns(self) -> List[Dict]:
+        with self._lock:
+            return list(self._reruns)
+
+    def to_jsonl(self) -> str:
+        """
+        One JSON object per line: every logged query ("kind": "query")
+        followed by every rerun summary ("kind": "rerun").
+        """
+        lines = [json.dumps({"kind": "query", **q}, default=str) for q in self.queries()]
+        lines += [json.dumps({"kind": "rerun", **r}, default=str) for r in self.reruns()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._reruns.clear()
+
+
+query_log = QueryLog(QUERY_LOG_MAX_QUERIES, QUERY_LOG_MAX_RERUNS, QUERY_BUDGET_COUNT, QUERY_BUDGET_MS)
@@ -0,0 +1,137 @@
+"""
+recurrence.py
+
+Schedule expansion for recurring transactions and budgets (roadmap
+1.3/1.4). A rule is stored once, as a compact schedule (see
+sql/recurring.sql); its occurrences are generated lazily, only for the
+window asked for. Expansion jumps straight to the first occurrence in the
+window, so a rule that started years ago costs nothing extra.
+
+Pure date arithmetic: no Streamlit, network or pandas here. db.py caches
+expanded windows and materializes the occurrences that come due.
+"""
+
+import calendar
+import datetime
+from collections import Counter
+from typing import Dict, Iterable, Iterator, Optional
+
+from utils.dates import add_months
+
+# frequency → (step, unit); a rule's `interval` multiplies the step
+FREQUENCIES = {
+    "daily": (1, "day"),
+    "weekly": (7, "day"),
+    "biweekly": (14, "day"),
+    "monthly": (1, "month"),
+    "quarterly": (3, "month"),
+    "yearly": (12, "month"),
+}
+
+KINDS = ("transaction", "budget")
+
+# kind → the types its rules may carry: a transaction's type, or one of
+# the budget planner's sections
+TYPES = {
+    "transaction": ("expense", "income", "transfer"),
+    "budget": ("income", "bill", "budget", "savings"),
+}
+
+
+def _date(value) -> Optional[datetime.date]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+
+def _months_between(a: datetime.date, b: datetime.date) -> int:
+    return (b.year - a.year) * 12 + (b.month - a.month)
+
+
+def _on_day(month: datetime.date, day: int) -> datetime.date:
+    # Day 31 in a 30-day month (or February) falls on the month's last day
+    last = calendar.monthrange(month.year, month.month)[1]
+    return month.replace(day=min(day, last))
+
+
+def occurrences(rule: Dict, start: datetime.date, end: datetime.date) -> Iterator[datetime.date]:
+    """
+    Dates rule fires on with start <= date < end, in order. The rule's own
+    start_date / end_date (inclusive) bound the schedule.
+    """
+    step, unit = FREQUENCIES[rule["frequency"]]
+    step *= max(int(rule.get("interval") or 1), 1)
+
+    start, end = _date(start), _date(end)
+    first = _date(rule["start_date"])
+    last = _date(rule.get("end_date"))
+    lo = max(start, first)
+    hi = end if last is None else min(end, last + datetime.timedelta(days=1))
+    if lo >= hi:
+        return
+
+    if unit == "day":
+        skip = -(-(lo - first).days // step)
+        day = first + datetime.timedelta(days=skip * step)
+        while day < hi:
+            yield day
+            day += datetime.timedelta(days=step)
+        return
+
+    anchor = int(rule.get("day_of_month") or first.day)
+    # Start one step early: the anchor day may fall before `lo` in its month
+    n = max(_months_between(first, lo) // step - 1, 0)
+    while True:
+        day = _on_day(add_months(first, n * step), anchor)
+        if day >= hi:
+            return
+        if day >= lo and day >= first:
+            yield day
+        n += 1
+
+
+def expand_transactions(rules: Iterable[Dict], start: datetime.date, end: datetime.date) -> Iterator[Dict]:
+    """
+    Transaction-shaped rows for each occurrence in [start, end). Their id
+    is "recurring:<rule id>:<date>"; they are not in the ledger.
+    """
+    for rule in rules:
+        for day in occurrences(rule, start, end):
+            yield {
+                "id": f"recurring:{rule['id']}:{day.isoformat()}",
+                "recurring_id": rule["id"],
+                "date": day.isoformat(),
+                "amount": float(rule["amount"]),
+                "description": rule.get("description") or "",
+                "category": (rule.get("category") or "").strip().lower() or None,
+                "type": rule.get("type") or "expense",
+                "account_id": rule.get("account_id"),
+                "notes": None,
+                "deleted": False,
+                "is_split_parent": False,
+                "parent_id": None,
+            }
+
+
+def expand_budgets(rules: Iterable[Dict], start: datetime.date, end: datetime.date) -> Iterator[Dict]:
+    """
+    Budget-shaped rows (one per month a rule fires in) for start <= month < end.
+    A month's amount is the rule's amount times its occurrences in that
+    month, so a weekly rule budgets four or five times its amount.
+    """
+    for rule in rules:
+        # A type the planner has no section for would hide the row
+        rule_type = rule.get("type") if rule.get("type") in TYPES["budget"] else "budget"
+        months = Counter(day.replace(day=1) for day in occurrences(rule, _date(start).replace(day=1), end))
+        for month in sorted(months):
+            yield {
+                "id": None,
+                "recurring_id": rule["id"],
+                "category": (rule.get("category") or "").strip().lower(),
+                "year": month.year,
+                "month": month.isoformat(),
+                "amount": float(rule["amount"]) * months[month],
+                "type": rule_type,
+            }
@@ -0,0 +1,224 @@
+"""
+replica.py
+
+Optional local SQLite copy of the accounts, transactions and budgets
+tables, so page reads don't have to go over the network.
+
+Kept current by delta pulls: every row whose updated_at is at or past the
+table's watermark is fetched and upserted (sql/replica_updated_at.sql adds
+the column and trigger). Writes made through db.py are applied locally as
+soon as Supabase accepts them. Hard deletes made elsewhere can't show up
+in a delta, so each table is re-pulled in full every so often.
+
+Rows are stored whole as JSON; the columns the read functions filter or
+sort on are copied out next to it and indexed. No Streamlit or Supabase
+imports here: db.py passes in the function that fetches a page of rows.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# table → columns copied out of each row for filtering / ordering
+TABLES: Dict[str, Sequence[str]] = {
+    "accounts": ("name",),
+    "transactions": ("date", "account_id", "parent_id", "category", "deleted", "is_split_parent"),
+    "budgets": ("month", "category", "type"),
+}
+
+INDEXES: Dict[str, Sequence[Sequence[str]]] = {
+    "transactions": (
+        ("date", "id"),
+        ("account_id",),
+        ("parent_id",),
+        ("category",),
+    ),
+    "budgets": (("month",), ("category",)),
+}
+
+_BOOL_COLUMNS = {"deleted", "is_split_parent"}
+
+# pull(table, since, start, limit) → rows ordered by (updated_at, id),
+# or None if the request failed. since=None means every row.
+PullFn = Callable[[str, Optional[str], int, int], Optional[List[Dict]]]
+
+
+def _column_value(row: Dict, column: str):
+    value = row.get(column)
+    if column in _BOOL_COLUMNS:
+        return 1 if value else 0
+    return None if value is None else str(value)
+
+
+class LocalReplica:
+    """
+    One SQLite file shared by every session of the server process.
+    All statements go through a single connection and lock.
+    """
+
+    def __init__(self, path: str, sync_seconds: float, full_sync_seconds: float, page_size: int = 1000):
+        self.path = path
+        self.sync_seconds = sync_seconds
+        self.full_sync_seconds = full_sync_seconds
+        self.page_size = page_size
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+    # -----------------------------
+    # Schema
+    # -----------------------------
+    def _create_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state ("
+                "tbl TEXT PRIMARY KEY, watermark TEXT, full_synced_at REAL)"
+            )
+            for table, columns in TABLES.items():
+                cols = "".join(f", {c}" for c in columns)
+                self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY{cols}, data TEXT NOT NULL)"
+                )
+                for index in INDEXES.get(table, ()):
+                    name = f"idx_{table}_{'_'.join(index)}"
+                    self._conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index)})"
+                    )
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    @property
+    def synced(self) -> bool:
+        """Every table has completed at least one full pull."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM sync_state WHERE full_synced_at IS NOT NULL"
+            ).fetchone()
+        return count == len(TABLES)
+
+    @property
+    def fresh(self) -> bool:
+        return self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_seconds
+
+    def select(self, table: str, where: str = "", params: Iterable = (), order: str = "", limit: Optional[int] = None) -> List[Dict]:
+        """
+        Rows of `table` as dicts. `where` / `order` are SQL fragments over
+        the columns in TABLES (plus id); values go in `params`.
+        """
+        sql = f"SELECT data FROM {table}"
+        if where:
+            sql += f" WHERE {where}"
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, tuple(params)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def _upsert(self, table: str, rows: List[Dict]) -> None:
+        columns = ["id", *TABLES[table], "data"]
+        placeholders = ", ".join("?" for _ in columns)
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [
+                (str(row["id"]), *(_column_value(row, c) for c in TABLES[table]), json.dumps(row, default=str))
+                for row in rows
+            ],
+        )
+
+    def apply(self, table: str, rows: List[Dict]) -> None:
+        """Upsert rows Supabase returned from a write."""
+        rows = [row for row in rows or [] if isinstance(row, dict) and row.get("id") is not None]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._upsert(table, rows)
+
+    def delete(self, table: str, ids: List[str]) -> None:
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(str(i),) for i in ids])
+
+    def mark_stale(self) -> None:
+        """Pull deltas on the next read (e.g. after a server-side RPC write)."""
+        self._synced_at = None
+
+    # -----------------------------
+    # Sync
+    # -----------------------------
+    def _state(self, table: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT watermark, full_synced_at FROM sync_state WHERE tbl = ?", (table,)
+            ).fetchone()
+        return row if row is not None else (None, None)
+
+    def _pull(self, pull: PullFn, table: str, since: Optional[str]) -> Optional[List[Dict]]:
+        rows: List[Dict] = []
+        start = 0
+        while True:
+            page = pull(table, since, start, self.page_size)
+            if page is None:
+                return None
+            rows.extend(page)
+            if len(page) < self.page_size:
+                return rows
+            start += self.page_size
+
+    def _sync_table(self, pull: PullFn, table: str) -> bool:
+        watermark, full_synced_at = self._state(table)
+        full = full_synced_at is None or time.time() - full_synced_at >= self.full_sync_seconds
+
+        rows = self._pull(pull, table, None if full else watermark)
+        if rows is None:
+            return False
+
+        stamps = [str(row["updated_at"]) for row in rows if row.get("updated_at")]
+        new_watermark = max(stamps + ([watermark] if watermark and not full else []), default=None)
+
+        with self._lock, self._conn:
+            if full:
+                self._conn.execute(f"DELETE FROM {table}")
+            self._upsert(table, rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (tbl, watermark, full_synced_at) VALUES (?, ?, ?)",
+                (table, new_watermark, time.time() if full else full_synced_at),
+            )
+        return True
+
+    def sync(self, pull: PullFn) -> bool:
+        """
+        Bring every table up to date; at most one sync runs at a time.
+        Returns False if any pull failed (tables already pulled keep
+        their new rows, the rest retry after sync_seconds).
+        """
+        with self._sync_lock:
+            if self.fresh:
+                return True
+            ok = all([self._sync_table(pull, table) for table in TABLES])
+            # Failed pulls wait out the interval too, instead of every read retrying
+            self._synced_at = time.monotonic()
+            return ok
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            for table in TABLES:
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("DELETE FROM sync_state")
+        self._synced_at = None
@@ -0,0 +1,277 @@
+"""
+search_index.py
+
+In-memory search over transactions for db.search_transactions().
+
+- Text: an inverted index from each word of description, notes and
+  category to the transactions containing it, plus a trigram index over
+  the vocabulary, so a query token matches any word it is part of
+  ("mart" finds "walmart") without scanning rows. Every token of a query
+  must match.
+- Facets: id sets per account, category and type; combined by
+  intersecting the smallest sets first.
+- Order: (date, id) and (amount, id) keys kept sorted, so date and
+  amount ranges are two bisects and sorted pages need no sort.
+
+Built once from the ledger, then kept current by db.py's transaction
+write paths (apply); rebuilt every refresh_seconds to pick up writes made
+elsewhere, like the balance rollups.
+"""
+
+import bisect
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Columns loaded per transaction
+SEARCH_COLUMNS = (
+    "id", "date", "amount", "description", "notes", "category", "type",
+    "account_id", "is_split_parent", "parent_id",
+)
+TEXT_FIELDS = ("description", "notes", "category")
+FACETS = ("account_id", "category", "type")
+SORTS = ("date", "amount")
+
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def _trigrams(word: str) -> Set[str]:
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+class TransactionIndex:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._built_at: Optional[float] = None
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._rows: Dict[str, Dict] = {}
+        self._postings: Dict[str, Set[str]] = {}   # word → transaction ids
+        self._grams: Dict[str, Set[str]] = {}      # trigram → words
+        self._facets: Dict[str, Dict[object, Set[str]]] = {f: {} for f in FACETS}
+        self._order: List[Tuple[str, str]] = []    # (date, id), ascending
+        self._by_amount: List[Tuple[float, str]] = []  # (amount, id), ascending
+        self._dates: Dict[str, str] = {}
+        self._amounts: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._built_at is not None
+            and time.monotonic() - self._built_at < self.refresh_seconds
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -----------------------------
+    # Building and updates
+    # -----------------------------
+    def build(self, load: Callable[[], Optional[List[Dict]]]) -> bool:
+        with self._build_lock:
+            if self.ready:
+                return True
+            rows = load()
+            if rows is None:
+                return False
+            with self._lock:
+                self._clear()
+                for row in rows:
+                    self._add(row, keep_order=False)
+                self._order.sort()
+                self._by_amount.sort()
+                self._built_at = time.monotonic()
+            return True
+
+    def reset(self) -> None:
+        self._built_at = None
+
+    def apply(self, rows: Iterable[Dict]) -> None:
+        """
+        Written rows, as returned by the write: inserted or updated rows
+        replace their old version; deleted rows drop out.
+        """
+        if self._built_at is None:
+            return
+        with self._lock:
+            for row in rows or []:
+                self._remove(str(row["id"]))
+                if not row.get("deleted"):
+                    self._add(row, keep_order=True)
+
+    def _text(self, row: Dict) -> str:
+        return " ".join(str(row.get(f) or "") for f in TEXT_FIELDS)
+
+    def _key(self, row: Dict) -> Tuple[str, str]:
+        return str(row.get("date") or "")[:10], str(row["id"])
+
+    def _amount_key(self, row: Dict) -> Tuple[float, str]:
+        return float(row.get("amount") or 0), str(row["id"])
+
+    def _add(self, row: Dict, keep_order: bool) -> None:
+        tx_id = str(row["id"])
+        row = {c: row.get(c) for c in SEARCH_COLUMNS}
+        row["category"] = (row.get("category") or "").strip().lower()
+        self._rows[tx_id] = row
+
+        for word in _words(self._text(row)):
+            ids = self._postings.get(word)
+            if ids is None:
+                ids = self._postings[word] = set()
+                for gram in _trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+            ids.add(tx_id)
+
+        for facet in FACETS:
+            self._facets[facet].setdefault(row.get(facet), set()).add(tx_id)
+
+        self._dates[tx_id], _ = key = self._key(row)
+        self._amounts[tx_id], _ = amount_key = self._amount_key(row)
+        if keep_order:
+            bisect.insort(self._order, key)
+            bisect.insort(self._by_amount, amount_key)
+        else:
+            self._order.append(key)
+            self._by_amount.append(amount_key)
+
+    def _remove(self, tx_id: str) -> None:
+        row = self._rows.pop(tx_id, None)
+        if row is None:
+            return
+
+        for word in _words(self._text(row)):
+            ids = self._postings.get(word)
+            if ids is None:
+                continue
+            ids.discard(tx_id)
+            if not ids:
+                del self._postings[word]
+                for gram in _trigrams(word):
+                    words = self._grams.get(gram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._grams[gram]
+
+        for facet in FACETS:
+            ids = self._facets[facet].get(row.get(facet))
+            if ids is not None:
+                ids.discard(tx_id)
+
+        del self._dates[tx_id], self._amounts[tx_id]
+        orders = ((self._order, self._key(row)), (self._by_amount, self._amount_key(row)))
+        for order, key in orders:
+            i = bisect.bisect_left(order, key)
+            if i < len(order) and order[i] == key:
+                del order[i]
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _match_token(self, token: str) -> Set[str]:
+        # Words containing the token: narrowed by trigrams, else a vocabulary scan
+        if len(token) >= 3:
+            grams = sorted((self._grams.get(g, set()) for g in _trigrams(token)), key=len)
+            words = grams[0].intersection(*grams[1:]) if grams else set()
+        else:
+            words = self._postings.keys()
+        ids: Set[str] = set()
+        for word in words:
+            if token in word:
+                ids |= self._postings[word]
+        return ids
+
+    def search(
+        self,
+        text: str = "",
+        account_ids: Optional[Iterable[str]] = None,
+        categories: Optional[Iterable[str]] = None,
+        types: Optional[Iterable[str]] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        sort: str = "date",
+        descending: bool = True,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[Dict], int]:
+        """
+        (rows on the requested page, total matches). Dates are
+        "YYYY-MM-DD", start inclusive and end exclusive; amounts inclusive.
+        Ties sort by id.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {SORTS}, not {sort!r}")
+
+        with self._lock:
+            sets: List[Set[str]] = [self._match_token(token) for token in _words(text)]
+            facet_values = zip(FACETS, (account_ids, categories, types))
+            for facet, values in facet_values:
+                if values:
+                    index = self._facets[facet]
+                    if facet == "category":
+                        values = [v.strip().lower() for v in values]
+                    sets.append(set().union(*(index.get(v, set()) for v in values)))
+
+            start = start[:10] if start else None
+            end = end[:10] if end else None
+            low = None if min_amount is None else float(min_amount)
+            high = None if max_amount is None else float(max_amount)
+            dates, amounts = self._dates, self._amounts
+
+            def in_dates(i: str) -> bool:
+                return (start is None or dates[i] >= start) and (end is None or dates[i] < end)
+
+            def in_amounts(i: str) -> bool:
+                return (low is None or amounts[i] >= low) and (high is None or amounts[i] <= high)
+
+            # Walk the sort order within its own range; the other range is a check
+            if sort == "date":
+                order = self._order
+                lo = bisect.bisect_left(order, (start, "")) if start else 0
+                hi = bisect.bisect_left(order, (end, "")) if end else len(order)
+                other = in_amounts if low is not None or high is not None else None
+            else:
+                order = self._by_amount
+                lo = bisect.bisect_left(order, (low, "")) if low is not None else 0
+                hi = bisect.bisect_right(order, (high, "\uffff")) if high is not None else len(order)
+                other = in_dates if start or end else None
+
+            if not sets:
+                keys = order[lo:hi]
+                if other is not None:
+                    keys = [k for k in keys if other(k[1])]
+            else:
+                sets.sort(key=len)
+                matched = sets[0].intersection(*sets[1:])
+                if len(matched) * 8 > hi - lo:
+                    # Most of the window matches: walk it in order
+                    keys = [
+                        k for k in order[lo:hi]
+                        if k[1] in matched and (other is None or other(k[1]))
+                    ]
+                else:
+                    values = dates if sort == "date" else amounts
+                    keys = sorted((values[i], i) for i in matched if in_dates(i) and in_amounts(i))
+
+            rows = self._rows
+            total = len(keys)
+            if descending:
+                page = keys[max(total - offset - limit, 0):max(total - offset, 0)][::-1]
+            else:
+                page = keys[offset:offset + limit]
+            return [dict(rows[k[1]]) for k in page], total
+
+    def facet_values(self, facet: str) -> List:
+        """Distinct values of a facet present in the index, sorted."""
+        with self._lock:
+            return sorted((v for v, ids in self._facets[facet].items() if ids and v is not None), key=str)
@@ -0,0 +1,12 @@
+-- Auto-categorization rules (categorizer.py): an imported transaction whose
+-- description contains match_text (case-insensitive) gets `category`.
+-- When several rules match, the highest priority wins, then the longest
+-- match_text.
+
+create table if not exists category_rules (
+    id uuid primary key default gen_random_uuid(),
+    match_text text not null check (match_text <> ''),
+    category text not null,
+    priority integer not null default 1,
+    created_at timestamptz not null default now()
+);
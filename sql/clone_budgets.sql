@@ -0,0 +1,47 @@
+-- Budget templates: copy every budget row with src_start <= month < src_end
+-- onto the month `month_offset` months later, in a single statement.
+-- Called from db.copy_budgets() via supabase.rpc("clone_budgets", ...).
+--
+-- overwrite = true  → existing target rows take the source amount/type
+-- overwrite = false → existing target rows are left alone
+
+create or replace function clone_budgets(
+    src_start date,
+    src_end date,
+    month_offset integer,
+    overwrite boolean default true
+)
+returns setof budgets
+language plpgsql
+as $$
+begin
+    if overwrite then
+        return query
+        insert into budgets (category, year, month, amount, type)
+        select
+            b.category,
+            extract(year from (b.month + make_interval(months => month_offset)))::int,
+            (b.month + make_interval(months => month_offset))::date,
+            b.amount,
+            b.type
+        from budgets b
+        where b.month >= src_start and b.month < src_end
+        on conflict (category, year, month)
+        do update set amount = excluded.amount, type = excluded.type
+        returning *;
+    else
+        return query
+        insert into budgets (category, year, month, amount, type)
+        select
+            b.category,
+            extract(year from (b.month + make_interval(months => month_offset)))::int,
+            (b.month + make_interval(months => month_offset))::date,
+            b.amount,
+            b.type
+        from budgets b
+        where b.month >= src_start and b.month < src_end
+        on conflict (category, year, month) do nothing
+        returning *;
+    end if;
+end;
+$$;
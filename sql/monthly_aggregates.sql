@@ -0,0 +1,77 @@
+-- Server-side aggregates for the dashboard and accounts pages: each
+-- function returns one row per (month, category), per month or per
+-- account instead of the transactions behind them.
+-- Called from db.py via supabase.rpc(...); the rules mirror the in-process
+-- fallbacks there (db._local_category_totals etc.), which are used
+-- wherever these functions aren't deployed.
+--
+-- Shared rules:
+-- - deleted rows are excluded
+-- - split parents are skipped; their children carry the amounts
+-- - amounts are stored positive; `type` says whether money came in
+
+create or replace function monthly_category_totals(start_month date, end_month date)
+returns table (month date, category text, actual numeric)
+language sql
+stable
+as $$
+    select
+        date_trunc('month', t.date)::date as month,
+        lower(trim(coalesce(t.category, ''))) as category,
+        sum(t.amount) as actual
+    from transactions t
+    where not t.deleted
+      and not coalesce(t.is_split_parent, false)
+      and t.date >= start_month and t.date < end_month
+    group by 1, 2
+    order by 1, 2;
+$$;
+
+-- Expenses are every type other than "income", reported as abs(total)
+create or replace function monthly_income_expense(start_month date, end_month date)
+returns table (month date, income numeric, expenses numeric, net numeric)
+language sql
+stable
+as $$
+    with totals as (
+        select
+            date_trunc('month', t.date)::date as month,
+            sum(t.amount) filter (where coalesce(t.type, 'expense') = 'income') as income,
+            sum(t.amount) filter (where coalesce(t.type, 'expense') <> 'income') as expenses
+        from transactions t
+        where not t.deleted
+          and not coalesce(t.is_split_parent, false)
+          and t.date >= start_month and t.date < end_month
+        group by 1
+    )
+    select
+        month,
+        coalesce(income, 0),
+        abs(coalesce(expenses, 0)),
+        coalesce(income, 0) - abs(coalesce(expenses, 0))
+    from totals
+    order by month;
+$$;
+
+-- Same as db.balance_delta(): income adds, other types subtract,
+-- transfers are ignored until v1.2
+create or replace function account_balances()
+returns table (account_id text, balance numeric)
+language sql
+stable
+as $$
+    select
+        t.account_id::text,
+        sum(case when coalesce(t.type, 'expense') = 'income' then t.amount else -t.amount end)
+    from transactions t
+    where not t.deleted
+      and not coalesce(t.is_split_parent, false)
+      and coalesce(t.type, 'expense') <> 'transfer'
+    group by 1
+    order by 1;
+$$;
+
+-- Range scans for the monthly functions
+create index if not exists transactions_live_date_idx
+    on transactions (date)
+    where not deleted;
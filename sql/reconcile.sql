@@ -0,0 +1,16 @@
+-- Reconciliation: a cleared flag per transaction, and one call that sets it
+-- for a whole statement. Called from db.set_cleared() via
+-- supabase.rpc("set_cleared", ...); the ids travel in the request body,
+-- so a 300-line statement is a single request.
+
+alter table transactions add column if not exists cleared boolean not null default false;
+
+create or replace function set_cleared(transaction_ids uuid[], value boolean default true)
+returns setof transactions
+language sql
+as $$
+    update transactions
+    set cleared = value
+    where id = any(transaction_ids)
+    returning *;
+$$;
@@ -0,0 +1,50 @@
+-- Recurring transactions and budgets (recurrence.py): one row per schedule,
+-- expanded lazily by db.py for the window a page asks for. Only occurrences
+-- that come due are written to `transactions` (tagged with recurring_id);
+-- recurring budgets are applied to `budgets` on demand from the planner.
+--
+-- frequency:    daily | weekly | biweekly | monthly | quarterly | yearly
+-- interval:     every Nth period (2 + monthly = every other month)
+-- day_of_month: monthly-type schedules; defaults to start_date's day,
+--               clamped to the month's last day
+-- type:         transaction rules: expense | income | transfer;
+--               budget rules: a planner section (income | bill | budget | savings)
+-- last_materialized: transaction occurrences up to this date are in the ledger
+
+create table if not exists recurring_rules (
+    id uuid primary key default gen_random_uuid(),
+    kind text not null check (kind in ('transaction', 'budget')),
+    description text,
+    category text,
+    amount numeric not null,
+    type text not null,
+    account_id uuid references accounts (id),
+    frequency text not null
+        check (frequency in ('daily', 'weekly', 'biweekly', 'monthly', 'quarterly', 'yearly')),
+    interval integer not null default 1 check (interval > 0),
+    day_of_month integer check (day_of_month between 1 and 31),
+    start_date date not null,
+    end_date date,
+    last_materialized date,
+    active boolean not null default true,
+    created_at timestamptz not null default now(),
+    check (
+        (kind = 'transaction' and type in ('expense', 'income', 'transfer'))
+        or (kind = 'budget' and type in ('income', 'bill', 'budget', 'savings'))
+    )
+);
+
+-- Earlier versions of this script defaulted type to 'expense', which isn't
+-- a budget section: such budget rules become plain budgets, and every new
+-- rule states its type
+update recurring_rules set type = 'budget'
+where kind = 'budget' and type not in ('income', 'bill', 'budget', 'savings');
+alter table recurring_rules alter column type drop default;
+
+alter table transactions add column if not exists recurring_id uuid references recurring_rules (id);
+
+-- One ledger row per occurrence: materialize_recurring() inserts with
+-- on conflict do nothing, so concurrent or repeated runs can't duplicate
+-- rows. Rows without a recurring_id never conflict (nulls are distinct).
+create unique index if not exists transactions_recurring_occurrence
+    on transactions (recurring_id, date);
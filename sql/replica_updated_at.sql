@@ -0,0 +1,37 @@
+-- Delta sync for the local SQLite replica (replica.py): every row carries
+-- an updated_at that moves on each insert/update, so db.py can pull only
+-- the rows changed since the replica's last watermark.
+
+create or replace function touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+alter table accounts     add column if not exists updated_at timestamptz not null default now();
+alter table transactions add column if not exists updated_at timestamptz not null default now();
+alter table budgets      add column if not exists updated_at timestamptz not null default now();
+
+drop trigger if exists accounts_touch_updated_at on accounts;
+create trigger accounts_touch_updated_at
+    before insert or update on accounts
+    for each row execute function touch_updated_at();
+
+drop trigger if exists transactions_touch_updated_at on transactions;
+create trigger transactions_touch_updated_at
+    before insert or update on transactions
+    for each row execute function touch_updated_at();
+
+drop trigger if exists budgets_touch_updated_at on budgets;
+create trigger budgets_touch_updated_at
+    before insert or update on budgets
+    for each row execute function touch_updated_at();
+
+-- Delta pulls filter and order on (updated_at, id)
+create index if not exists transactions_updated_at_idx on transactions (updated_at, id);
+create index if not exists budgets_updated_at_idx on budgets (updated_at, id);
+create index if not exists accounts_updated_at_idx on accounts (updated_at, id);
@@ -0,0 +1,179 @@
+"""
+supabase_client.py
+
+Managed PostgREST client for db.py:
+- one pooled, keep-alive httpx session with explicit timeouts
+- bounded retry with jittered exponential backoff, for reads only
+- a circuit breaker that fails fast while the backend is degraded, so
+  db.py can answer from its cache / replica instead of hanging the page
+
+Only the REST API is used, so the postgrest client is built directly
+(same URL and headers supabase.create_client() would use). httpx and
+postgrest are imported on first use, not at import time.
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from config import (
+    BREAKER_COOLDOWN_SECONDS,
+    BREAKER_FAILURE_THRESHOLD,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_READ_RETRIES,
+    HTTP_READ_TIMEOUT,
+    HTTP_RETRY_BACKOFF,
+)
+
+# Gateway / overload statuses and PostgREST "can't reach the database" codes
+_TRANSIENT_CODES = {"429", "502", "503", "504", "PGRST000", "PGRST001", "PGRST002", "57014"}
+
+# Methods that are safe to send twice
+_IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the breaker is open."""
+
+
+def create_pooled_client(url: str, key: str):
+    """
+    SyncPostgrestClient for `url` whose session keeps connections alive
+    and never waits longer than the configured timeouts.
+    """
+    import httpx
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+    class _PooledPostgrestClient(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout):
+            return SyncClient(base_url=base_url, headers=headers, timeout=timeout, limits=limits)
+
+    return _PooledPostgrestClient(
+        f"{url}/rest/v1",
+        headers={
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "apiKey": key,
+            "Authorization": f"Bearer {key}",
+        },
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    True for failures worth retrying: timeouts, dropped connections and
+    gateway/overload responses. Bad queries and constraint errors are not.
+    """
+    try:
+        import httpx
+    except ImportError:
+        httpx = None
+
+    if httpx is not None and isinstance(
+        error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+    ):
+        return True
+    return str(getattr(error, "code", "")) in _TRANSIENT_CODES
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` transient failures in a row; while open every
+    request fails immediately. After `cooldown` seconds one trial request
+    is let through (half-open): success closes the breaker, failure
+    re-opens it for another cooldown.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def failure(self) -> None:
+        with self._lock:
+            if self._trial_running:
+                # Failed trial: back to open for another cooldown
+                self._trial_running = False
+                self._opened_at = time.monotonic()
+                return
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures}
+
+
+breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN_SECONDS)
+
+
+def execute(query):
+    """
+    query.execute() through the breaker. Idempotent requests (GET) are
+    retried up to HTTP_READ_RETRIES times on transient errors, sleeping
+    a jittered HTTP_RETRY_BACKOFF * 2**attempt between tries; writes are
+    sent once.
+    """
+    method = str(getattr(query, "http_method", "GET")).upper()
+    retries = HTTP_READ_RETRIES if method in _IDEMPOTENT_METHODS else 0
+
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError("Backend unavailable (circuit open); try again shortly")
+        try:
+            resp = query.execute()
+        except Exception as e:
+            if not is_transient(e):
+                # The backend answered; the request itself was bad
+                breaker.success()
+                raise
+            breaker.failure()
+            if attempt >= retries:
+                raise
+            time.sleep(random.uniform(0, HTTP_RETRY_BACKOFF * 2 ** attempt))
+            attempt += 1
+            continue
+        breaker.success()
+        return resp
@@ -0,0 +1,20 @@
+import datetime
+
+
+def month_start(d: datetime.date) -> datetime.date:
+    return d.replace(day=1)
+
+
+def add_months(d: datetime.date, months: int) -> datetime.date:
+    """
+    First day of the month `months` away from d's month.
+    """
+    index = d.year * 12 + (d.month - 1) + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start: datetime.date, count: int):
+    """
+    `count` consecutive month starts beginning at start's month.
+    """
+    return [add_months(start, i) for i in range(count)]
@@ -0,0 +1,50 @@
+"""
+Cold-start timing: how long the app took to first render, and what each
+lazily imported page module or deferred resource cost the first time.
+
+Streamlit re-executes app.py on every rerun but keeps imported modules,
+so these module-level numbers describe the server process, not a rerun.
+"""
+
+import importlib
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# First import of this module, i.e. the first run of app.py in this process
+_started = time.perf_counter()
+_first_render_ms: Optional[float] = None
+_costs: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def record(name: str, ms: float) -> None:
+    with _lock:
+        _costs.setdefault(name, round(ms, 2))
+
+
+def import_module(name: str):
+    """
+    importlib.import_module, timing the first (real) import of `name`.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    record(f"import {name}", (time.perf_counter() - started) * 1000)
+    return module
+
+
+def mark_first_render() -> None:
+    global _first_render_ms
+    if _first_render_ms is None:
+        _first_render_ms = round((time.perf_counter() - _started) * 1000, 2)
+
+
+def report() -> Dict:
+    """
+    {"first_render_ms": ..., "costs": {name: ms}} for the diagnostics page.
+    """
+    with _lock:
+        return {"first_render_ms": _first_render_ms, "costs": dict(_costs)}